@@ -0,0 +1,146 @@
+# Content blocker: compile/cache cost and per-request decision time over a synthetic 50k-rule list,
+# then real page loads from a local HTTP server with and without the blocker.
+# python bench/adblock_bench.py [rules] [--no-pages]   exits 1 if p99 per decision is over 50 us
+import os, sys, time, random, json, tempfile, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qb import adblock
+
+TARGET_US = 50.0
+TRACKERS = 60 # Blocked resources on the test page
+CONTENT = 20 # Resources the page really needs
+RESOURCE_SIZE = 40 * 1024
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+def name(rng, length=(4, 10)):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(*length)))
+
+def rules(count, seed=1): # Roughly EasyList's mix: mostly hosts, then paths, options and exceptions
+    rng = random.Random(seed)
+    yield "! Synthetic list"
+    yield "/bench-tracker/*"
+    for i in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            yield f"||{name(rng)}.{rng.choice(['com', 'net', 'io'])}^"
+        elif kind < 0.8:
+            yield f"/{name(rng)}/{name(rng)}-{rng.randint(1, 999)}."
+        elif kind < 0.9:
+            yield f"||{name(rng)}.com/{name(rng)}/*$script,third-party"
+        elif kind < 0.95:
+            yield f"&{name(rng)}_id=*$domain={name(rng)}.com|~{name(rng)}.org"
+        elif kind < 0.98:
+            yield f"@@||{name(rng)}.com/{name(rng)}^"
+        else:
+            yield f"{name(rng)}.com##.{name(rng)}" # Cosmetic, skipped by the network matcher
+
+def requests(filters, count, seed=2):
+    rng = random.Random(seed)
+    hosts = list(filters.block_hosts)
+    for _ in range(count):
+        if rng.random() < 0.2:
+            yield f"https://cdn.{rng.choice(hosts)}/{name(rng)}.js"
+        else:
+            yield f"https://{name(rng)}.com/{name(rng)}/{name(rng)}.{rng.choice(['js', 'png', 'css'])}?v={rng.randint(1, 99999)}"
+
+def bench_matcher(count, folder):
+    path = os.path.join(folder, "synthetic.txt")
+    with open(path, "w") as f:
+        f.write("\n".join(rules(count)))
+    cache = os.path.join(folder, "filters.cache")
+    began = time.perf_counter()
+    filters = adblock.load([path], cache)
+    compiled = time.perf_counter() - began
+    began = time.perf_counter()
+    filters = adblock.load([path], cache)
+    cached = time.perf_counter() - began
+    urls = list(requests(filters, 50000))
+    times, blocked = [], 0
+    for url in urls:
+        began = time.perf_counter()
+        blocked += filters.should_block(url, "news.com", adblock.Type.ResourceTypeScript)
+        times.append((time.perf_counter() - began) * 1e6)
+    return filters, path, {
+        "rules": filters.rules,
+        "compile_ms": round(compiled * 1000, 1),
+        "cache_load_ms": round(cached * 1000, 1),
+        "decisions": len(urls),
+        "blocked": blocked,
+        "p50_us": round(percentile(times, 50), 2),
+        "p95_us": round(percentile(times, 95), 2),
+        "p99_us": round(percentile(times, 99), 2),
+    }
+
+class Handler(BaseHTTPRequestHandler): # A page with trackers and content, every body padded to RESOURCE_SIZE
+    served = 0
+
+    def do_GET(self):
+        if self.path.startswith("/page"):
+            tags = [f'<script src="/bench-tracker/t{i}.js"></script>' for i in range(TRACKERS)]
+            tags += [f'<img src="/content/c{i}.png">' for i in range(CONTENT)]
+            body = f"<html><body>{''.join(tags)}</body></html>".encode()
+        else:
+            time.sleep(0.01) # A little server latency, like a real third party
+            body = b"/*" + b" " * RESOURCE_SIZE + b"*/"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+        Handler.served += len(body)
+
+    def log_message(self, *args):
+        pass
+
+def bench_pages(filters, loads=5):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import QUrl, QEventLoop, QTimer
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app = QApplication.instance() or QApplication(sys.argv)
+    profile = QWebEngineProfile(app)
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.NoCache)
+    results = {}
+    for mode in ("off", "on"):
+        times, served, blocked = [], [], []
+        for i in range(loads):
+            page = QWebEnginePage(profile, app)
+            blocker = adblock.Blocker(filters, page) if mode == "on" else None
+            if blocker:
+                page.setUrlRequestInterceptor(blocker)
+            loop = QEventLoop()
+            page.loadFinished.connect(loop.quit)
+            QTimer.singleShot(30000, loop.quit)
+            Handler.served = 0
+            began = time.perf_counter()
+            page.load(QUrl(f"http://127.0.0.1:{server.server_port}/page{i}"))
+            loop.exec()
+            times.append((time.perf_counter() - began) * 1000)
+            served.append(Handler.served)
+            blocked.append(blocker.blocked if blocker else 0)
+            page.deleteLater()
+        results[mode] = {
+            "load_ms_p50": round(percentile(times, 50), 1),
+            "kb_served": round(sum(served) / len(served) / 1024),
+            "blocked": round(sum(blocked) / len(blocked)),
+        }
+    server.shutdown()
+    return results
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    count = int(args[0]) if args else 50000
+    with tempfile.TemporaryDirectory() as folder:
+        filters, path, report = bench_matcher(count, folder)
+        if "--no-pages" not in sys.argv:
+            report["pages"] = bench_pages(filters)
+    print(json.dumps(report, indent=2))
+    return 1 if report["p99_us"] > TARGET_US else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
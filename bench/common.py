@@ -0,0 +1,100 @@
+# Shared pieces for the benchmarks: a local HTTP server, throwaway workspaces, child processes and Qt waiting.
+import os, sys, json, time, tempfile, threading, subprocess
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+class PageHandler(BaseHTTPRequestHandler): # A small page at every path, titled after it
+    protocol_version = "HTTP/1.1"
+    size = 16 * 1024
+
+    def do_GET(self):
+        body = (f"<html><head><title>{self.path}</title></head><body>".encode()
+                + b"<p>lorem ipsum</p>" * (self.size // 18) + b"</body></html>")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def serve(handler=PageHandler, host="127.0.0.1"): # (server, base url), runs until server.shutdown()
+    server = ThreadingHTTPServer((host, 0), handler) # Other 127.x addresses count as other sites
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_port}/"
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)] if values else 0
+
+def median(values):
+    return percentile(values, 50)
+
+def workspace(config=None, files=None): # Temp dir laid out like the repo root: config/qb.cfg, user/...
+    folder = tempfile.mkdtemp(prefix="qb-bench-")
+    config = {"rpc": 0, "restore_session": 1, "prerender": 0, "speculate": 0, **(config or {})}
+    files = {"config/qb.cfg": "".join(f"{key}={value}\n" for key, value in config.items()), **(files or {})}
+    for name, content in files.items(): # content is a str or an iterable of lines
+        path = os.path.join(folder, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if isinstance(content, str):
+                f.write(content)
+            else:
+                f.writelines(f"{line}\n" for line in content)
+    return folder
+
+def session(urls): # user/session.json content with these tabs, the first one active
+    return json.dumps({"tabs": [{"url": url, "title": ""} for url in urls], "active": 0})
+
+def child(name, cwd, *args, timeout=900): # Runs bench/run.py --child name in cwd, returns the JSON it emits last
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"),
+               PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+    started = time.time()
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "bench", "run.py"), "--child", name, *map(str, args)],
+                            cwd=cwd, env=env, capture_output=True, text=True, timeout=timeout)
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode or not lines:
+        raise RuntimeError(f"{name} failed ({result.returncode}): {result.stderr.strip()[-2000:]}")
+    data = json.loads(lines[-1])
+    data["spawned"] = started
+    return data
+
+def emit(data): # Last line of a child's stdout, then exit without Qt teardown
+    print(json.dumps(data), flush=True)
+    os._exit(0)
+
+def descendants(pid): # pid and every process below it, Linux /proc only
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    parent = int(f.read().rsplit(")", 1)[1].split()[1])
+                children.setdefault(parent, []).append(int(entry))
+            except (OSError, ValueError, IndexError):
+                pass
+    found, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        found.append(current)
+        stack.extend(children.get(current, ()))
+    return found
+
+def wait(signal, timeout=30000): # Spins the Qt event loop until signal fires
+    from PyQt6.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+
+def sleep(ms):
+    from PyQt6.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec()
@@ -0,0 +1,88 @@
+# Control server throughput: starts the browser offscreen with --control, then drives tabs against a
+# local HTTP server one request at a time and pipelined.
+# python bench/control_bench.py [tabs] [navigations]
+import os, sys, json, time, subprocess
+from concurrent.futures import wait as wait_all
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common
+from qb.control_client import Client
+
+def start_browser(folder, path, timeout=60):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    process = subprocess.Popen([sys.executable, os.path.join(common.ROOT, "main.py"), "--control"], cwd=folder, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            client = Client(path)
+            client.call("ping")
+            return process, client
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("browser did not open the control socket")
+
+def timed(futures_by_start): # Latencies in ms from submit to answer
+    started = {future: began for future, began in futures_by_start}
+    latencies = []
+    for future in started:
+        future.result(120)
+        latencies.append((future.finished - started[future]) * 1000)
+    return latencies
+
+def run_round(client, calls): # calls: [(method, params)], all submitted before any answer is read
+    submitted = []
+    for method, params in calls:
+        began = time.perf_counter()
+        future = client.submit(method, **params)
+        future.add_done_callback(lambda f: setattr(f, "finished", time.perf_counter()))
+        submitted.append((future, began))
+    wait_all([future for future, _ in submitted])
+    return timed(submitted)
+
+def summary(latencies, seconds):
+    return {"ops": len(latencies), "ops_per_sec": round(len(latencies) / seconds, 1),
+            "latency_ms_p50": round(common.median(latencies), 2), "latency_ms_p95": round(common.percentile(latencies, 95), 2)}
+
+def main():
+    tabs = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    navigations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    server, url = common.serve()
+    folder = common.workspace(files={"user/session.json": common.session([url + "home"])})
+    path = os.path.join(folder, "control.sock") # Kept inside the workspace so runs never collide
+    with open(os.path.join(folder, "config", "qb.cfg"), "a") as f:
+        f.write(f"control_socket={path}\n")
+    process, client = start_browser(folder, path)
+    results = {}
+    try:
+        began = time.perf_counter()
+        ids = [f.result(120)["id"] for f in [client.submit("tabs.open", url=f"{url}open{i}", wait=True) for i in range(tabs)]]
+        results["open_tabs_ms"] = round((time.perf_counter() - began) * 1000, 1)
+
+        sequential = []
+        began = time.perf_counter()
+        for i in range(navigations // 4): # One at a time, the way a GUI-driving script would
+            sequential += run_round(client, [("tabs.navigate", {"id": ids[i % tabs], "url": f"{url}seq{i}", "wait": True})])
+        results["navigate_sequential"] = summary(sequential, time.perf_counter() - began)
+
+        began = time.perf_counter()
+        pipelined = run_round(client, [("tabs.navigate", {"id": ids[i % tabs], "url": f"{url}pipe{i}", "wait": True})
+                                       for i in range(navigations)])
+        results["navigate_pipelined"] = summary(pipelined, time.perf_counter() - began)
+
+        began = time.perf_counter()
+        evals = run_round(client, [("tabs.eval", {"id": ids[i % tabs], "script": "document.title.length"})
+                                   for i in range(navigations * 5)])
+        results["eval_pipelined"] = summary(evals, time.perf_counter() - began)
+        client.call("quit")
+    finally:
+        client.close()
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server.shutdown()
+    print(json.dumps({"tabs": tabs, **results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Downloads end to end against a local server of large files: the concurrency limit, how close the bandwidth cap
+# holds, pause/resume, and downloads carried over a restart through the journal. Every file is checked byte for byte.
+# python bench/download_bench.py [mb per file]   exits 1 if a file is wrong or the cap is off by more than 20%
+import os, sys, json, time, hashlib, tempfile
+from http.server import BaseHTTPRequestHandler
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common
+os.chdir(tempfile.mkdtemp(prefix="qb-downloads-")) # Journal, config and the files land here, not in the repo
+
+MB = 1024 * 1024
+CHUNK = 64 * 1024
+SAMPLE = 100 # ms between progress samples
+CAP_TOLERANCE = 0.2
+
+def content(name, size): # Deterministic bytes per file, so the result can be checked
+    block = hashlib.sha256(name.encode()).digest() * (CHUNK // 32)
+    return (block * (size // CHUNK + 1))[:size]
+
+class Handler(BaseHTTPRequestHandler): # /name?mb=N, sent as an attachment
+    def do_GET(self):
+        name, _, query = self.path.lstrip("/").partition("?")
+        size = int(float(query.partition("=")[2] or 1) * MB)
+        body = content(name, size)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Disposition", f'attachment; filename="{name}"')
+        self.send_header("Content-Length", str(size))
+        self.end_headers()
+        try:
+            for start in range(0, size, CHUNK):
+                self.wfile.write(body[start:start + CHUNK])
+        except (BrokenPipeError, ConnectionResetError): # Cancelled, or the first run of a restarted download
+            pass
+
+    def log_message(self, *args):
+        pass
+
+def until(done, timeout=120, each=None): # Spins the event loop until done(), calling each() every SAMPLE ms
+    deadline = time.monotonic() + timeout
+    while not done() and time.monotonic() < deadline:
+        common.sleep(SAMPLE)
+        if each:
+            each()
+    return done()
+
+def check(manager, mb): # Every finished file has exactly the bytes the server sent
+    wrong = []
+    for entry in manager.entries:
+        name = entry.url.rsplit("/", 1)[-1].partition("?")[0]
+        if entry.state != "done" or not os.path.exists(entry.path):
+            wrong.append(f"{name}: {entry.state}")
+            continue
+        with open(entry.path, "rb") as f:
+            if f.read() != content(name, int(mb * MB)):
+                wrong.append(f"{name}: content differs")
+    return wrong
+
+def main():
+    mb = float(sys.argv[1]) if len(sys.argv) > 1 else 8
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtCore import QUrl
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+    from qb import downloads
+    from qb.config import settings
+    server, base = common.serve(Handler)
+    app = QApplication.instance() or QApplication(sys.argv)
+    profile = QWebEngineProfile(app)
+    page = QWebEnginePage(profile, app)
+    results, wrong = {}, []
+
+    def run(name, files, concurrent=3, shared=0, each=0, during=None):
+        folder = os.path.abspath(name)
+        settings.update(download_dir=folder, downloads_concurrent=concurrent, download_limit_kbps=shared // 1024,
+                        download_limit_each_kbps=each // 1024)
+        manager = downloads.Downloads(os.path.abspath(f"{name}.json"))
+        manager.attach(profile)
+        progress, peak = {}, [0]
+        def sample():
+            moving = 0
+            for entry in manager.entries:
+                received = entry.request.receivedBytes() if entry.request is not None else entry.received
+                moving += received > progress.get(entry.url, 0)
+                progress[entry.url] = received
+            peak[0] = max(peak[0], moving)
+            if during:
+                during(manager)
+        began = time.perf_counter()
+        for i in range(files):
+            page.download(QUrl(f"{base}{name}{i}.bin?mb={mb}"), "")
+        until(lambda: len(manager.entries) == files and all(entry.state not in downloads.UNFINISHED for entry in manager.entries),
+              each=sample)
+        seconds = time.perf_counter() - began
+        profile.downloadRequested.disconnect(manager.on_requested)
+        wrong.extend(check(manager, mb))
+        return manager, {"files": files, "mb_each": mb, "seconds": round(seconds, 2),
+                         "mb_per_sec": round(files * mb / seconds, 2), "most_moving_at_once": peak[0]}
+
+    _, results["concurrent_2"] = run("concurrent", 6, concurrent=2)
+    results["concurrent_2"]["limit"] = 2
+
+    cap = 4 * MB
+    _, results["global_cap"] = run("capped", 2, shared=cap)
+    results["global_cap"]["cap_mb_per_sec"] = cap / MB
+    _, results["each_cap"] = run("each", 2, each=cap // 2)
+    results["each_cap"]["cap_mb_per_sec"] = cap / MB # Two downloads at half each
+    off = {name: abs(results[name]["mb_per_sec"] / (cap / MB) - 1) for name in ("global_cap", "each_cap")}
+
+    paused = {}
+    def pause_midway(manager): # Holds the first download for a second once a quarter is in
+        entry = manager.entries[0] if manager.entries else None
+        if entry and not paused and entry.request is not None and entry.request.receivedBytes() > mb * MB / 4:
+            manager.pause(0)
+            paused["at"] = time.perf_counter()
+        elif entry and paused.get("at") and time.perf_counter() - paused["at"] > 1 and entry.state == "paused":
+            manager.resume(0)
+    _, results["pause_resume"] = run("paused", 1, each=cap, during=pause_midway)
+
+    # Restart: the first manager stops a third of the way in, like an exiting browser, a new one picks up its journal
+    settings.update(download_dir=os.path.abspath("restart"), downloads_concurrent=3, download_limit_kbps=cap // 1024, download_limit_each_kbps=0)
+    journal = os.path.abspath("restart.json")
+    first = downloads.Downloads(journal)
+    first.attach(profile)
+    for i in range(2):
+        page.download(QUrl(f"{base}restart{i}.bin?mb={mb}"), "")
+    until(lambda: sum(entry.received for entry in first.entries) > 2 * mb * MB / 3)
+    requests = [entry.request for entry in first.entries]
+    first.close()
+    profile.downloadRequested.disconnect(first.on_requested)
+    for request in requests:
+        if request is not None:
+            request.cancel()
+    began = time.perf_counter()
+    second = downloads.Downloads(journal)
+    second.restore(profile)
+    carried = len(second.entries)
+    until(lambda: all(entry.state not in downloads.UNFINISHED for entry in second.entries))
+    results["restart"] = {"carried_over": carried, "seconds_after_restart": round(time.perf_counter() - began, 2)}
+    wrong.extend(check(second, mb))
+    second.close()
+
+    server.shutdown()
+    results["wrong_files"] = wrong
+    print(json.dumps(results, indent=2))
+    failed = bool(wrong) or carried != 2 or max(off.values()) > CAP_TOLERANCE
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Full-text history index: indexing throughput, size on disk and query latency over synthetic pages.
+# python bench/fulltext_bench.py [pages]   exits 1 if p95 of any query kind is over 50 ms
+import os, sys, time, random, json, tempfile
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix="qb-fulltext-")) # The module's own store and config land here, not in the repo
+from qb import fulltext
+from qb.config import settings
+
+TARGET_MS = 50.0
+SCREEN = 15 # Result rows the history window shows at once
+VOCABULARY = 50000
+WORDS_PER_PAGE = (200, 1500)
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+def vocabulary(rng): # Word ranks follow Zipf, like real text: a few words everywhere, most of them rare
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(VOCABULARY * 2)}
+    words = sorted(words)[:VOCABULARY]
+    rng.shuffle(words)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+def pages(count, seed=1):
+    rng = random.Random(seed)
+    words, weights = vocabulary(rng)
+    for i in range(count):
+        body = rng.choices(words, weights, k=rng.randint(*WORDS_PER_PAGE))
+        yield f"https://site{i % 997}.example/{i}", " ".join(body[:6]), " ".join(body)
+
+def index(store, count):
+    started = time.perf_counter()
+    for url, title, text in pages(count):
+        store.add(url, title, text)
+    done = []
+    store.after_writes(lambda: done.append(time.perf_counter()))
+    while not done:
+        time.sleep(0.05)
+    return done[0] - started
+
+def queries(words, seed=3):
+    rng = random.Random(seed)
+    common, rare = words[:20], words[5000:]
+    yield "common", [rng.choice(common) for _ in range(50)]
+    yield "rare", [rng.choice(rare) for _ in range(200)]
+    yield "two words", [f"{rng.choice(common)} {rng.choice(words[100:2000])}" for _ in range(200)]
+    yield "prefix", [rng.choice(words[100:5000])[:3] for _ in range(200)] # Search bar, word still being typed
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    path = os.path.abspath("bench-fulltext.db")
+    settings.set("fulltext_budget_mb", 100000) # Measure the index, not eviction
+    store = fulltext.FullTextStore(path)
+    seconds = index(store, count)
+    words, _ = vocabulary(random.Random(1))
+    results = {"pages": store.count(), "index_seconds": round(seconds, 1), "pages_per_sec": round(count / seconds),
+               "size_mb": round(os.path.getsize(path) / 1024 / 1024, 1)}
+    failed = False
+    for name, texts in queries(words):
+        store.search(texts[0]) # Warm the page cache
+        times = []
+        for text in texts:
+            started = time.perf_counter()
+            if name == "prefix":
+                store.search(text, fulltext.SUGGESTIONS)
+            else: # What the history window does: rank, then snippets for the rows on screen
+                for page_id, _, _ in store.search(text)[:SCREEN]:
+                    store.snippet(text, page_id)
+            times.append((time.perf_counter() - started) * 1000)
+        p95 = percentile(times, 95)
+        results[name] = {"p50_ms": round(percentile(times, 50), 2), "p95_ms": round(p95, 2)}
+        failed |= p95 > TARGET_MS
+    store.close()
+    print(json.dumps(results, indent=2))
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# Single instance: how long a second launch takes to hand its URL to the running browser and exit,
+# as a whole process and as the bare forward() call, and that every URL became a tab.
+# python bench/instance_bench.py [launches]   exits 1 if p95 of either is over its target
+import os, sys, json, time, subprocess
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common
+from control_bench import start_browser
+
+PROCESS_TARGET_MS = 150.0 # Interpreter start included, what the user waits for after clicking a link
+FORWARD_TARGET_MS = 5.0
+
+def launch(folder, url): # Wall time of `python main.py url` in the browser's folder
+    began = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.join(common.ROOT, "main.py"), url], cwd=folder,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60)
+    elapsed = (time.perf_counter() - began) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"second launch exited with {result.returncode}")
+    return elapsed
+
+def summary(latencies):
+    return {"launches": len(latencies), "p50_ms": round(common.median(latencies), 2),
+            "p95_ms": round(common.percentile(latencies, 95), 2), "max_ms": round(max(latencies), 2)}
+
+def main():
+    launches = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    server, url = common.serve()
+    folder = common.workspace(files={"user/session.json": common.session([url + "home"])})
+    control_path = os.path.join(folder, "control.sock")
+    instance_path = os.path.join(folder, "instance.sock") # Kept inside the workspace so runs never collide
+    with open(os.path.join(folder, "config", "qb.cfg"), "a") as f:
+        f.write(f"control_socket={control_path}\ninstance_socket={instance_path}\n")
+    process, client = start_browser(folder, control_path)
+    from qb import instance
+    try:
+        before = len(client.call("tabs.list"))
+        processes = [launch(folder, f"{url}process{i}") for i in range(launches)]
+        calls = []
+        for i in range(launches):
+            began = time.perf_counter()
+            if not instance.forward([f"{url}forward{i}"], name=instance_path):
+                raise RuntimeError("running browser did not take the URL")
+            calls.append((time.perf_counter() - began) * 1000)
+        deadline = time.monotonic() + 30 # Tabs open after the launcher is answered
+        while len(client.call("tabs.list")) < before + 2 * launches and time.monotonic() < deadline:
+            time.sleep(0.1)
+        opened = len(client.call("tabs.list")) - before
+        client.call("quit")
+    finally:
+        client.close()
+        try:
+            process.wait(30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        server.shutdown()
+    results = {"process": summary(processes), "forward": summary(calls), "tabs_opened": opened, "tabs_expected": 2 * launches}
+    print(json.dumps(results, indent=2))
+    failed = (results["process"]["p95_ms"] > PROCESS_TARGET_MS or results["forward"]["p95_ms"] > FORWARD_TARGET_MS
+              or opened != 2 * launches)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
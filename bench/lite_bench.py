@@ -0,0 +1,93 @@
+# Lite mode: bytes the server sent and renderer CPU per load of an image/font/script heavy page, full vs lite,
+# next to what the tab's own Saver reported. python bench/lite_bench.py [loads]
+import os, sys, json, tempfile, threading
+from http.server import BaseHTTPRequestHandler
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common
+os.chdir(tempfile.mkdtemp(prefix="qb-lite-")) # Rules and config land here, not in the repo
+
+IMAGES, FONTS, SCRIPTS = 40, 4, 10
+IMAGE_SIZE, FONT_SIZE, SCRIPT_SIZE = 60 * 1024, 40 * 1024, 30 * 1024
+
+class Handler(BaseHTTPRequestHandler): # Counts every byte it sends, the ground truth for bytes saved
+    served = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        if self.path.startswith("/page"):
+            fonts = "".join(f"@font-face {{ font-family: f{i}; src: url(/font{i}.woff2); }} .f{i} {{ font-family: f{i}; }}"
+                            for i in range(FONTS))
+            body = (f"<html><head><style>{fonts}</style>"
+                    + "".join(f'<script src="/script{i}.js"></script>' for i in range(SCRIPTS))
+                    + "</head><body>" + "".join(f'<p class="f{i}">text</p>' for i in range(FONTS))
+                    + "".join(f'<img src="/image{i}.png">' for i in range(IMAGES)) + "</body></html>").encode()
+            kind = "text/html"
+        elif self.path.startswith("/script"): # Busy work, what a heavy page's scripts cost the CPU
+            body = (b"(() => { let x = 0; for (let i = 0; i < 2e6; i++) x += Math.sqrt(i); window.x = x; })();"
+                    + b"/*" + b" " * SCRIPT_SIZE + b"*/")
+            kind = "application/javascript"
+        else:
+            size = FONT_SIZE if self.path.startswith("/font") else IMAGE_SIZE
+            body = b"\0" * size
+            kind = "font/woff2" if self.path.startswith("/font") else "image/png"
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+        with Handler.lock:
+            Handler.served += len(body)
+
+    def log_message(self, *args):
+        pass
+
+def load(page, url):
+    from PyQt6.QtCore import QUrl
+    saver = page.saver
+    Handler.served = 0
+    page.load(QUrl(url))
+    common.wait(page.loadFinished)
+    common.wait(saver.measured, 5000) # Its numbers come back from a script after loadFinished
+    return Handler.served, saver.last or {}
+
+def main():
+    loads = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt6.QtWidgets import QApplication
+    from PyQt6.QtWebEngineCore import QWebEngineProfile
+    from qb import lite
+    from qb.config import settings
+    server, base = common.serve(Handler)
+    app = QApplication.instance() or QApplication(sys.argv)
+    profile = QWebEngineProfile(app)
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.NoCache)
+    results = {}
+    for mode in ("full", "lite", "lite+js"):
+        settings.set("lite", int(mode != "full"))
+        settings.set("lite_js", int(mode == "lite+js"))
+        served, cpu, reported = [], [], []
+        for i in range(loads):
+            page = lite.Page(profile, app)
+            lite.attach(page)
+            sent, last = load(page, f"{base}page{i}")
+            served.append(sent)
+            if last.get("cpu_ms") is not None:
+                cpu.append(last["cpu_ms"])
+            reported.append(last.get("saved_bytes", 0))
+            page.deleteLater()
+        results[mode] = {
+            "kb_served": round(common.median(served) / 1024),
+            "renderer_cpu_ms_p50": common.median(cpu) if cpu else None,
+            "reported_saved_kb": round(common.median(reported) / 1024),
+        }
+    full = results["full"]
+    for mode in ("lite", "lite+js"):
+        results[mode]["kb_saved"] = full["kb_served"] - results[mode]["kb_served"]
+        if full["renderer_cpu_ms_p50"] is not None and results[mode]["renderer_cpu_ms_p50"] is not None:
+            results[mode]["cpu_ms_saved"] = full["renderer_cpu_ms_p50"] - results[mode]["renderer_cpu_ms_p50"]
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# Omnibox latency: build the index over a synthetic history and time every keystroke of typed queries.
+# python bench/omnibox_bench.py [entries]   exits 1 if p99 per keystroke is over 1 ms
+import os, sys, time, random, json
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from qb import omnibox
+
+TARGET_MS = 1.0
+SYLLABLES = ["ka", "lo", "mi", "ne", "ra", "to", "su", "vi", "de", "go", "pa", "ze", "qu", "bri", "ster", "on", "ix", "la"]
+TLDS = ["com", "org", "net", "ru", "io", "dev", "de"]
+
+def word(rng, parts=(2, 4)):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(*parts)))
+
+def history(count, seed=1): # Zipf-ish: a few hosts get most visits, like real browsing
+    rng = random.Random(seed)
+    hosts = [f"{word(rng)}.{rng.choice(TLDS)}" for _ in range(max(count // 50, 10))]
+    vocabulary = [word(rng) for _ in range(20000)]
+    now = time.time()
+    for i in range(count):
+        host = hosts[min(int(rng.paretovariate(1.2)) - 1, len(hosts) - 1)]
+        path = "/".join(rng.choice(vocabulary) for _ in range(rng.randint(1, 3)))
+        title = " ".join(rng.choice(vocabulary).capitalize() for _ in range(rng.randint(2, 5)))
+        yield f"https://{host}/{path}?id={i}", title, rng.randint(1, 30), now - rng.random() * 180 * 86400
+
+def keystrokes(index, queries, rng):
+    for _ in range(queries): # Type a prefix of a real entry character by character
+        entry = index.entries[rng.randrange(len(index.entries))]
+        text = rng.choice([entry.title, entry.url.split("/", 3)[2]]).lower()[:12]
+        for n in range(1, len(text) + 1):
+            yield text[:n]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+def run(count=1000000, queries=2000):
+    rng = random.Random(2)
+    began = time.perf_counter()
+    index = omnibox.FrecencyIndex()
+    index.bulk(history(count))
+    build = time.perf_counter() - began
+    timings = []
+    for text in keystrokes(index, queries, rng):
+        start = time.perf_counter()
+        index.query(text)
+        timings.append((time.perf_counter() - start) * 1000)
+    update = time.perf_counter()
+    for url, title, _, _ in history(1000, seed=3):
+        index.add_visit(url, title)
+    update = (time.perf_counter() - update) / 1000 * 1000
+    return {
+        "entries": count,
+        "build_s": round(build, 2),
+        "keystrokes": len(timings),
+        "p50_ms": round(percentile(timings, 50), 4),
+        "p95_ms": round(percentile(timings, 95), 4),
+        "p99_ms": round(percentile(timings, 99), 4),
+        "max_ms": round(max(timings), 4),
+        "add_visit_ms": round(update, 4),
+    }
+
+if __name__ == "__main__":
+    result = run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result["p99_ms"] < TARGET_MS else 1)
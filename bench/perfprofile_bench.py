@@ -0,0 +1,30 @@
+# Performance profiles: memory and new-tab latency for each one, with tabs spread over several sites
+# so process-per-site and the renderer limit actually matter.
+# python bench/perfprofile_bench.py [tabs] [sites]
+import os, sys, json
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common, run
+from qb import perfprofile
+
+def main():
+    tabs = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    sites = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+    servers = [common.serve(host=f"127.0.0.{i + 1}") for i in range(sites)] # Linux routes all of 127/8 to lo
+    bases = ",".join(url for _, url in servers)
+    results = {}
+    for name in perfprofile.PROFILES:
+        data = run.bench_tabs(bases, [1, tabs], {"perf_profile": name})
+        results[name] = {
+            "flags": " ".join(perfprofile.PROFILES[name]["flags"]),
+            "rss_1_tab_mb": data["1"]["total_rss_mb"],
+            f"rss_{tabs}_tabs_mb": data[str(tabs)]["total_rss_mb"],
+            "rss_per_extra_tab_mb": round((data[str(tabs)]["total_rss_mb"] - data["1"]["total_rss_mb"]) / (tabs - 1), 1),
+            "add_new_tab_ms_p50": data[str(tabs)]["add_new_tab_ms_p50"],
+            "tab_load_ms_p50": data[str(tabs)]["tab_load_ms_p50"],
+        }
+    for server, _ in servers:
+        server.shutdown()
+    print(json.dumps({"tabs": tabs, "sites": sites, "profiles": results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Benchmark suite for the hot paths: cold start, new tabs, a long tab strip, history window and config lookups.
+# Runs offscreen against a local HTTP server, each scenario in fresh processes and workspaces.
+# python bench/run.py [--only startup,tabs,tabstrip,history,config] [--quick] [--out results.json]
+#                     [--baseline bench/baseline.json] [--save-baseline] [--tolerance 0.25]
+# Exits 1 when a metric is slower than the baseline by more than the tolerance.
+import os, sys, json, time, shutil, platform, argparse
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import common
+
+TAB_COUNTS = [1, 10, 100]
+STRIP_COUNTS = [100, 500]
+HISTORY_SIZES = [10000, 100000, 1000000]
+LOWER_IS_BETTER = ("_ms", "_mb", "_ns")
+
+# Parent side, one function per scenario
+
+def bench_startup(server_url, runs=3):
+    results = []
+    for _ in range(runs): # New workspace each time, so nothing is warm but the OS file cache
+        folder = common.workspace(files={"user/session.json": common.session([server_url + "start"])})
+        data = common.child("startup", folder)
+        results.append(data)
+        shutil.rmtree(folder, ignore_errors=True)
+    return {
+        "cold_start_ms": round(common.median([(data["loaded"] - data["spawned"]) * 1000 for data in results]), 1),
+        "phases_ms": {name: round(common.median([dict(data["phases"])[name] * 1000 for data in results]), 1)
+                      for name, _ in results[0]["phases"] if all(name in dict(data["phases"]) for data in results)},
+    }
+
+def bench_tabs(server_url, counts, config=None): # server_url may list several bases, comma separated
+    folder = common.workspace({"tab_budget": 0, "tab_freeze": 1000000, **(config or {})},
+                              {"user/session.json": common.session([server_url.split(",")[0] + "tab0"])})
+    data = common.child("tabs", folder, server_url, *counts)
+    shutil.rmtree(folder, ignore_errors=True)
+    return data["tabs"]
+
+def bench_tabstrip(server_url, counts): # Restored placeholders only, so it measures the strip and not renderers
+    results = {}
+    for count in counts:
+        folder = common.workspace(files={"user/session.json": common.session([f"{server_url}strip{i}" for i in range(count)])})
+        data = common.child("tabstrip", folder)
+        shutil.rmtree(folder, ignore_errors=True)
+        results[str(count)] = {key: value for key, value in data.items() if key != "spawned"}
+    return results
+
+def bench_history(sizes):
+    results = {}
+    for size in sizes:
+        lines = (f"https://site{i % 5000}.example/page/{i}?q={i * 7919 % 100003}" for i in range(size))
+        folder = common.workspace(files={"user/history.qb": lines, "user/session.json": common.session(["about:blank"])})
+        data = common.child("history", folder)
+        shutil.rmtree(folder, ignore_errors=True)
+        results[str(size)] = {key: value for key, value in data.items() if key != "spawned"}
+    return results
+
+def bench_config():
+    folder = common.workspace({"search": 4})
+    data = common.child("config", folder)
+    shutil.rmtree(folder, ignore_errors=True)
+    return {key: value for key, value in data.items() if key != "spawned"}
+
+# Child side, runs inside a workspace with the repo on PYTHONPATH
+
+def window():
+    from PyQt6.QtWidgets import QApplication
+    import main
+    main.perfprofile.apply_flags() # As main.py does before its QApplication
+    app = QApplication(sys.argv)
+    main.update_ui()
+    win = main.MainWindow()
+    win.show()
+    return main, app, win
+
+def child_startup():
+    from qb import startup
+    main, app, win = window()
+    common.wait(win.tab_widget.currentWidget().loadFinished)
+    startup.mark("first loadFinished")
+    common.emit({"loaded": time.time(), "phases": startup.phases})
+
+def child_tabs(server_url, *counts):
+    from PyQt6.QtCore import QUrl
+    from qb import memory
+    main, app, win = window()
+    common.wait(win.tab_widget.currentWidget().loadFinished)
+    results, calls, loads, bases = {}, [], [], server_url.split(",")
+    for target in map(int, counts):
+        while win.tab_widget.count() < target:
+            began = time.perf_counter()
+            count = win.tab_widget.count()
+            win.add_new_tab(QUrl(f"{bases[count % len(bases)]}tab{count}"))
+            calls.append((time.perf_counter() - began) * 1000)
+            common.wait(win.tab_widget.currentWidget().loadFinished)
+            loads.append((time.perf_counter() - began) * 1000)
+        common.sleep(1000) # Let renderers settle before reading memory
+        rss = memory.total_rss(common.descendants(os.getpid())) / 1048576
+        results[str(target)] = {
+            "add_new_tab_ms_p50": round(common.median(calls), 2) if calls else 0,
+            "add_new_tab_ms_p95": round(common.percentile(calls, 95), 2) if calls else 0,
+            "tab_load_ms_p50": round(common.median(loads), 1) if loads else 0,
+            "total_rss_mb": round(rss, 1),
+            "rss_per_tab_mb": round(rss / target, 1),
+        }
+    common.emit({"tabs": results})
+
+def child_tabstrip():
+    from PyQt6.QtWidgets import QTabWidget
+    main, app, win = window()
+    app.processEvents()
+    widgets = list(win.tabs.widgets)
+    began = time.perf_counter()
+    for widget in widgets:
+        win.tab_widget.indexOf(widget)
+    lookup_ns = (time.perf_counter() - began) / len(widgets) * 1e9
+    began = time.perf_counter()
+    for widget in widgets:
+        QTabWidget.indexOf(win.tab_widget, widget) # What every lookup cost before the model
+    scan_ns = (time.perf_counter() - began) / len(widgets) * 1e9
+    flushes = []
+    win.tabs.flushed.connect(lambda: flushes.append(time.perf_counter()))
+    began = time.perf_counter()
+    for i, widget in enumerate(widgets): # Every tab retitled at once, like a window of tabs reloading together
+        if isinstance(widget, main.session.LazyTab):
+            widget.title = f"Renamed {i}"
+        win.tabs.changed(widget)
+    queued_ms = (time.perf_counter() - began) * 1000
+    common.wait(win.tabs.flushed)
+    storm_ms = (time.perf_counter() - began) * 1000
+    win.tab_list.show()
+    app.processEvents()
+    began = time.perf_counter()
+    win.tab_list.filter.setText(f"Renamed {len(widgets) - 1}")
+    app.processEvents()
+    search_ms = (time.perf_counter() - began) * 1000
+    common.emit({"tabs": len(widgets), "index_of_ns": round(lookup_ns), "index_of_scan_ns": round(scan_ns),
+                 "retitle_all_queue_ms": round(queued_ms, 2), "retitle_all_ms": round(storm_ms, 2), "flushes": len(flushes),
+                 "tab_search_ms": round(search_ms, 2), "tab_search_rows": win.tab_list.proxy.rowCount()})
+
+def child_history():
+    import threading
+    began = time.perf_counter()
+    from qb import history # Importing queues the legacy history.qb import on the writer thread
+    imported = threading.Event()
+    history.store.after_writes(imported.set)
+    imported.wait()
+    import_ms = (time.perf_counter() - began) * 1000
+    main, app, win = window()
+    began = time.perf_counter()
+    dialog = main.HistoryWindow(win)
+    dialog.show()
+    app.processEvents() # The first page is fetched and laid out here
+    open_ms = (time.perf_counter() - began) * 1000
+    began = time.perf_counter()
+    dialog.hst.scrollToBottom() # Forces a few more fetchMore pages
+    app.processEvents()
+    scroll_ms = (time.perf_counter() - began) * 1000
+    common.emit({"entries": history.store.count(), "import_ms": round(import_ms, 1),
+                 "open_ms": round(open_ms, 2), "scroll_ms": round(scroll_ms, 2)})
+
+def child_config(calls=100000):
+    from qb import search
+    from qb.config import settings
+    result = {}
+    for name, func in [("get_current_search_engine_link_ns", lambda: search.GetCurrentSearchEngine(2)),
+                       ("get_current_search_engine_name_ns", lambda: search.GetCurrentSearchEngine(1)),
+                       ("settings_get_int_ns", lambda: settings.get_int("search", 0)),
+                       ("search_engines_ns", search.SearchEngines)]:
+        began = time.perf_counter()
+        for _ in range(calls):
+            func()
+        result[name] = round((time.perf_counter() - began) / calls * 1e9)
+    common.emit(result)
+
+CHILDREN = {"startup": child_startup, "tabs": child_tabs, "tabstrip": child_tabstrip, "history": child_history,
+            "config": child_config}
+
+# Baselines
+
+def flatten(data, prefix=""):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):
+            yield f"{prefix}{key}", value
+
+def compare(results, baseline, tolerance):
+    old = dict(flatten(baseline.get("results", {})))
+    regressions = []
+    for key, value in flatten(results):
+        name = key.rsplit(".", 1)[-1]
+        if key in old and old[key] > 0 and any(unit in name for unit in LOWER_IS_BETTER):
+            change = value / old[key] - 1
+            if change > tolerance:
+                regressions.append({"metric": key, "baseline": old[key], "current": value, "change": f"+{change:.0%}"})
+    return regressions
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        CHILDREN[sys.argv[2]](*sys.argv[3:])
+        return 0
+    parser = argparse.ArgumentParser(description="qBrowser benchmarks")
+    parser.add_argument("--only", default="startup,tabs,tabstrip,history,config")
+    parser.add_argument("--quick", action="store_true", help="smaller tab counts and history sizes")
+    parser.add_argument("--out")
+    parser.add_argument("--baseline", default=os.path.join(common.ROOT, "bench", "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    only = args.only.split(",")
+    server, url = common.serve()
+    results = {}
+    if "startup" in only:
+        results["startup"] = bench_startup(url)
+    if "tabs" in only:
+        results["tabs"] = bench_tabs(url, TAB_COUNTS[:2] if args.quick else TAB_COUNTS)
+    if "tabstrip" in only:
+        results["tabstrip"] = bench_tabstrip(url, STRIP_COUNTS[:1] if args.quick else STRIP_COUNTS)
+    if "history" in only:
+        results["history"] = bench_history(HISTORY_SIZES[:2] if args.quick else HISTORY_SIZES)
+    if "config" in only:
+        results["config"] = bench_config()
+    server.shutdown()
+    report = {
+        "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "results": results,
+    }
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(results, json.load(f), args.tolerance)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write(text)
+    return 1 if report.get("regressions") else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
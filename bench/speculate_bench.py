@@ -0,0 +1,123 @@
+# Speculation: navigation time to a server with slow connection setup, cold versus after a preconnect hint,
+# and new tab time with and without a prerendered home view.
+# python bench/speculate_bench.py [runs] [connect_ms]
+import os, sys, time, json, threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt6.QtCore import QUrl, QEventLoop, QTimer
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from qb import speculate
+
+THINK_MS = 400 # Time between the hint and the real navigation, about one typed word
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, so a warmed socket is actually reused
+
+    def do_GET(self):
+        body = b"<html><head><title>bench</title></head><body>" + b"x" * 2048 + b"</body></html>"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class SlowConnectServer(ThreadingHTTPServer): # Every new connection pays connect_delay, like DNS + TCP + TLS
+    daemon_threads = True
+    connect_delay = 0.15
+
+    def get_request(self):
+        request = super().get_request()
+        time.sleep(self.connect_delay)
+        return request
+
+def serve(delay):
+    server = SlowConnectServer(("127.0.0.1", 0), Handler)
+    server.connect_delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/"
+
+def wait(signal, timeout=30000):
+    loop = QEventLoop()
+    signal.connect(loop.quit)
+    QTimer.singleShot(timeout, loop.quit)
+    loop.exec()
+
+def sleep(ms):
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec()
+
+def navigate(page, url):
+    began = time.perf_counter()
+    page.load(QUrl(url))
+    wait(page.loadFinished)
+    return (time.perf_counter() - began) * 1000
+
+def median(values):
+    return round(sorted(values)[len(values) // 2], 1)
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    delay = (int(sys.argv[2]) if len(sys.argv) > 2 else 150) / 1000
+    app = QApplication(sys.argv)
+    profile = QWebEngineProfile(app)
+    profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.NoCache)
+    new_page = lambda parent: QWebEnginePage(profile, parent)
+    cold, warm, tab_cold, tab_prerendered = [], [], [], []
+    for _ in range(runs): # A fresh server per run, so no socket survives from the previous one
+        server, url = serve(delay)
+        page = new_page(app)
+        sleep(THINK_MS)
+        cold.append(navigate(page, url))
+        server.shutdown()
+
+        server, url = serve(delay)
+        speculator = speculate.Speculator(new_page, app)
+        speculator.hint([url], now=True)
+        sleep(THINK_MS)
+        warm.append(navigate(page, url))
+        speculator.cancel()
+        server.shutdown()
+
+        server, url = serve(delay)
+        view = QWebEngineView()
+        view.setPage(new_page(view))
+        began = time.perf_counter()
+        view.setUrl(QUrl(url))
+        wait(view.loadFinished)
+        tab_cold.append((time.perf_counter() - began) * 1000)
+        view.deleteLater()
+
+        def factory(u):
+            v = QWebEngineView()
+            v.setPage(new_page(v))
+            v.setUrl(u)
+            return v
+        prerender = speculate.Prerenderer(factory, lambda: url, app)
+        prerender.prepare()
+        wait(prerender.view.loadFinished)
+        began = time.perf_counter()
+        view = prerender.take(url) # What add_new_tab gets, already loaded
+        tab_prerendered.append((time.perf_counter() - began) * 1000)
+        prerender.cancel()
+        view.deleteLater()
+        server.shutdown()
+        page.deleteLater()
+    print(json.dumps({
+        "connect_delay_ms": delay * 1000,
+        "navigate_cold_ms": median(cold),
+        "navigate_preconnected_ms": median(warm),
+        "saved_ms": round(median(cold) - median(warm), 1),
+        "new_tab_cold_ms": median(tab_cold),
+        "new_tab_prerendered_ms": median(tab_prerendered),
+        "stats": speculate.stats,
+    }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+catalog = [
+    ("gsearch", "🔍"),
+    ("gstr", "Search"),
+    ("home", "Home"),
+    ("ntab", "New Tab"),
+    ("bk", "Back"),
+    ("fw", "Forward"),
+    ("uic", "UI Customization"),
+    ("hst", "Browser History"),
+    ("redactcolor", "Select a color for text"),
+    ("redactbg", "Select a color for background"),
+    ("redactbutton", "Select a color for button"),
+    ("selectcolor", "Select a color"),
+    ("dbg", "Debug"),
+    ("pin", "Keep loaded"),
+    ("settings", "Settings"),
+    ("hstsearch", "Search page text"),
+    ("tabs", "Tabs"),
+    ("tabsearch", "Search tabs"),
+    ("lite", "Lite mode for this site: no images, web fonts or autoplay"),
+    ("liteall", "Lite mode for all sites"),
+    ("downloads", "Downloads"),
+    ("dlpause", "Pause"),
+    ("dlresume", "Resume"),
+    ("dlcancel", "Cancel"),
+    ("dlclear", "Clear finished"),
+    ("dlfolder", "Open folder"),
+    ("dlfile", "File"),
+    ("dlprogress", "Progress"),
+    ("dlsize", "Size"),
+    ("dlspeed", "Speed"),
+    ("dleta", "Time left"),
+    ("dlstate", "State"),
+    ("dlqueued", "Queued"),
+    ("dlactive", "Downloading"),
+    ("dlheld", "Speed limited"),
+    ("dlpaused", "Paused"),
+    ("dldone", "Done"),
+    ("dlfailed", "Failed"),
+    ("dlcancelled", "Cancelled")
+]
\ No newline at end of file
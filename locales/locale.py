@@ -1,30 +0,0 @@
-en = [
-    ("gsearch", "🔍"),
-    ("gstr", "Search"),
-    ("home", "Home"),
-    ("ntab", "New Tab"),
-    ("bk", "Back"),
-    ("fw", "Forward"),
-    ("uic", "UI Customization"),
-    ("hst", "Browser History"),
-    ("redactcolor", "Select a color for text"),
-    ("redactbg", "Select a color for background"),
-    ("redactbutton", "Select a color for button"),
-    ("dbg", "Debug")
-]
-
-ru = [
-    ("gsearch", "🔍"),
-    ("gstr", "Поиск"),
-    ("home", "Домой"),
-    ("ntab", "Новая вкладка"),
-    ("bk", "Назад"),
-    ("fw", "Вперёд"),
-    ("uic", "Кастомизация UI"),
-    ("hst", "История браузера"),
-    ("redactcolor", "Выберите цвет для текста"),
-    ("redactbg", "Выберите цвет для заднего фона"),
-    ("redactbutton", "Выберите цвет для кнопки"),
-    ("selectcolor", "Выберите цвет"),
-    ("dbg", "Отладка")
-]
\ No newline at end of file
@@ -0,0 +1,41 @@
+catalog = [
+    ("gsearch", "🔍"),
+    ("gstr", "Поиск"),
+    ("home", "Домой"),
+    ("ntab", "Новая вкладка"),
+    ("bk", "Назад"),
+    ("fw", "Вперёд"),
+    ("uic", "Кастомизация UI"),
+    ("hst", "История браузера"),
+    ("redactcolor", "Выберите цвет для текста"),
+    ("redactbg", "Выберите цвет для заднего фона"),
+    ("redactbutton", "Выберите цвет для кнопки"),
+    ("selectcolor", "Выберите цвет"),
+    ("dbg", "Отладка"),
+    ("pin", "Не выгружать"),
+    ("settings", "Настройки"),
+    ("hstsearch", "Поиск по тексту страниц"),
+    ("tabs", "Вкладки"),
+    ("tabsearch", "Поиск по вкладкам"),
+    ("lite", "Лёгкий режим для сайта: без картинок, веб-шрифтов и автовоспроизведения"),
+    ("liteall", "Лёгкий режим для всех сайтов"),
+    ("downloads", "Загрузки"),
+    ("dlpause", "Пауза"),
+    ("dlresume", "Продолжить"),
+    ("dlcancel", "Отменить"),
+    ("dlclear", "Очистить завершённые"),
+    ("dlfolder", "Открыть папку"),
+    ("dlfile", "Файл"),
+    ("dlprogress", "Прогресс"),
+    ("dlsize", "Размер"),
+    ("dlspeed", "Скорость"),
+    ("dleta", "Осталось"),
+    ("dlstate", "Состояние"),
+    ("dlqueued", "В очереди"),
+    ("dlactive", "Загружается"),
+    ("dlheld", "Ограничена скорость"),
+    ("dlpaused", "Пауза"),
+    ("dldone", "Готово"),
+    ("dlfailed", "Ошибка"),
+    ("dlcancelled", "Отменена")
+]
\ No newline at end of file
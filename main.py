@@ -1,19 +1,45 @@
 import sys
 import os
+if __name__ == '__main__' and "--batch" in sys.argv: # Headless bulk rendering, none of the browser window is needed
+    from qb import batch
+    sys.exit(batch.main(sys.argv[sys.argv.index("--batch") + 1:]))
+if __name__ == '__main__': # A browser already running here opens the URLs, this process never loads Qt
+    from qb import instance
+    if instance.enabled(sys.argv) and instance.forward(instance.urls(sys.argv)): sys.exit(0)
+from qb import startup
 from functools import partial
-from PyQt6.QtCore import QUrl
+from PyQt6.QtCore import QUrl, Qt, QTimer, QStringListModel, pyqtSignal
 from PyQt6.QtGui import QAction, QIcon, QColor
-from PyQt6.QtWidgets import QApplication, QColorDialog, QListWidget, QMainWindow, QTabWidget, QComboBox, QWidget, QSpacerItem, QSizePolicy, QLineEdit, QPushButton, QDialog, QVBoxLayout, QLabel
+from PyQt6.QtWidgets import QApplication, QCompleter, QDialogButtonBox, QMenu, QColorDialog, QListView, QMainWindow, QComboBox, QWidget, QSpacerItem, QSizePolicy, QLineEdit, QPushButton, QDialog, QVBoxLayout, QLabel
 from PyQt6.QtWebEngineWidgets import QWebEngineView
 from PyQt6.QtCore import qInstallMessageHandler
-from locales.locale import en, ru
 from qb.core import *
-from qb.voice import voice
+from qb.config import settings, ui
+from qb import voice
 from qb import debug
 from qb import resolution
 from qb import vcheck
 from qb import search
 from qb import rpc
+from qb import history
+from qb import lifecycle
+from qb import session
+from qb import omnibox
+from qb.i18n import tr
+from qb import theme
+from qb import profile
+from qb import adblock
+from qb import speculate
+from qb import telemetry
+from qb import router
+from qb import perfprofile
+from qb import snapshot
+from qb import control
+from qb import fulltext
+from qb import tabs
+from qb import lite
+from qb import instance
+from qb import downloads
 
 def message_handler(mode, context, message): # Skip chromium messages
     if "js:" in message or "sandbox" in message:
@@ -24,31 +50,21 @@ def message_handler(mode, context, message): # Skip chromium messages
 qInstallMessageHandler(message_handler)
 
 def get_locale(key): # Checking locale
-    global current_language
-    locales = {"ru": dict(ru), "en": dict(en)}
-    return locales.get(current_language, locales["ru"]).get(key, "не найден")
+    return tr.get(key)
 
 def get_ui(): # Reading UI
-    bg, color, button = "#ffffff", "#000000", "default" 
-    with open(ui_path, "r", encoding="utf-8") as f:
-        config = dict(line.strip().split("=", 1) for line in f if "=" in line)
-        bg = config.get("bg", bg)
-        color = config.get("color", color)
-        button = config.get("button", button)
-    return bg, color, button
+    return ui.get("bg"), ui.get("color"), ui.get("button")
+
+theme_engine = None
+
+def get_theme(): # Needs the QApplication, so it is made on first use
+    global theme_engine
+    if theme_engine is None:
+        theme_engine = theme.ThemeEngine(QApplication.instance())
+    return theme_engine
 
 def update_ui(): # Update UI after saving
-    bg, color, button = get_ui()
-    app.setStyleSheet(f"""
-        QWidget {{
-            background-color: {bg};
-            color: {color};
-        }}
-        QPushButton {{
-            background-color: {button};
-            color: {color};
-        }}
-    """)
+    get_theme().apply(*get_ui())
 
 def set_language(lang): # languages
     global current_language
@@ -56,47 +72,26 @@ def set_language(lang): # languages
         case "en": current_language = "en"
         case "ru": current_language = "ru"
         case _: return
-    os.makedirs(os.path.dirname(config_path), exist_ok=True)
-    lines = open(config_path, 'r', encoding='utf-8').readlines() if os.path.exists(config_path) else ['']
-    lines[0] = f"language={current_language}\n"
-    with open(config_path, 'w', encoding='utf-8') as f: f.writelines(lines)
+    settings.set("language", current_language)
+    tr.set_language(current_language) # Live widgets bound with tr.bind update themselves
 
 def set_resolution(x, y): # Save resolution to qb\qb.cfg
-    lines = open(config_path, 'r', encoding='utf-8').readlines() if os.path.exists(config_path) else ['']
-    lines[1] = f"x={x}\n"
-    lines[2] = f"y={y}\n"
-    with open(config_path, 'w', encoding='utf-8') as f: f.writelines(lines)
+    settings.update(x=x, y=y)
 
 def set_ui(bg, color, button): # set UI function
-    lines = open(ui_path, 'r', encoding='utf-8').readlines() if os.path.exists(ui_path) else ['']
-    lines[0] = f"bg={bg}\n"
-    lines[1] = f"color={color}\n"
-    lines[2] = f"button={button}\n"
-    with open(ui_path, 'w', encoding='utf-8') as f: f.writelines(lines)
+    ui.update(bg=bg, color=color, button=button)
 
 def get_current_language(): # getting current language
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("language="):
-                    return line.strip().split("=", 1)[1]
-    return "ru"
+    return settings.get("language", "ru")
 
 def get_current_resolution(): # get current resolution and save
-    x, y = "400", "200" # Default resolution
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("x="):
-                    x = line.strip().split("=", 1)[1]
-                if line.startswith("y="):
-                    y = line.strip().split("=", 1)[1]
-    return int(x), int(y)
+    return settings.get_int("x", 400), settings.get_int("y", 200)
 
 class SettingsWindow(QDialog): # Settings UI menu
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle(get_locale("settings") if get_locale("settings") != "не найден" else "Settings")
+        self.setWindowTitle(get_locale("settings"))
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose) # Drops its tr bindings once closed
         self.setGeometry(200, 200, 300, 200)
         self.setModal(True)
         
@@ -123,15 +118,27 @@ class SettingsWindow(QDialog): # Settings UI menu
         self.discordrpc.currentTextChanged.connect(rpc.on_rpc_changed)
         layout.addWidget(self.discordrpc)
 
+        self.profile_mode = QComboBox()
+        self.profile_mode.addItems(list(profile.MODES.values()))
+        self.profile_mode.setCurrentText(profile.MODES[profile.current_mode()])
+        self.profile_mode.currentIndexChanged.connect(lambda i: profile.set_mode(list(profile.MODES)[i]))
+        layout.addWidget(self.profile_mode)
+
+        self.perf_profile = QComboBox() # Chromium flags, applied on the next start
+        self.perf_profile.addItems([f"{p['title']} (restart)" for p in perfprofile.PROFILES.values()])
+        self.perf_profile.setCurrentIndex(list(perfprofile.PROFILES).index(perfprofile.saved_name()))
+        self.perf_profile.currentIndexChanged.connect(lambda i: perfprofile.set_profile(list(perfprofile.PROFILES)[i]))
+        layout.addWidget(self.perf_profile)
+
         self.github_button = QPushButton("Source Code")
         self.github_button.clicked.connect(partial(self.openlink, "https://github.com/qualzed/qBrowser"))
         layout.addWidget(self.github_button)
 
-        self.history_button = QPushButton(get_locale("hst"))
+        self.history_button = tr.bind(QPushButton(), "hst")
         self.history_button.clicked.connect(self.OpenHistory)
         layout.addWidget(self.history_button)
 
-        self.uicustom_button = QPushButton(get_locale("uic"))
+        self.uicustom_button = tr.bind(QPushButton(), "uic")
         self.uicustom_button.clicked.connect(self.OpenCustom)
         layout.addWidget(self.uicustom_button)
 
@@ -139,19 +146,17 @@ class SettingsWindow(QDialog): # Settings UI menu
         self.support_button.clicked.connect(partial(self.openlink, "https://www.donationalerts.com/r/qualzed"))
         layout.addWidget(self.support_button)
 
-        self.debug_button = QPushButton(get_locale("dbg"))
+        self.debug_button = tr.bind(QPushButton(), "dbg")
         self.debug_button.clicked.connect(self.LaunchDebug)
         layout.addWidget(self.debug_button)
         
         layout.addStretch()
         
         self.setLayout(layout)
+        get_theme().scope(self)
     
-    def LaunchDebug(self):
-        if(debug.debug_bool):
-            debug.debug_bool = False
-        else:
-            debug.debug_bool = True
+    def LaunchDebug(self): # Listeners such as the telemetry panel follow the switch
+        debug.set_debug(not debug.debug_bool)
 
     def OpenHistory(self):
         main_window = self.parent()
@@ -175,48 +180,73 @@ class SettingsWindow(QDialog): # Settings UI menu
         new_lang = lang_map.get(text)
         if new_lang:
             set_language(new_lang)
-            main_window = self.parent()
-            if main_window:
-                main_window.update_ui_texts()
 
 class HistoryWindow(QDialog): # Default history
     def __init__(self, main_window, parent=None):
         super().__init__(parent)
         self.main_window = main_window
         self.setWindowTitle("History")
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         self.setGeometry(100, 100, 600, 600)
         self.setModal(True)
         layout = QVBoxLayout()
 
-        lines = open(history_path, 'r', encoding='utf-8').readlines() if os.path.exists(history_path) else []
-        self.hst = QListWidget()
-        self.hst.addItems([line.strip() for line in lines])
-        self.hst.currentTextChanged.connect(self.text_changed)
+        self.filter = tr.bind(QLineEdit(), "hstsearch", "setPlaceholderText") # Searches the text of visited pages
+        self.filter.setClearButtonEnabled(True)
+        self.filter.textChanged.connect(self.on_filter)
+        layout.addWidget(self.filter)
+
+        self.model = history.HistoryModel(history.store, self)
+        self.results = fulltext.SearchModel(fulltext.store, self)
+        self.hst = QListView()
+        self.hst.setUniformItemSizes(True)
+        self.hst.setModel(self.model)
+        self.hst.selectionModel().currentChanged.connect(self.on_current)
+        self.hst.setMouseTracking(True) # entered fires on hover only with tracking on
+        if main_window:
+            self.hst.entered.connect(lambda index: main_window.speculator.hint([index.data(Qt.ItemDataRole.UserRole)]))
         layout.addWidget(self.hst)
 
         self.setLayout(layout)
 
+    def on_filter(self, text):
+        model = self.results if text.strip() else self.model
+        if text.strip():
+            self.results.search(text)
+        if self.hst.model() is not model:
+            self.hst.setModel(model)
+            self.hst.setUniformItemSizes(model is self.model) # Results are two lines
+            self.hst.selectionModel().currentChanged.connect(self.on_current)
+
+    def on_current(self, current, previous=None):
+        self.text_changed(current.data(Qt.ItemDataRole.UserRole))
+
     def text_changed(self, s):
         if self.main_window and s:
-            self.main_window.add_new_tab(QUrl(s))
+            self.main_window.open_history(s)
             
 class uiWindow(QDialog): # UI settings
     def __init__(self, main_window, parent=None):
         super().__init__(parent)
         self.main_window = main_window
         self.setWindowTitle("UI Edit")
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
         self.setGeometry(100, 100, 400, 100)
         self.setModal(True)
 
-        self.bg = getattr(main_window, 'bg', '#ffffff')
-        self.color = getattr(main_window, 'color', '#000000')
-        self.button = getattr(main_window, 'button', '#0000ff')
+        self.bg, self.color, self.button = get_ui()
 
         layout = QVBoxLayout()
 
-        self.btn_bg = QPushButton(get_locale("redactbg"))
-        self.btn_color = QPushButton(get_locale("redactcolor"))
-        self.btn_button = QPushButton(get_locale("redactbutton"))
+        self.theme_combo = QComboBox()
+        self.theme_combo.addItems(["—"] + list(theme.THEMES))
+        self.theme_combo.setCurrentText(theme.find(self.bg, self.color, self.button) or "—")
+        self.theme_combo.currentTextChanged.connect(self.on_theme_changed)
+        layout.addWidget(self.theme_combo)
+
+        self.btn_bg = tr.bind(QPushButton(), "redactbg")
+        self.btn_color = tr.bind(QPushButton(), "redactcolor")
+        self.btn_button = tr.bind(QPushButton(), "redactbutton")
         
         self.btn_bg.clicked.connect(lambda: self.open_color_picker('bg'))
         self.btn_color.clicked.connect(lambda: self.open_color_picker('color'))
@@ -226,45 +256,111 @@ class uiWindow(QDialog): # UI settings
         layout.addWidget(self.btn_color)
         layout.addWidget(self.btn_button)
 
-        self.setLayout(layout)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
 
-    def open_color_picker(self, param):
-        color = QColorDialog.getColor(QColor(getattr(self, param)), self, get_locale("selectcolor"))
-        if color.isValid():
-            setattr(self, param, color.name())
-            set_ui(self.bg, self.color, self.button)
-            update_ui()
+        self.setLayout(layout)
+        get_theme().scope(self)
+
+    def on_theme_changed(self, name):
+        if name in theme.THEMES:
+            self.bg, self.color, self.button = theme.THEMES[name]
+            get_theme().preview(self.bg, self.color, self.button)
+
+    def open_color_picker(self, param): # Live preview while picking, nothing is saved until OK
+        picker = QColorDialog(QColor(getattr(self, param)), self)
+        picker.setWindowTitle(get_locale("selectcolor"))
+        picker.currentColorChanged.connect(lambda color: get_theme().preview(*self.with_color(param, color.name())))
+        if picker.exec():
+            setattr(self, param, picker.selectedColor().name())
+            self.theme_combo.setCurrentText(theme.find(self.bg, self.color, self.button) or "—")
+        get_theme().apply(self.bg, self.color, self.button)
+
+    def with_color(self, param, color):
+        colors = {"bg": self.bg, "color": self.color, "button": self.button}
+        colors[param] = color
+        return colors["bg"], colors["color"], colors["button"]
 
     def accept(self):
-        self.main_window.bg = self.bg
-        self.main_window.color = self.color
-        self.main_window.button = self.button
-        super().accept()        
+        set_ui(self.bg, self.color, self.button)
+        update_ui()
+        super().accept()
+
+    def reject(self):
+        update_ui() # Back to the saved colors
+        super().reject()
+
 class MainWindow(QMainWindow): # The base
+    index_built = pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("qBrowser")
         x,y = get_current_resolution()
-        if x > resolution.width-65 or y > resolution.height-65:
-            x = int(resolution.width / 2)
-            y = int(resolution.height / 2)
+        width, height = resolution.size()
+        if x > width-65 or y > height-65:
+            x = int(width / 2)
+            y = int(height / 2)
         self.setGeometry(100, 100, x, y)
         self.setWindowIcon(QIcon("icon.png"))
         
         global current_language
         current_language = get_current_language()
+        tr.set_language(current_language)
+        tr.changed.connect(self.update_ui_texts)
         
-        self.tab_widget = QTabWidget(self)
+        self.favicons = tabs.FaviconCache()
+        self.tabs = tabs.TabModel(self.tab_label, self.favicons, self) # Row lookups and batched title/icon updates
+        self.tabs.flushed.connect(self.save_session)
+        self.tab_widget = tabs.TabWidget(self.tabs, self)
         self.tab_widget.setTabsClosable(True)
         self.tab_widget.tabCloseRequested.connect(self.close_tab)
+        self.tab_widget.tabBar().setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.tab_widget.tabBar().customContextMenuRequested.connect(self.tab_menu)
         self.setCentralWidget(self.tab_widget)
+        self.restoring = False
+        self.tab_widget.currentChanged.connect(self.on_tab_changed) # Before anything that expects a view
+        self.tab_widget.tabBar().tabMoved.connect(self.save_session)
+        self.lifecycle = lifecycle.TabLifecycle(self.tab_widget)
+        self.telemetry = telemetry.Telemetry(self) # Records only while debug is on
+        self.telemetry_panel = telemetry.TelemetryPanel(self.telemetry, self)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.telemetry_panel)
+        self.tab_list = tabs.TabList(self.tabs, self.tab_widget, self)
+        tr.bind(self.tab_list, "tabs", "setWindowTitle")
+        tr.bind(self.tab_list.filter, "tabsearch", "setPlaceholderText")
+        self.tab_list.close_requested.connect(self.close_tab)
+        self.tab_list.visibilityChanged.connect(lambda shown: self.tab_widget.tabBar().setVisible(not shown))
+        self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.tab_list)
+        self.tab_list.setVisible(bool(settings.get_int("vertical_tabs", 0)))
+        self.tab_search_action = QAction(self)
+        self.tab_search_action.setShortcut("Ctrl+Shift+A")
+        self.tab_search_action.triggered.connect(self.tab_list.focus_search)
+        self.addAction(self.tab_search_action)
+        self.downloads = downloads.Downloads(parent=self) # Queue, caps and the journal that carries them over restarts
+        self.downloads_panel = downloads.DownloadPanel(self.downloads, self)
+        tr.bind(self.downloads_panel, "downloads", "setWindowTitle")
+        for button, key in ((self.downloads_panel.pause_button, "dlpause"), (self.downloads_panel.resume_button, "dlresume"),
+                            (self.downloads_panel.cancel_button, "dlcancel"), (self.downloads_panel.clear_button, "dlclear"),
+                            (self.downloads_panel.folder_button, "dlfolder")):
+            tr.bind(button, key)
+        self.downloads.started.connect(self.downloads_panel.show)
+        self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.downloads_panel)
+        self.downloads_panel.hide()
+        self.blocked_tabs = set() # Tabs whose blocked counter changed since the last repaint
+        self.blocked_timer = QTimer(self)
+        self.blocked_timer.setSingleShot(True)
+        self.blocked_timer.setInterval(250)
+        self.blocked_timer.timeout.connect(self.flush_blocked)
 
         self.toolbar = self.addToolBar("Navigation")
+        get_theme().scope(self.toolbar)
         
-        self.back_action = QAction(get_locale("bk"), self)
+        self.back_action = tr.bind(QAction(self), "bk")
         self.back_action.triggered.connect(self.on_back)
         
-        self.forward_action = QAction(get_locale("fw"), self)
+        self.forward_action = tr.bind(QAction(self), "fw")
         self.forward_action.triggered.connect(self.on_forward)
         
         self.toolbar.addAction(self.back_action)
@@ -275,26 +371,54 @@ class MainWindow(QMainWindow): # The base
         self.toolbar.addWidget(left_spacer)
         
         self.search_bar = QLineEdit(self)
-        self.search_bar.setPlaceholderText(get_locale("gstr"))
+        tr.bind(self.search_bar, "gstr", "setPlaceholderText")
         self.search_bar.returnPressed.connect(self.on_search)
+        self.search_bar.textEdited.connect(self.suggest)
         self.toolbar.addWidget(self.search_bar)
+        self.speculator = speculate.Speculator(profile.new_page, self) # Warms DNS and sockets before the user commits
+        self.speculator.watch(self.search_bar, lambda: [search.GetCurrentSearchEngine(2)])
+        self.prerender = speculate.Prerenderer(self.new_view, lambda: search.GetCurrentSearchEngine(2), self)
+        self.control = None # Set in __main__ when --control or the control config asks for it
+        self.instance = None # Local server later launches forward their URLs to, set in __main__
+
+        self.omnibox = omnibox.FrecencyIndex() # Replaced by the full index once it is built off-thread
+        self.omnibox.pending = []
+        self.index_built.connect(self.on_index_built)
+        # Rows are read on the writer thread in queue order, after every visit queued before this and before any pending collects
+        history.store.after_writes(lambda: omnibox.build(history.store.rows().fetchall(), self.index_built.emit))
+        self.suggestions = QStringListModel(self)
+        self.completer = QCompleter(self.suggestions, self)
+        self.completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.completer.setWidget(self.search_bar)
+        self.completer.activated.connect(self.open_suggestion)
         
-        self.search_button = QPushButton(get_locale("gsearch"), self)
+        self.search_button = tr.bind(QPushButton(self), "gsearch")
         self.search_button.clicked.connect(self.on_search)
         self.toolbar.addWidget(self.search_button)
 
         self.voice_button = QPushButton("🎙️", self)
         self.voice_button.clicked.connect(self.callvoice)
         self.toolbar.addWidget(self.voice_button)
+        self.voice = voice.VoiceSearch(self) # Capture and recognition run off the Qt thread
+        self.voice.partial.connect(self.search_bar.setText)
+        self.voice.finished.connect(self.on_voice)
+        self.voice.failed.connect(lambda _: self.voice_button.setEnabled(True))
+
+        self.lite_button = QPushButton("🪶", self) # Lite mode for the current site, right click for all sites
+        self.lite_button.setCheckable(True)
+        self.lite_button.clicked.connect(self.toggle_lite)
+        self.lite_button.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
+        self.lite_button.customContextMenuRequested.connect(self.lite_menu)
+        self.toolbar.addWidget(self.lite_button)
         
         right_spacer = QWidget()
         right_spacer.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
         self.toolbar.addWidget(right_spacer)
         
-        self.home_action = QAction(get_locale("home"), self)
+        self.home_action = tr.bind(QAction(self), "home")
         self.home_action.triggered.connect(self.on_home)
         
-        self.new_tab_action = QAction(get_locale("ntab"), self)
+        self.new_tab_action = tr.bind(QAction(self), "ntab")
         self.new_tab_action.triggered.connect(self.on_new_tab)
         
         self.settings_action = QAction("⚙️", self)
@@ -303,42 +427,160 @@ class MainWindow(QMainWindow): # The base
         self.toolbar.addAction(self.home_action)
         self.toolbar.addAction(self.new_tab_action)
         self.toolbar.addAction(self.settings_action)
+        self.downloads_action = self.downloads_panel.toggleViewAction() # Named after the panel's title
+        self.downloads_action.setShortcut("Ctrl+J")
+        self.toolbar.addAction(self.downloads_action)
         
         self.tab_widget.currentChanged.connect(self.update_actions)
         
-        self.add_new_tab()
+        if not (settings.get_int("restore_session", 1) and self.restore_session()):
+            self.add_new_tab()
+        self.prerender.schedule() # After the first tab, it should not compete with it
     
-    def add_new_tab(self, url=None):
+    def new_view(self, url): # A loading view with no tab yet, the prerenderer keeps one hidden
         browser = QWebEngineView()
-        browser.setUrl(url if url else QUrl(search.GetCurrentSearchEngine(2)))
+        page = profile.new_page(browser)
+        browser.setPage(page)
+        browser.blocker, browser.saver = self.page_hooks(browser, page) # Before setUrl, the first navigation is already lite
+        self.downloads.attach(browser.page().profile()) # Also before setUrl, a link straight to a file downloads
+        browser.setUrl(url)
+        return browser
+
+    def page_hooks(self, browser, page): # Blocker, lite saver and load hooks of one page, again for a page swapped into a tab
+        blocker = adblock.attach(page)
+        if blocker:
+            blocker.blocked_changed.connect(partial(self.on_blocked, browser))
+            page.loadStarted.connect(blocker.reset)
+        saver = lite.attach(page, blocker)
+        saver.measured.connect(partial(self.on_lite_measured, browser))
+        page.loadFinished.connect(partial(profile.collect_cache_stats, page))
+        page.loadFinished.connect(partial(snapshot.store.capture, page))
+        page.loadFinished.connect(partial(fulltext.store.capture, page))
+        return blocker, saver
+
+    def create_browser(self, url, browser=None):
+        browser = browser or self.new_view(url)
         browser.titleChanged.connect(self.update_tab_title)
+        browser.iconChanged.connect(partial(self.on_icon, browser))
+        browser.urlChanged.connect(self.AddHistory)
+        browser.urlChanged.connect(lambda: self.tabs.changed(browser)) # The session is saved once per frame, by flushed
         browser.loadFinished.connect(self.update_actions)
+        self.lifecycle.track(browser)
+        self.telemetry.attach(browser)
+        return browser
+
+    def add_new_tab(self, url=None):
+        home = search.GetCurrentSearchEngine(2)
+        prerendered = None if url else self.prerender.take(home)
+        browser = self.create_browser(url if url else QUrl(home), prerendered)
         index = self.tab_widget.addTab(browser, get_locale("ntab"))
         self.tab_widget.setCurrentIndex(index)
+        if prerendered: # Its title and url signals fired before anything was connected
+            self.tabs.changed(prerendered)
+            self.AddHistory(prerendered.url())
+            self.save_session()
+
+    def restore_session(self): # Placeholders only, a tab gets its view when first selected
+        tabs, active = session.journal.load()
+        self.restoring = True
+        for tab in tabs:
+            self.tab_widget.addTab(session.LazyTab(tab["url"], tab.get("title", "")), tab.get("title") or get_locale("ntab"))
+        self.restoring = False
+        if tabs:
+            self.tab_widget.setCurrentIndex(active)
+            self.on_tab_changed(active)
+        return bool(tabs)
+
+    def on_tab_changed(self, index):
+        if self.restoring:
+            return
+        placeholder = self.tab_widget.widget(index)
+        if isinstance(placeholder, session.LazyTab):
+            browser = self.create_browser(QUrl(placeholder.url))
+            self.tab_widget.insertTab(index, browser, self.tab_widget.tabText(index))
+            self.tab_widget.setCurrentIndex(index)
+            self.tab_widget.removeTab(index + 1)
+            placeholder.deleteLater()
+        self.save_session()
+
+    def save_session(self):
+        tabs = [(snapshot.store.original(url), title) for url, title in self.open_tabs()]
+        session.journal.record(tabs, self.tab_widget.currentIndex())
     
-    def update_tab_title(self, title):
+    def update_tab_title(self, title): # The label follows on the next frame, with the session save
         browser = self.sender()
         if browser:
-            index = self.tab_widget.indexOf(browser)
-            if index != -1:
-                self.tab_widget.setTabText(index, title if title else get_locale("ntab"))
+            history.store.set_title(browser.url().toString(), title)
+            self.omnibox.set_title(browser.url().toString(), title)
+            self.tabs.changed(browser)
+
+    def on_icon(self, browser, icon):
+        self.favicons.put(browser.url().toString(), icon)
+        self.tabs.changed(browser)
+
+    def tab_label(self, browser, title):
+        label = title if title else get_locale("ntab")
+        blocker = getattr(browser, "blocker", None)
+        if blocker and blocker.blocked:
+            label += f" [{blocker.blocked}]" # Requests stopped by the content blocker
+        return label
+
+    def on_blocked(self, browser, count): # A busy page blocks dozens per second, repaint at most 4 times
+        self.blocked_tabs.add(browser)
+        if not self.blocked_timer.isActive():
+            self.blocked_timer.start()
+
+    def flush_blocked(self):
+        for browser in self.blocked_tabs:
+            self.tabs.changed(browser)
+        self.blocked_tabs.clear()
     
     def update_actions(self):
         current_browser = self.tab_widget.currentWidget() # Current tab
 
-        for i in range(self.tab_widget.count()):
-            current_title = self.tab_widget.tabText(i)
-            try: # Crash fix 23.04.2026
-                rpc.UpdateRPC(f"Browsing {current_title}") # RPC Current tab
-            except:
-                pass
+        current_title = self.tab_widget.tabText(self.tab_widget.currentIndex())
+        if isinstance(current_browser, QWebEngineView):
+            current_title = current_browser.title() or current_title # Without the blocked counter
+        rpc.UpdateRPC(f"Browsing {current_title}") # RPC Current tab, queued to the presence worker
 
-        if current_browser:
+        if isinstance(current_browser, QWebEngineView):
             self.back_action.setEnabled(current_browser.history().canGoBack())
             self.forward_action.setEnabled(current_browser.history().canGoForward())
         else:
             self.back_action.setEnabled(False)
             self.forward_action.setEnabled(False)
+        self.update_lite_button()
+
+    def update_lite_button(self):
+        browser = self.tab_widget.currentWidget()
+        is_view = isinstance(browser, QWebEngineView)
+        self.lite_button.setEnabled(is_view)
+        self.lite_button.setChecked(is_view and lite.enabled_for(browser.url().toString()))
+        summary = browser.saver.summary() if is_view else ""
+        self.lite_button.setToolTip(get_locale("lite") + (f"\n{summary}" if summary else ""))
+
+    def toggle_lite(self, checked): # Per site, the reload picks the new rule up as it starts
+        browser = self.tab_widget.currentWidget()
+        if isinstance(browser, QWebEngineView):
+            lite.set_site(browser.url().toString(), checked)
+            browser.reload()
+        self.update_lite_button()
+
+    def lite_menu(self, pos):
+        menu = QMenu(self)
+        everywhere = menu.addAction(get_locale("liteall"))
+        everywhere.setCheckable(True)
+        everywhere.setChecked(bool(settings.get_int("lite", 0)))
+        everywhere.triggered.connect(self.set_lite_everywhere)
+        menu.exec(self.lite_button.mapToGlobal(pos))
+
+    def set_lite_everywhere(self, checked): # Sites with their own rule keep it
+        settings.set("lite", int(checked))
+        self.update_lite_button()
+
+    def on_lite_measured(self, browser):
+        if browser is self.tab_widget.currentWidget():
+            self.update_lite_button()
     
     def on_back(self):
         current_browser = self.tab_widget.currentWidget()
@@ -364,56 +606,144 @@ class MainWindow(QMainWindow): # The base
     def on_search(self):
         current_browser = self.tab_widget.currentWidget()
         query = self.search_bar.text().strip()
+        self.speculator.cancel() # The real navigation is starting, hints would only compete
         if current_browser and query:
-            search_url = f"{search.GetCurrentSearchEngine(2)}/search?q={query}"
-            current_browser.setUrl(QUrl(search_url))
-            self.AddHistory(search_url)
+            current_browser.setUrl(QUrl(router.route(query))) # URL, host, file, bang or a search
             self.update_actions()
     
-    def AddHistory(self, url):
-        with open(history_path, 'a+', encoding='utf-8') as f: 
-            f.write(url + "\n")
+    def AddHistory(self, url): # Queued, the history writer thread batches it to disk
+        url = url.toString() if isinstance(url, QUrl) else url
+        if snapshot.store.is_snapshot(url): # Recorded as the real page once the refresh lands
+            return
+        history.store.add_visit(url)
+        if url.startswith(history.RECORD_SCHEMES):
+            self.omnibox.add_visit(url)
+
+    def open_history(self, url): # A saved snapshot shows at once, the live page loads hidden and is swapped in
+        path = snapshot.store.lookup(url)
+        if not path:
+            self.add_new_tab(QUrl(url))
+            return
+        snapshot_url = QUrl.fromLocalFile(path)
+        self.add_new_tab(snapshot_url)
+        browser = self.tab_widget.currentWidget()
+        page = profile.new_page(browser)
+        blocker, saver = self.page_hooks(browser, page)
+        def refreshed(ok): # Offline the snapshot just stays
+            page.loadFinished.disconnect(refreshed) # Redirects can finish more than once
+            if not (ok and self.tab_widget.indexOf(browser) != -1 and browser.url() == snapshot_url):
+                page.deleteLater()
+                return
+            old = browser.page()
+            browser.setPage(page) # The page already loaded, nothing is fetched twice
+            browser.blocker, browser.saver = blocker, saver
+            old.deleteLater() # setPage changed the view's URL, urlChanged already recorded the visit
+            self.tabs.changed(browser)
+            self.save_session()
+            self.update_actions()
+        page.loadFinished.connect(refreshed)
+        page.load(QUrl(url))
+
+    def on_index_built(self, index):
+        self.omnibox = omnibox.adopt(self.omnibox, index)
+
+    def open_tabs(self):
+        for widget in self.tabs.widgets:
+            yield self.tabs.url(widget), self.tabs.title(widget)
+
+    def suggest(self, text): # Runs per keystroke, the indexes answer within a few milliseconds
+        text = text.strip()
+        if not text:
+            self.completer.popup().hide()
+            return
+        kind, target = router.classify(text, search.GetCurrentSearchEngine(3))
+        urls = [target] if kind in ("url", "host", "file", "bang") else [] # What Enter would open comes first
+        for url, _ in omnibox.match_tabs(self.open_tabs(), text) + self.omnibox.query(text):
+            if url not in urls:
+                urls.append(url)
+        if len(text) >= fulltext.SUGGEST_MIN: # Pages whose text matches, after the ones whose address or title does
+            for _, url, _ in fulltext.store.search(text, fulltext.SUGGESTIONS):
+                if url not in urls:
+                    urls.append(url)
+        self.suggestions.setStringList(urls)
+        self.speculator.hint([target] + urls[:2])
+        if urls:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def open_suggestion(self, url):
+        for i, (tab_url, _) in enumerate(self.open_tabs()):
+            if tab_url == url: # Already open, switch instead of loading it twice
+                self.tab_widget.setCurrentIndex(i)
+                return
+        current_browser = self.tab_widget.currentWidget()
+        if isinstance(current_browser, QWebEngineView):
+            current_browser.setUrl(QUrl(url))
+            self.update_actions()
 
     def callvoice(self):
-        query = voice()
+        if self.voice.start():
+            self.voice_button.setEnabled(False)
+
+    def on_voice(self, query):
+        self.voice_button.setEnabled(True)
+        if query:
+            self.search_bar.setText(query)
         current_browser = self.tab_widget.currentWidget()
         if current_browser and query:
-            current_browser.setUrl(QUrl(f"{search.GetCurrentSearchEngine(2)}/search?q={query}"))
+            current_browser.setUrl(QUrl(router.route(query)))
             self.update_actions()
 
     def close_tab(self, index):
         if self.tab_widget.count() == 1:
-            exit(0)
+            self.close() # Goes through closeEvent, so the session keeps this last tab
+            return
+        browser = self.tab_widget.widget(index)
+        self.lifecycle.forget(browser)
+        self.blocked_tabs.discard(browser)
+        self.telemetry.forget(browser)
         self.tab_widget.removeTab(index)
+        browser.deleteLater() # removeTab keeps the view and its renderer alive otherwise
         self.update_actions()
+        self.save_session()
+
+    def tab_menu(self, pos):
+        index = self.tab_widget.tabBar().tabAt(pos)
+        browser = self.tab_widget.widget(index)
+        if browser is None:
+            return
+        menu = QMenu(self)
+        pin = menu.addAction(get_locale("pin"))
+        pin.setCheckable(True)
+        pin.setChecked(browser in self.lifecycle.pinned)
+        pin.triggered.connect(lambda: self.lifecycle.toggle_pin(browser))
+        menu.exec(self.tab_widget.tabBar().mapToGlobal(pos))
     
     def opensettings(self):
         settings_window = SettingsWindow(self)
         settings_window.exec()
     
-    def update_ui_texts(self):
-        sett = SettingsWindow(self)
-        ui = uiWindow(self)
-        self.back_action.setText(get_locale("bk"))
-        self.forward_action.setText(get_locale("fw"))
-        self.search_bar.setPlaceholderText(get_locale("gstr"))
-        self.search_button.setText(get_locale("gsearch"))
-        self.home_action.setText(get_locale("home"))
-        self.new_tab_action.setText(get_locale("ntab"))
-        sett.history_button.setText(get_locale("hst"))
-        ui.btn_bg.setText(get_locale("redactbg"))
-        ui.btn_color.setText(get_locale("redactbutton"))
-        ui.btn_button.setText(get_locale("redactcolor"))
-        for i in range(self.tab_widget.count()):
-            browser = self.tab_widget.widget(i)
-            current_title = self.tab_widget.tabText(i)
-            if current_title == "Loading..." or current_title == get_locale("ntab"):
-                self.tab_widget.setTabText(i, get_locale("ntab"))
+    def update_ui_texts(self, old_language, language): # Only tab titles, bound widgets retranslate themselves
+        self.tabs.refresh() # Untitled tabs pick up the new "New Tab" in one batch
 
     def closeEvent(self, a0):
         x = self.width()
         y = self.height()
         set_resolution(x,y)
+        settings.flush()
+        self.save_session()
+        session.journal.flush()
+        history.store.close()
+        snapshot.store.close()
+        fulltext.store.close()
+        self.downloads.close()
+        self.voice.stop()
+        self.speculator.cancel()
+        self.prerender.cancel()
+        self.telemetry.close()
+        if self.control: self.control.close()
+        if self.instance: self.instance.close()
         return super().closeEvent(a0)
 
     def resizeEvent(self, a0):
@@ -427,11 +757,32 @@ class MainWindow(QMainWindow): # The base
 
         return super().resizeEvent(a0)
 
-if __name__ == '__main__':
-    vcheck.CHECK_UPDATE() # Checking current version and version.txt from github
+def first_load(ok): # Time to first paint, the number startup is tuned for
+    if startup.mark_once("first loadFinished"):
+        startup.report()
+
+def deferred_startup(): # Network and devices, after the window is already up
+    startup.background("update check", vcheck.CHECK_UPDATE) # Checking current version and version.txt from github
     if rpc.get_rpc() == 1: rpc.StartRPC()
+    window.downloads.restore(profile.get_profile()) # Unfinished downloads of the last run
+    startup.mark("deferred startup queued")
+
+if __name__ == '__main__':
+    if "--debug" in sys.argv: debug.set_debug(True)
+    startup.mark("imports")
+    perfprofile.apply_flags() # Chromium reads them once, when QtWebEngine starts
     app = QApplication(sys.argv)
-    window = MainWindow()
     update_ui()
+    startup.mark("QApplication")
+    window = MainWindow()
+    startup.mark("MainWindow")
     window.show()
+    startup.mark("window shown")
+    if "--control" in sys.argv or settings.get_int("control", 0): # Opt-in JSON-RPC for scripts and load tests
+        window.control = control.ControlServer(window)
+    if instance.takes_over(sys.argv): window.instance = instance.listen(window)
+    for url in instance.urls(sys.argv): window.add_new_tab(QUrl.fromUserInput(url, os.getcwd()))
+    current = window.tab_widget.currentWidget()
+    if isinstance(current, QWebEngineView): current.loadFinished.connect(first_load)
+    QTimer.singleShot(0, deferred_startup)
     app.exec()
\ No newline at end of file
@@ -0,0 +1,278 @@
+import os, re, glob, pickle, hashlib, time
+from PyQt6.QtCore import pyqtSignal
+from PyQt6.QtWebEngineCore import QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+from qb.core import *
+from qb import debug
+from qb.config import settings
+
+FORMAT = 1 # Bump when the compiled layout changes, old caches are then rebuilt
+Type = QWebEngineUrlRequestInfo.ResourceType
+TYPES = { # EasyList $option -> Qt resource types
+    "script": {Type.ResourceTypeScript},
+    "image": {Type.ResourceTypeImage, Type.ResourceTypeFavicon},
+    "stylesheet": {Type.ResourceTypeStylesheet},
+    "font": {Type.ResourceTypeFontResource},
+    "media": {Type.ResourceTypeMedia},
+    "object": {Type.ResourceTypeObject, Type.ResourceTypePluginResource},
+    "subdocument": {Type.ResourceTypeSubFrame},
+    "xmlhttprequest": {Type.ResourceTypeXhr},
+    "ping": {Type.ResourceTypePing, Type.ResourceTypeCspReport},
+    "websocket": {Type.ResourceTypeWebSocket},
+    "other": {Type.ResourceTypeSubResource, Type.ResourceTypePrefetch, Type.ResourceTypeUnknown},
+}
+KINDS = {qt: name for name, qts in TYPES.items() for qt in qts} # Rules keep names, so the cache never pickles Qt enums
+IGNORED_OPTIONS = {"match-case", "collapse", "~collapse", "1p", "first-party"} # Accepted but no effect here
+tokens_of = re.compile(r"[a-z0-9%]{2,}").findall
+host_of = re.compile(r"[a-z][a-z0-9+.-]*://(?:[^/?#@]*@)?\[?([^/?#:\]]*)").match # urlsplit is most of the cost otherwise
+
+class Rule: # One network filter, the regex is compiled on its first test
+    __slots__ = ("pattern", "source", "regex", "types", "third", "include", "exclude")
+
+    def __init__(self, pattern, source, types, third, include, exclude):
+        self.pattern, self.source, self.regex = pattern, source, None
+        self.types, self.third, self.include, self.exclude = types, third, include, exclude
+
+    def __getstate__(self):
+        return (self.pattern, self.source, self.types, self.third, self.include, self.exclude)
+
+    def __setstate__(self, state):
+        self.pattern, self.source, self.types, self.third, self.include, self.exclude = state
+        self.regex = None
+
+    def matches(self, url, host, kind, third_party, origin):
+        if self.types is not None and kind not in self.types:
+            return False
+        if self.third is not None and self.third != third_party:
+            return False
+        if self.include and not in_domains(origin, self.include):
+            return False
+        if self.exclude and in_domains(origin, self.exclude):
+            return False
+        if self.regex is None:
+            self.regex = re.compile(self.source)
+        return self.regex.search(url) is not None
+
+def parents(host): # a.b.example.com -> a.b.example.com, b.example.com, example.com, com
+    while host:
+        yield host
+        host = host.partition(".")[2]
+
+def in_domains(host, domains):
+    return any(part in domains for part in parents(host))
+
+# Two-level public suffixes common enough to matter, the rest count as one level: www.web.de is web.de
+SUFFIXES = frozenset("""
+co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk net.uk sch.uk nhs.uk
+com.au net.au org.au edu.au gov.au asn.au id.au
+co.jp ne.jp or.jp ac.jp go.jp ed.jp gr.jp ad.jp lg.jp
+co.nz net.nz org.nz govt.nz ac.nz school.nz geek.nz
+co.za org.za gov.za ac.za net.za web.za
+co.kr or.kr ne.kr go.kr ac.kr re.kr
+co.in net.in org.in firm.in gen.in ind.in ac.in gov.in edu.in res.in
+co.id or.id ac.id go.id web.id
+co.il org.il net.il ac.il gov.il
+co.th in.th ac.th go.th or.th
+com.br net.br org.br gov.br edu.br
+com.cn net.cn org.cn gov.cn edu.cn ac.cn
+com.tw net.tw org.tw gov.tw edu.tw idv.tw
+com.hk net.hk org.hk gov.hk edu.hk idv.hk
+com.sg net.sg org.sg gov.sg edu.sg
+com.my net.my org.my gov.my edu.my
+com.mx net.mx org.mx gob.mx edu.mx
+com.ar net.ar org.ar gob.ar edu.ar
+com.tr net.tr org.tr gov.tr edu.tr gen.tr
+com.ua net.ua org.ua gov.ua edu.ua in.ua kiev.ua
+com.ru net.ru org.ru pp.ru msk.ru spb.ru
+com.pl net.pl org.pl gov.pl edu.pl
+com.vn net.vn org.vn gov.vn edu.vn
+com.ph net.ph org.ph gov.ph edu.ph
+com.pk net.pk org.pk gov.pk edu.pk
+com.eg com.sa com.ng com.co com.pe com.ve com.ec com.uy com.bd com.np com.lk
+""".split())
+
+def site(host): # Registrable domain for the third-party check
+    parts = host.split(".")
+    if len(parts) > 2 and ".".join(parts[-2:]) in SUFFIXES:
+        return ".".join(parts[-3:])
+    return ".".join(parts[-2:])
+
+def to_regex(pattern):
+    if pattern.startswith("/") and pattern.endswith("/") and len(pattern) > 2:
+        return pattern[1:-1]
+    source = ""
+    if pattern.startswith("||"):
+        source, pattern = r"^[a-z][a-z0-9+.-]*://([^/?#]*\.)?", pattern[2:]
+    elif pattern.startswith("|"):
+        source, pattern = "^", pattern[1:]
+    end = pattern.endswith("|")
+    if end:
+        pattern = pattern[:-1]
+    for char in pattern:
+        match char:
+            case "*": source += ".*"
+            case "^": source += r"(?:[^a-z0-9_\-.%]|$)"
+            case _: source += re.escape(char)
+    return source + ("$" if end else "")
+
+def rule_token(pattern, index): # Rarest complete token, or "" when every token could be cut short
+    if pattern.startswith("/") and pattern.endswith("/"):
+        return ""
+    best = ""
+    body = pattern.lstrip("|")
+    for match in re.finditer(r"[a-z0-9%]{2,}", body):
+        start, end = match.span()
+        before = body[start - 1] if start else ("|" if pattern.startswith("|") else "*")
+        after = body[end] if end < len(body) else "*"
+        if before == "*" or after == "*": # Could be part of a longer token in the URL
+            continue
+        token = match.group()
+        if not best or len(index.get(token, ())) < len(index.get(best, ())):
+            best = token
+    return best
+
+class FilterSet:
+    def __init__(self):
+        self.block_hosts = set() # ||host^ with no options, by far the most common rule
+        self.allow_hosts = set()
+        self.block = {} # token -> [Rule]
+        self.allow = {}
+        self.rules = 0
+
+    def add_line(self, line):
+        line = line.strip()
+        if not line or line[0] in "![" or "##" in line or "#@#" in line or "#?#" in line or "#$#" in line:
+            return
+        allow = line.startswith("@@")
+        if allow:
+            line = line[2:]
+        pattern, options = line, ""
+        if "$" in line and not (line.startswith("/") and line.endswith("/")):
+            pattern, _, options = line.rpartition("$")
+        pattern = pattern.lower()
+        types, third, include, exclude, negated = None, None, set(), set(), set()
+        for option in filter(None, options.lower().split(",")):
+            name = option.lstrip("~")
+            if option in ("third-party", "3p"):
+                third = True
+            elif option in ("~third-party", "~3p"):
+                third = False
+            elif option.startswith("domain="):
+                for domain in option[7:].split("|"):
+                    (exclude if domain.startswith("~") else include).add(domain.lstrip("~"))
+            elif name in TYPES:
+                if option.startswith("~"):
+                    negated.add(name)
+                else:
+                    types = (types or set()) | {name}
+            elif option not in IGNORED_OPTIONS:
+                return # csp=, redirect=, popup and friends need more than a request hook
+        if negated:
+            types = (types or set(TYPES)) - negated
+        if not pattern or pattern in ("*", "|", "||"):
+            return
+        hosts = self.allow_hosts if allow else self.block_hosts
+        host = pattern[2:].rstrip("^/") if pattern.startswith("||") else ""
+        if host and not options and re.fullmatch(r"[a-z0-9.-]+", host) and pattern[2 + len(host):] in ("", "^", "/", "^|"):
+            hosts.add(host)
+        else:
+            index = self.allow if allow else self.block
+            rule = Rule(pattern, to_regex(pattern), frozenset(types) if types is not None else None,
+                        third, frozenset(include) or None, frozenset(exclude) or None) # None pickles smaller than empty sets
+            index.setdefault(rule_token(pattern, index), []).append(rule)
+        self.rules += 1
+
+    def check(self, index, url, host, kind, third_party, origin):
+        for token in [""] + list(dict.fromkeys(tokens_of(url))):
+            for rule in index.get(token, ()):
+                if rule.matches(url, host, kind, third_party, origin):
+                    return rule
+        return None
+
+    def should_block(self, url, origin="", kind=None):
+        url, kind = url.lower(), KINDS.get(kind, "other")
+        match = host_of(url)
+        host = match.group(1) if match else ""
+        third_party = bool(origin) and site(host) != site(origin)
+        blocked = in_domains(host, self.block_hosts) or self.check(self.block, url, host, kind, third_party, origin)
+        if not blocked:
+            return False
+        return not (in_domains(host, self.allow_hosts) or self.check(self.allow, url, host, kind, third_party, origin))
+
+def list_files():
+    return sorted(glob.glob(os.path.join(filters_path, "*.txt")))
+
+def fingerprint(files):
+    digest = hashlib.sha1(str(FORMAT).encode())
+    for path in files:
+        stat = os.stat(path)
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+def compile_lists(files):
+    filters = FilterSet()
+    for path in files:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                filters.add_line(line)
+    return filters
+
+def load(files=None, cache=adblock_cache_path): # Compiled lists from the cache when the sources are unchanged
+    files = list_files() if files is None else files
+    started = time.perf_counter()
+    key = fingerprint(files)
+    try:
+        with open(cache, "rb") as f:
+            if pickle.load(f) == key:
+                filters = pickle.load(f)
+                if(debug.debug_bool): print(f"Adblock: {filters.rules} rules from cache in {(time.perf_counter() - started) * 1000:.0f} ms")
+                return filters
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        pass
+    filters = compile_lists(files)
+    os.makedirs(os.path.dirname(cache) or ".", exist_ok=True)
+    tmp = cache + ".tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(key, f)
+        pickle.dump(filters, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, cache)
+    if(debug.debug_bool): print(f"Adblock: compiled {filters.rules} rules from {len(files)} lists in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return filters
+
+filters = None
+
+def get_filters():
+    global filters
+    if filters is None:
+        filters = load()
+    return filters
+
+class Blocker(QWebEngineUrlRequestInterceptor): # One per page, so blocked requests can be counted per tab
+    blocked_changed = pyqtSignal(int)
+
+    def __init__(self, filters, parent=None):
+        super().__init__(parent)
+        self.filters = filters
+        self.blocked = 0
+
+    def reset(self):
+        self.blocked = 0
+        self.blocked_changed.emit(0)
+
+    def interceptRequest(self, info):
+        kind = info.resourceType()
+        if kind == Type.ResourceTypeMainFrame: # Never block the page the user asked for
+            return
+        if self.filters.should_block(info.requestUrl().toString(), info.firstPartyUrl().host(), kind):
+            info.block(True)
+            self.blocked += 1
+            self.blocked_changed.emit(self.blocked)
+
+def attach(page): # Returns the page's Blocker, or None when blocking is off or there are no lists
+    if not settings.get_int("adblock", 1):
+        return None
+    filters = get_filters()
+    if not filters.rules:
+        return None
+    blocker = Blocker(filters, page)
+    page.setUrlRequestInterceptor(blocker)
+    return blocker
@@ -0,0 +1,306 @@
+import os, sys, json, time, queue, hashlib, argparse, threading
+from PyQt6.QtCore import Qt, QObject, QTimer, QUrl, QSize, QMarginsF
+from PyQt6.QtGui import QPageLayout, QPageSize
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from qb import debug
+from qb import perfprofile
+
+FORMATS = {"pdf": ".pdf", "png": ".png", "text": ".txt", "html": ".html"}
+PROGRESS_INTERVAL = 5000 # ms between progress lines on stderr
+POLL_INTERVAL = 50 # ms between checks for more streamed input while idle
+RETRY_DELAY = 1.0 # Seconds before the first retry of a URL, doubled for each one after
+RESET_TIMEOUT = 5000 # ms a slot waits for its blank page after a timeout
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="main.py --batch", description="Render many URLs headless with a pool of reused pages")
+    parser.add_argument("input", nargs="?", default="-", help="file with one URL per line, - for stdin (streamed)")
+    parser.add_argument("--format", choices=FORMATS, default="pdf")
+    parser.add_argument("--out", default="batch_output")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=30, help="seconds per attempt")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--settle", type=int, default=0, help="ms to wait after loadFinished before exporting")
+    parser.add_argument("--size", default="1280x800", help="viewport for png")
+    parser.add_argument("--recycle", type=int, default=200, help="pages per view before it is replaced")
+    parser.add_argument("--checkpoint", help="JSONL of finished URLs, default OUT/checkpoint.jsonl")
+    parser.add_argument("--resume", action="store_true", help="skip URLs the checkpoint has as done")
+    parser.add_argument("--adblock", action="store_true", help="block requests with the filter lists")
+    return parser.parse_args(argv)
+
+def output_name(url, fmt):
+    return hashlib.sha1(url.encode()).hexdigest()[:16] + FORMATS[fmt]
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)] if values else 0
+
+def read_urls(source, jobs, done, skip): # Runs on a thread, so stdin can keep streaming while pages render
+    stream = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        for line in stream:
+            url = line.strip()
+            if url and not url.startswith("#") and url not in skip:
+                jobs.put(url)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        done.set()
+
+def load_checkpoint(path):
+    finished = set()
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue # A line cut short by a crash
+                if record.get("status") == "ok":
+                    finished.add(record["url"])
+    return finished
+
+def main(argv):
+    args = parse_args(argv)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    perfprofile.apply_flags()
+    app = QApplication(sys.argv[:1])
+    runner = BatchRunner(args)
+    runner.start()
+    app.exec()
+    return runner.exit_code()
+
+class Slot(QObject): # One reusable view and the job it is working on
+    def __init__(self, runner, profile, size):
+        super().__init__(runner)
+        self.runner = runner
+        self.view = QWebEngineView()
+        self.view.setPage(QWebEnginePage(profile, self.view))
+        self.view.setAttribute(Qt.WidgetAttribute.WA_DontShowOnScreen)
+        self.view.resize(size)
+        self.view.show() # Offscreen, but it has to be "shown" to paint for png
+        self.blocker = None
+        if runner.args.adblock:
+            from qb import adblock
+            self.blocker = adblock.attach(self.view.page())
+        self.url = None
+        self.resetting = None # Failure reason while the slot loads a blank page after a timeout
+        self.exporting = False # The timeout covers the export too, a killed renderer never answers it
+        self.attempt = 0
+        self.started = 0.0
+        self.uses = 0
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+        self.view.loadFinished.connect(self.on_loaded)
+        self.view.page().pdfPrintingFinished.connect(self.on_pdf)
+
+    def run(self, url, attempt):
+        self.url, self.attempt = url, attempt
+        self.uses += 1
+        self.started = time.perf_counter()
+        self.timer.start(int(self.runner.args.timeout * 1000))
+        self.view.load(QUrl.fromUserInput(url))
+
+    def on_timeout(self):
+        if self.resetting:
+            self.reset_done() # The blank page never came, go on anyway
+        elif self.url is not None:
+            reason = "export timeout" if self.exporting else "timeout"
+            self.exporting = False # A late callback or pdfPrintingFinished is ignored from here
+            self.view.page().triggerAction(QWebEnginePage.WebAction.Stop)
+            self.reset(reason)
+
+    def reset(self, reason): # A late loadFinished from the stopped load lands here, not on the next job
+        self.resetting = reason
+        self.timer.start(RESET_TIMEOUT)
+        self.view.load(QUrl("about:blank"))
+
+    def reset_done(self):
+        reason, self.resetting = self.resetting, None
+        self.timer.stop()
+        self.fail(reason)
+
+    def on_loaded(self, ok):
+        if self.resetting:
+            if ok and self.view.url().toString() == "about:blank":
+                self.reset_done()
+            return
+        if self.url is None or self.exporting or not self.timer.isActive():
+            return
+        self.timer.stop()
+        if not ok:
+            self.fail("load failed")
+            return
+        self.load_ms = (time.perf_counter() - self.started) * 1000
+        QTimer.singleShot(self.runner.args.settle, self.export)
+
+    def export(self):
+        if self.url is None or self.resetting:
+            return
+        fmt = self.runner.args.format
+        path = os.path.join(self.runner.args.out, output_name(self.url, fmt))
+        self.path = path
+        self.exporting = True
+        self.timer.start(int(self.runner.args.timeout * 1000))
+        job = self.uses # Callbacks of a timed-out export must not finish the next job
+        page = self.view.page()
+        match fmt:
+            case "pdf":
+                layout = QPageLayout(QPageSize(QPageSize.PageSizeId.A4), QPageLayout.Orientation.Portrait, QMarginsF())
+                page.printToPdf(path, layout)
+            case "png":
+                self.finish(self.view.grab().save(path))
+            case "text":
+                page.toPlainText(lambda text: self.write(job, path, text))
+            case "html":
+                page.toHtml(lambda html: self.write(job, path, html))
+
+    def write(self, job, path, data):
+        if not self.exporting or job != self.uses:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(data)
+        except OSError as e:
+            if(debug.debug_bool): print(f"Batch: can't write {path} | {e}", file=sys.stderr)
+            self.finish(False)
+            return
+        self.finish(True)
+
+    def on_pdf(self, path, ok):
+        if self.exporting and path == self.path:
+            self.finish(ok)
+
+    def finish(self, ok):
+        self.exporting = False
+        self.timer.stop()
+        if not ok:
+            self.fail("export failed")
+            return
+        url, self.url = self.url, None
+        self.runner.done(self, url, {"status": "ok", "file": self.path, "load_ms": round(self.load_ms, 1),
+                                     "attempts": self.attempt + 1})
+
+    def fail(self, reason):
+        url, self.url = self.url, None
+        self.runner.failed(self, url, self.attempt, reason)
+
+    def close(self):
+        self.timer.stop()
+        self.view.close()
+        self.view.deleteLater()
+        self.deleteLater() # Recycled slots would otherwise stay children of the runner
+
+class BatchRunner(QObject): # Feeds URLs to a fixed number of slots, retries, checkpoints and keeps stats
+    def __init__(self, args):
+        super().__init__()
+        self.args = args
+        os.makedirs(args.out, exist_ok=True)
+        self.checkpoint_path = args.checkpoint or os.path.join(args.out, "checkpoint.jsonl")
+        skip = load_checkpoint(self.checkpoint_path) if args.resume else set()
+        self.skipped = len(skip)
+        self.checkpoint = open(self.checkpoint_path, "a", encoding="utf-8")
+        self.profile = QWebEngineProfile(self) # Off the record, renders leave nothing behind
+        self.profile.setHttpCacheType(QWebEngineProfile.HttpCacheType.MemoryHttpCache)
+        width, height = (int(n) for n in args.size.lower().split("x"))
+        self.size = QSize(width, height)
+        self.jobs = queue.Queue()
+        self.retry = [] # (due, url, attempt) waiting for their delay and a free slot, ahead of new input
+        self.input_done = threading.Event()
+        self.reader = threading.Thread(target=read_urls, args=(args.input, self.jobs, self.input_done, skip), daemon=True)
+        self.slots = [Slot(self, self.profile, self.size) for _ in range(max(args.concurrency, 1))]
+        self.idle = list(self.slots)
+        self.load_times, self.ok, self.errors = [], 0, 0
+        self.began = 0.0
+        self.poll = QTimer(self)
+        self.poll.setInterval(POLL_INTERVAL)
+        self.poll.timeout.connect(self.dispatch)
+        self.progress = QTimer(self)
+        self.progress.setInterval(PROGRESS_INTERVAL)
+        self.progress.timeout.connect(lambda: print(self.summary_line(), file=sys.stderr, flush=True))
+
+    def start(self):
+        self.began = time.perf_counter()
+        self.reader.start()
+        self.poll.start()
+        self.progress.start()
+
+    def next_job(self):
+        now = time.monotonic()
+        for i, (due, url, attempt) in enumerate(self.retry):
+            if due <= now:
+                del self.retry[i]
+                return url, attempt
+        try:
+            return self.jobs.get_nowait(), 0
+        except queue.Empty:
+            return None
+
+    def dispatch(self):
+        while self.idle:
+            job = self.next_job()
+            if job is None:
+                break
+            slot = self.idle.pop()
+            if slot.uses >= self.args.recycle: # Long-lived renderers creep up in memory, start fresh
+                index = self.slots.index(slot)
+                slot.close()
+                slot = self.slots[index] = Slot(self, self.profile, self.size)
+            slot.run(*job)
+        if len(self.idle) == len(self.slots) and self.input_done.is_set() and self.jobs.empty() and not self.retry:
+            self.finish()
+
+    def done(self, slot, url, record):
+        self.ok += 1
+        self.load_times.append(record["load_ms"])
+        self.record(url, record)
+        self.idle.append(slot)
+        self.dispatch()
+
+    def failed(self, slot, url, attempt, reason):
+        if attempt < self.args.retries:
+            self.retry.append((time.monotonic() + RETRY_DELAY * 2 ** attempt, url, attempt + 1))
+        else:
+            self.errors += 1
+            self.record(url, {"status": "error", "error": reason, "attempts": attempt + 1})
+        if(debug.debug_bool): print(f"Batch: {url} {reason} (attempt {attempt + 1})", file=sys.stderr)
+        self.idle.append(slot)
+        self.dispatch()
+
+    def record(self, url, record):
+        self.checkpoint.write(json.dumps({"url": url, **record, "ts": time.time()}) + "\n")
+        self.checkpoint.flush() # A crash loses at most the pages in flight
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.began
+        return {
+            "ok": self.ok,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "seconds": round(elapsed, 2),
+            "pages_per_sec": round(self.ok / elapsed, 2) if elapsed else 0,
+            "load_ms_p50": round(percentile(self.load_times, 50), 1),
+            "load_ms_p95": round(percentile(self.load_times, 95), 1),
+            "concurrency": len(self.slots),
+        }
+
+    def summary_line(self):
+        stats = self.stats()
+        return (f"{stats['ok']} ok, {stats['errors']} failed, {stats['pages_per_sec']} pages/s, "
+                f"p50 {stats['load_ms_p50']} ms, p95 {stats['load_ms_p95']} ms")
+
+    def finish(self):
+        if not self.poll.isActive():
+            return
+        self.poll.stop()
+        self.progress.stop()
+        self.checkpoint.close()
+        print(json.dumps(self.stats()), flush=True)
+        for slot in self.slots:
+            slot.close()
+        QTimer.singleShot(0, QApplication.instance().quit)
+
+    def exit_code(self):
+        return 1 if self.errors else 0
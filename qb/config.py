@@ -0,0 +1,125 @@
+import os, threading, tempfile, time, atexit
+from qb.core import *
+
+FLUSH_DELAY = 0.5 # Seconds to coalesce writes before flushing to disk
+STAT_INTERVAL = 1.0 # Seconds between mtime checks for external edits
+
+def atomic_write(path, data: str): # Write to a temp file and swap it in, never leaves a half-written file
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+class Debouncer: # Runs func once, FLUSH_DELAY after the first of a burst of calls
+    def __init__(self, func, delay=FLUSH_DELAY):
+        self.func = func
+        self.delay = delay
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            if self.timer is None:
+                self.timer = threading.Timer(self.delay, self._fire)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def _fire(self):
+        with self.lock:
+            self.timer = None
+        self.func()
+
+    def cancel(self):
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+class Config: # key=value file parsed once and kept in memory
+    def __init__(self, path, defaults=None):
+        self.path = path
+        self.defaults = dict(defaults or {})
+        self.values = {}
+        self.pending = {} # Keys set since the last flush
+        self.mtime = None
+        self.checked = 0.0
+        self.lock = threading.RLock()
+        self.flush_later = Debouncer(self.flush)
+        self.load()
+        atexit.register(self.flush)
+
+    def load(self):
+        values = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if "=" in line:
+                        key, value = line.strip().split("=", 1)
+                        values[key.strip()] = value.strip()
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self.lock:
+            values.update(self.pending) # Unflushed edits win over the file
+            self.values = values
+            self.mtime = mtime
+            self.checked = time.monotonic()
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if now - self.checked < STAT_INTERVAL:
+            return
+        self.checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self.mtime:
+            self.load()
+
+    def get(self, key, default=None):
+        self.reload_if_changed()
+        value = self.values.get(key)
+        if value is None:
+            return self.defaults.get(key, default)
+        return value
+
+    def get_int(self, key, default=0):
+        try:
+            return int(self.get(key, default))
+        except (TypeError, ValueError):
+            return default
+
+    def set(self, key, value):
+        value = str(value)
+        with self.lock:
+            if self.values.get(key) == value:
+                return
+            self.values[key] = value
+            self.pending[key] = value
+        self.flush_later()
+
+    def update(self, **values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    def flush(self):
+        self.flush_later.cancel()
+        with self.lock:
+            if not self.pending:
+                return
+            data = "".join(f"{key}={value}\n" for key, value in self.values.items())
+            atomic_write(self.path, data)
+            self.pending.clear()
+            self.mtime = os.stat(self.path).st_mtime_ns
+
+settings = Config(config_path, {"language": "ru", "x": "400", "y": "200", "search": "0", "rpc": "0"})
+ui = Config(ui_path, {"bg": "#ffffff", "color": "#000000", "button": "default"})
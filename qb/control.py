@@ -0,0 +1,257 @@
+import json, base64, inspect
+from PyQt6.QtCore import QObject, QTimer, QUrl, QByteArray, QBuffer, QIODevice
+from PyQt6.QtNetwork import QLocalServer
+from PyQt6.QtWebEngineWidgets import QWebEngineView
+from qb import debug
+from qb import session
+from qb.control_client import socket_path
+
+WAIT_TIMEOUT = 30000 # ms, default for wait-for-load
+PARSE_ERROR, INVALID, NOT_FOUND, BAD_PARAMS, FAILED = -32700, -32600, -32601, -32602, -32000
+
+class RpcError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+class Connection(QObject): # One client; requests run concurrently and answer in whatever order they finish
+    def __init__(self, server, socket):
+        super().__init__(server)
+        self.server = server
+        self.socket = socket
+        self.buffer = b""
+        self.closed = False # Set on disconnect, answers still pending are dropped
+        socket.readyRead.connect(self.on_ready)
+        socket.disconnected.connect(self.on_disconnected)
+
+    def on_ready(self):
+        self.buffer += bytes(self.socket.readAll())
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines: # Everything already received is dispatched before any answer is awaited
+            if line.strip():
+                self.handle(line)
+
+    def handle(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self.send({"jsonrpc": "2.0", "id": None, "error": {"code": PARSE_ERROR, "message": "parse error"}})
+            return
+        if not isinstance(request, dict): # Batches included, one request per line is the protocol
+            self.fail(None, INVALID, "invalid request")
+            return
+        rid = request.get("id")
+        method = self.server.methods.get(request.get("method"))
+        if method is None:
+            self.fail(rid, NOT_FOUND, f"unknown method {request.get('method')}")
+            return
+        params = request.get("params") or {}
+        ok, err = lambda result: self.reply(rid, result), lambda code, message: self.fail(rid, code, message)
+        try:
+            if not isinstance(params, dict):
+                raise TypeError("params must be an object")
+            inspect.signature(method).bind(ok, err, **params)
+        except TypeError as e: # Only the binding, errors inside a method are not bad params
+            self.fail(rid, BAD_PARAMS, str(e))
+            return
+        try:
+            method(ok, err, **params)
+        except RpcError as e:
+            self.fail(rid, e.code, str(e))
+        except Exception as e: # Never into Qt, an exception in a slot aborts the browser
+            if(debug.debug_bool): print(f"Control: {request.get('method')} failed | {e!r}")
+            self.fail(rid, FAILED, str(e))
+
+    def reply(self, rid, result):
+        if rid is not None and not self.closed: # Notifications get no answer
+            self.send({"jsonrpc": "2.0", "id": rid, "result": result})
+
+    def fail(self, rid, code, message):
+        if not self.closed:
+            self.send({"jsonrpc": "2.0", "id": rid, "error": {"code": code, "message": message}})
+
+    def send(self, message):
+        if self.closed or not self.socket.isValid():
+            return
+        try:
+            line = json.dumps(message)
+        except (TypeError, ValueError) as e: # A Date or ArrayBuffer from tabs.eval arrives as a Qt type, often in a Qt callback
+            if(debug.debug_bool): print(f"Control: result is not JSON | {e!r}")
+            line = json.dumps({"jsonrpc": "2.0", "id": message.get("id"),
+                               "error": {"code": FAILED, "message": f"result is not JSON serializable: {e}"}})
+        self.socket.write((line + "\n").encode())
+
+    def on_disconnected(self):
+        self.closed = True # Waiters and script results may still answer after this
+        self.socket.deleteLater()
+        self.deleteLater()
+
+class ControlServer(QObject): # JSON-RPC 2.0, one JSON object per line, over a user-only local socket
+    def __init__(self, window, path=None):
+        super().__init__(window)
+        self.window = window
+        self.tabs = window.tab_widget
+        self.ids = {} # widget -> tab id
+        self.widgets = {} # tab id -> widget
+        self.next_id = 1
+        self.loading = set()
+        self.waiters = {} # view -> [callback]
+        self.methods = {
+            "ping": lambda ok, err: ok("pong"),
+            "tabs.list": self.list,
+            "tabs.open": self.open,
+            "tabs.navigate": self.navigate,
+            "tabs.back": lambda ok, err, id: self.history_step(ok, id, back=True),
+            "tabs.forward": lambda ok, err, id: self.history_step(ok, id, back=False),
+            "tabs.close": self.close_tab,
+            "tabs.eval": self.eval,
+            "tabs.wait": self.wait,
+            "tabs.screenshot": self.screenshot,
+            "quit": self.quit,
+        }
+        self.path = path or socket_path()
+        QLocalServer.removeServer(self.path) # A stale socket from a crashed run
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+        self.server.newConnection.connect(self.on_connection)
+        if not self.server.listen(self.path):
+            if(debug.debug_bool): print(f"Control: can't listen on {self.path} | {self.server.errorString()}")
+        elif(debug.debug_bool): print(f"Control: listening on {self.path}")
+
+    def on_connection(self):
+        while self.server.hasPendingConnections():
+            Connection(self, self.server.nextPendingConnection())
+
+    # Tabs
+
+    def tab_id(self, widget):
+        if widget not in self.ids:
+            self.ids[widget] = self.next_id
+            self.widgets[self.next_id] = widget
+            self.next_id += 1
+            widget.destroyed.connect(lambda *_, w=widget: self.forget(w))
+            if isinstance(widget, QWebEngineView):
+                self.watch(widget)
+        return self.ids[widget]
+
+    def watch(self, view):
+        view.loadStarted.connect(lambda: self.loading.add(view))
+        view.loadFinished.connect(lambda ok: self.on_loaded(view, ok))
+
+    def forget(self, widget):
+        tid = self.ids.pop(widget, None)
+        if self.widgets.get(tid) is widget: # A placeholder's id already points at its view
+            del self.widgets[tid]
+        self.loading.discard(widget)
+        for callback in self.waiters.pop(widget, []):
+            callback(False)
+
+    def view(self, tid): # The live view for a tab id, materializing a restored placeholder if needed
+        widget = self.widgets.get(tid)
+        index = self.tabs.indexOf(widget) if widget is not None else -1
+        if index == -1:
+            raise RpcError(BAD_PARAMS, f"no tab {tid}")
+        if isinstance(widget, session.LazyTab):
+            self.tabs.setCurrentIndex(index)
+            view = self.tabs.widget(index)
+            self.ids[view] = tid
+            self.widgets[tid] = view
+            self.watch(view)
+            self.loading.add(view)
+            return view
+        return widget
+
+    def on_loaded(self, view, ok):
+        self.loading.discard(view)
+        for callback in self.waiters.pop(view, []):
+            callback(ok)
+
+    def when_loaded(self, view, callback, timeout=WAIT_TIMEOUT):
+        if view not in self.loading:
+            callback(True)
+            return
+        fired = []
+        def once(ok):
+            if not fired:
+                fired.append(True)
+                callback(ok)
+        self.waiters.setdefault(view, []).append(once)
+        QTimer.singleShot(timeout, lambda: once(None))
+
+    def describe(self, widget):
+        if isinstance(widget, session.LazyTab):
+            return {"id": self.tab_id(widget), "url": widget.url, "title": widget.title, "loading": False}
+        return {"id": self.tab_id(widget), "url": widget.url().toString(), "title": widget.title(),
+                "loading": widget in self.loading}
+
+    # Methods, each gets ok(result) and err(code, message) and answers whenever it is ready
+
+    def list(self, ok, err):
+        ok([self.describe(self.tabs.widget(i)) for i in range(self.tabs.count())])
+
+    def open(self, ok, err, url, wait=False, timeout=WAIT_TIMEOUT):
+        self.window.add_new_tab(QUrl(url))
+        view = self.tabs.currentWidget()
+        tid = self.tab_id(view)
+        self.loading.add(view)
+        if wait:
+            self.when_loaded(view, lambda loaded: ok({"id": tid, "loaded": loaded}), timeout)
+        else:
+            ok({"id": tid})
+
+    def navigate(self, ok, err, id, url, wait=False, timeout=WAIT_TIMEOUT):
+        view = self.view(id)
+        view.setUrl(QUrl(url))
+        self.loading.add(view)
+        if wait:
+            self.when_loaded(view, lambda loaded: ok({"id": id, "loaded": loaded}), timeout)
+        else:
+            ok({"id": id})
+
+    def history_step(self, ok, id, back):
+        view = self.view(id)
+        history = view.history()
+        if back and history.canGoBack():
+            view.back()
+        elif not back and history.canGoForward():
+            view.forward()
+        else:
+            ok(False)
+            return
+        self.loading.add(view)
+        ok(True)
+
+    def close_tab(self, ok, err, id):
+        widget = self.widgets.get(id)
+        index = self.tabs.indexOf(widget) if widget is not None else -1
+        if index == -1:
+            raise RpcError(BAD_PARAMS, f"no tab {id}")
+        if self.tabs.count() == 1:
+            raise RpcError(FAILED, "refusing to close the last tab") # It would close the browser
+        self.window.close_tab(index)
+        ok(True)
+
+    def eval(self, ok, err, id, script):
+        self.view(id).page().runJavaScript(script, ok)
+
+    def wait(self, ok, err, id, timeout=WAIT_TIMEOUT):
+        self.when_loaded(self.view(id), ok, timeout)
+
+    def screenshot(self, ok, err, id, path=None): # PNG to path, or base64 in the result
+        image = self.view(id).grab()
+        if path:
+            ok(image.save(path, "PNG"))
+            return
+        data = QByteArray()
+        buffer = QBuffer(data)
+        buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+        image.save(buffer, "PNG")
+        ok(base64.b64encode(bytes(data)).decode())
+
+    def quit(self, ok, err): # Answers first, then closes the window the normal way
+        ok(True)
+        QTimer.singleShot(0, self.window.close)
+
+    def close(self):
+        self.server.close()
+        QLocalServer.removeServer(self.path)
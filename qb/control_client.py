@@ -0,0 +1,85 @@
+import os, json, socket, tempfile, threading, itertools
+from concurrent.futures import Future
+from qb.config import settings
+
+def socket_path(): # No Qt here, so scripts driving the browser stay light
+    return settings.get("control_socket", os.path.join(tempfile.gettempdir(), f"qbrowser-control-{os.getuid()}"))
+
+class ControlError(Exception):
+    def __init__(self, code, message):
+        super().__init__(f"{message} ({code})")
+        self.code = code
+
+class Client: # Pipelined: submit() returns at once, answers are matched back by id
+    def __init__(self, path=None, timeout=60):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path or socket_path())
+        self.timeout = timeout
+        self.ids = itertools.count(1)
+        self.pending = {} # id -> Future
+        self.lock = threading.Lock()
+        self.reader = threading.Thread(target=self.read, name="control-client", daemon=True)
+        self.reader.start()
+
+    def submit(self, method, **params):
+        future = Future()
+        with self.lock:
+            rid = next(self.ids)
+            self.pending[rid] = future
+            self.sock.sendall((json.dumps({"jsonrpc": "2.0", "id": rid, "method": method, "params": params}) + "\n").encode())
+        return future
+
+    def call(self, method, **params):
+        return self.submit(method, **params).result(self.timeout)
+
+    def read(self):
+        buffer = b""
+        while True:
+            try:
+                data = self.sock.recv(65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                message = json.loads(line)
+                with self.lock:
+                    future = self.pending.pop(message.get("id"), None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    future.set_exception(ControlError(message["error"]["code"], message["error"]["message"]))
+                else:
+                    future.set_result(message.get("result"))
+        with self.lock: # Connection gone, nobody will answer the rest
+            for future in self.pending.values():
+                future.set_exception(ConnectionError("control socket closed"))
+            self.pending.clear()
+
+    # Shortcuts for the tab methods
+
+    def tabs(self):
+        return self.call("tabs.list")
+
+    def open(self, url, wait=True):
+        return self.call("tabs.open", url=url, wait=wait)["id"]
+
+    def navigate(self, tab, url, wait=True):
+        return self.call("tabs.navigate", id=tab, url=url, wait=wait)
+
+    def eval(self, tab, script):
+        return self.call("tabs.eval", id=tab, script=script)
+
+    def wait(self, tab, timeout=30000):
+        return self.call("tabs.wait", id=tab, timeout=timeout)
+
+    def screenshot(self, tab, path=None):
+        return self.call("tabs.screenshot", id=tab, path=path)
+
+    def close_tab(self, tab):
+        return self.call("tabs.close", id=tab)
+
+    def close(self):
+        self.sock.close()
@@ -1,4 +1,13 @@
 current_language = "ru"
 config_path="config/qb.cfg"
 history_path="user/history.qb"
-ui_path="user/ui.qb"
\ No newline at end of file
+history_db_path="user/history.db"
+session_path="user/session.json"
+ui_path="user/ui.qb"
+filters_path="user/filters"
+adblock_cache_path="user/filters.cache"
+snapshots_path="user/snapshots"
+fulltext_path="user/fulltext.db"
+favicons_path="user/favicons"
+lite_rules_path="user/lite.rules"
+downloads_path="user/downloads.json"
@@ -1 +1,11 @@
-debug_bool = False
\ No newline at end of file
+debug_bool = False
+listeners = [] # Called with the new value whenever debug is switched
+
+def on_change(func):
+    listeners.append(func)
+
+def set_debug(value):
+    global debug_bool
+    debug_bool = bool(value)
+    for func in listeners:
+        func(debug_bool)
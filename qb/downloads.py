@@ -0,0 +1,420 @@
+import os, json, time
+from PyQt6.QtCore import Qt, QTimer, QUrl, QStandardPaths, QAbstractTableModel, QModelIndex, pyqtSignal
+from PyQt6.QtGui import QDesktopServices
+from PyQt6.QtWebEngineCore import QWebEngineDownloadRequest, QWebEnginePage
+from PyQt6.QtWidgets import QDockWidget, QTableView, QHeaderView, QAbstractItemView, QPushButton, QLabel, QHBoxLayout, QVBoxLayout, QWidget
+from qb.core import *
+from qb import debug
+from qb import snapshot
+from qb.config import settings, atomic_write, Debouncer
+from qb.i18n import tr
+
+State = QWebEngineDownloadRequest.DownloadState
+KB = 1024
+TICK = 250 # ms between throughput samples, throttling and panel updates
+RATE_WEIGHT = 0.3 # Weight of the newest sample in the speed shown
+BURST = 1.0 # Seconds of a cap a download may run ahead before it is held
+KEEP_FINISHED = 100 # Finished downloads kept in the journal and the panel
+REQUEST_TIMEOUT = 30 # Seconds a carried-over download may take to start again before it counts as failed
+COLUMNS = ["dlfile", "dlprogress", "dlsize", "dlspeed", "dleta", "dlstate"] # Locale keys
+UNFINISHED = ("queued", "active", "paused")
+
+def download_dir():
+    return settings.get("download_dir", "") or QStandardPaths.writableLocation(QStandardPaths.StandardLocation.DownloadLocation)
+
+def size(value):
+    for unit in ("B", "KB", "MB"):
+        if value < KB * 10:
+            return f"{value:.0f} {unit}"
+        value /= KB
+    return f"{value:.1f} GB"
+
+def eta(seconds):
+    if seconds is None:
+        return ""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes // 60}:{minutes % 60:02}:{seconds:02}" if minutes >= 60 else f"{minutes}:{seconds:02}"
+
+class Entry: # One download, with or without a live request: queued ones from the journal have none yet
+    def __init__(self, url, path, total=0, received=0, state="queued", added=None, finished=None, error=""):
+        self.url = url
+        self.path = path
+        self.total = total
+        self.received = received
+        self.state = state # queued, active, paused, done, failed or cancelled
+        self.added = added or time.time()
+        self.finished = finished
+        self.error = error
+        self.request = None
+        self.requested = None # When schedule() asked for it again, until its request arrives
+        self.rate = 0.0 # Bytes per second, smoothed
+        self.allowance = 0.0 # Bytes it may still take under its cap
+        self.held = False # Paused by the cap, not by the user
+
+    def as_dict(self):
+        return {"url": self.url, "path": self.path, "total": self.total, "received": self.received, "state": self.state,
+                "added": self.added, "finished": self.finished, "error": self.error}
+
+    def eta(self):
+        if self.state != "active" or self.rate <= 0 or self.total <= 0:
+            return None
+        return (self.total - self.received) / self.rate
+
+class Downloads(QAbstractTableModel): # Every download the profiles hand over: a queue, caps, and a journal for restarts
+    started = pyqtSignal() # A new download was taken, the window shows the panel
+
+    def __init__(self, path=downloads_path, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.entries = []
+        self.hooked = set() # Profiles whose downloadRequested is connected
+        self.page = None # Hidden page that re-requests downloads carried over from the last run
+        self.closing = False
+        self.pending = None # Journal text waiting to be written
+        self.write_later = Debouncer(self.flush)
+        self.timer = QTimer(self)
+        self.timer.setInterval(TICK)
+        self.timer.timeout.connect(self.tick)
+        self.sampled = time.monotonic()
+        tr.changed.connect(self.on_language)
+        self.load()
+
+    def concurrent(self):
+        return max(settings.get_int("downloads_concurrent", 3), 1)
+
+    def caps(self): # (global, per download) in bytes per second, 0 for none
+        return settings.get_int("download_limit_kbps", 0) * KB, settings.get_int("download_limit_each_kbps", 0) * KB
+
+    # Journal
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for item in data.get("downloads", []):
+                entry = Entry(**item)
+                if entry.state == "active": # Cut off by the last exit, it goes first in the queue
+                    entry.state = "queued"
+                self.entries.append(entry)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            if(debug.debug_bool): print(f"Downloads: nothing restored | {e}")
+
+    def record(self): # Serialized here, the debouncer writes it from its own thread
+        self.pending = json.dumps({"downloads": [entry.as_dict() for entry in self.entries]}, ensure_ascii=False)
+        self.write_later()
+
+    def flush(self):
+        self.write_later.cancel()
+        data, self.pending = self.pending, None
+        if data is not None:
+            atomic_write(self.path, data)
+
+    def restore(self, profile): # Downloads the last run did not finish, re-requested as slots free up
+        self.page = QWebEnginePage(profile, self)
+        self.attach(profile)
+        if any(entry.state == "queued" for entry in self.entries):
+            if(debug.debug_bool): print(f"Downloads: {sum(entry.state == 'queued' for entry in self.entries)} resumed from the journal")
+            self.schedule()
+
+    def close(self):
+        self.closing = True # Requests die with the process, the journal keeps them unfinished
+        self.timer.stop()
+        for entry in self.entries:
+            if entry.request is not None and entry.state in UNFINISHED:
+                entry.received = entry.request.receivedBytes()
+        self.record()
+        self.flush()
+
+    # Requests from the profiles
+
+    def attach(self, profile):
+        if id(profile) not in self.hooked:
+            profile.downloadRequested.connect(self.on_requested)
+            self.hooked.add(id(profile))
+
+    def unique(self, folder, name): # "file (1).zip" when the name is taken on disk or by another download
+        taken = {entry.path for entry in self.entries if entry.state in UNFINISHED}
+        stem, ext = os.path.splitext(name)
+        path, n = os.path.join(folder, name), 0
+        while path in taken or os.path.exists(path):
+            n += 1
+            path = os.path.join(folder, f"{stem} ({n}){ext}")
+        return path
+
+    def on_requested(self, download):
+        if snapshot.store.is_own(download): # Page snapshots are saved by their store
+            return
+        url = download.url().toString()
+        awaiting = [entry for entry in self.entries if entry.state == "active" and entry.request is None] # Re-requested by schedule()
+        entry = next((entry for entry in awaiting if entry.url == url), None)
+        if entry is None and awaiting and self.page is not None and download.page() is self.page: # Redirected on the way
+            entry = awaiting[0]
+        if entry is None:
+            folder = download_dir()
+            os.makedirs(folder, exist_ok=True)
+            entry = Entry(url, self.unique(folder, download.downloadFileName()))
+            self.beginInsertRows(QModelIndex(), len(self.entries), len(self.entries))
+            self.entries.append(entry)
+            self.endInsertRows()
+            self.started.emit()
+        elif os.path.exists(entry.path): # Left over from the interrupted run, QtWebEngine starts the file again
+            os.remove(entry.path)
+        entry.request = download
+        entry.requested = None
+        entry.received = 0
+        download.setDownloadDirectory(os.path.dirname(entry.path))
+        download.setDownloadFileName(os.path.basename(entry.path))
+        download.stateChanged.connect(lambda state, entry=entry: self.on_state(entry, state))
+        download.accept()
+        if entry.state == "queued" and self.running() >= self.concurrent():
+            download.pause() # Accepted so it is not lost, resumed when a slot frees up
+        else:
+            entry.state = "active"
+        self.changed(entry)
+        self.schedule()
+
+    def on_state(self, entry, state):
+        if self.closing or entry.request is None:
+            return
+        if state == State.DownloadCompleted:
+            entry.state = "done"
+            entry.received = entry.total = entry.request.receivedBytes()
+        elif state == State.DownloadCancelled:
+            entry.state = "cancelled"
+        elif state == State.DownloadInterrupted:
+            entry.state = "failed"
+            entry.error = entry.request.interruptReasonString()
+        else:
+            return
+        entry.finished = time.time()
+        entry.request = None
+        entry.rate = 0.0
+        entry.held = False
+        if(debug.debug_bool): print(f"Downloads: {entry.state} {entry.url} -> {entry.path} {size(entry.received)} {entry.error}")
+        self.trim()
+        self.changed(entry)
+        self.schedule()
+
+    def trim(self): # Oldest finished first, the one that just finished always stays
+        finished = sorted((entry for entry in self.entries if entry.state not in UNFINISHED), key=lambda entry: entry.finished or 0)
+        for entry in finished[:max(len(finished) - KEEP_FINISHED, 0)]:
+            row = self.entries.index(entry)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.entries.pop(row)
+            self.endRemoveRows()
+
+    # Queue and caps
+
+    def running(self):
+        return sum(entry.state == "active" for entry in self.entries)
+
+    def schedule(self): # Fills free slots from the queue, oldest first
+        free = self.concurrent() - self.running()
+        for entry in self.entries:
+            if free <= 0:
+                break
+            if entry.state != "queued":
+                continue
+            if entry.request is not None:
+                entry.request.resume()
+            elif self.page is not None:
+                self.page.download(QUrl(entry.url), os.path.basename(entry.path))
+                entry.requested = time.monotonic()
+            else:
+                continue
+            entry.state = "active"
+            entry.allowance = 0.0
+            free -= 1
+            self.changed(entry)
+        if any(entry.state in ("queued", "active") for entry in self.entries):
+            if not self.timer.isActive():
+                self.sampled = time.monotonic()
+                self.timer.start()
+        else:
+            self.timer.stop()
+
+    def tick(self): # Speed from bytes since the last tick, then hold or release each download against its cap
+        now = time.monotonic()
+        elapsed, self.sampled = max(now - self.sampled, 0.001), now
+        for entry in self.entries: # Host gone or no download at the URL any more, the slot is freed
+            if entry.state == "active" and entry.request is None and entry.requested and now - entry.requested > REQUEST_TIMEOUT:
+                entry.state = "failed"
+                entry.error = "no response"
+                entry.requested = None
+                entry.finished = time.time()
+                self.changed(entry)
+                self.schedule()
+        active = [entry for entry in self.entries if entry.state == "active" and entry.request is not None]
+        shared, each = self.caps()
+        limits = [limit for limit in (each, shared / len(active) if shared and active else 0) if limit]
+        limit = min(limits) if limits else 0
+        for entry in active:
+            request = entry.request
+            received = request.receivedBytes()
+            taken, entry.received = max(received - entry.received, 0), received
+            entry.total = max(request.totalBytes(), 0)
+            entry.rate += RATE_WEIGHT * (taken / elapsed - entry.rate)
+            if not limit:
+                if entry.held:
+                    entry.held = False
+                    request.resume()
+                continue
+            entry.allowance = min(entry.allowance + limit * elapsed, limit * BURST) - taken
+            if entry.allowance < 0 and not entry.held:
+                entry.held = True
+                request.pause()
+            elif entry.allowance >= 0 and entry.held:
+                entry.held = False
+                request.resume()
+        if active:
+            self.dataChanged.emit(self.index(self.entries.index(active[0]), 1), self.index(self.entries.index(active[-1]), 5))
+
+    def summary(self): # One line under the panel
+        active = [entry for entry in self.entries if entry.state == "active"]
+        queued = sum(entry.state == "queued" for entry in self.entries)
+        if not active and not queued:
+            return ""
+        left = [entry.eta() for entry in active]
+        text = f"↓ {size(sum(entry.rate for entry in active))}/s, {tr.get('dlactive')}: {len(active)}"
+        if queued:
+            text += f", {tr.get('dlqueued')}: {queued}"
+        if active and None not in left:
+            text += f", {tr.get('dleta')}: {eta(max(left))}"
+        return text
+
+    # Actions from the panel
+
+    def changed(self, entry):
+        row = self.entries.index(entry)
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(COLUMNS) - 1))
+        self.record()
+
+    def pause(self, row):
+        entry = self.entries[row]
+        if entry.state not in ("queued", "active"):
+            return
+        if entry.request is not None:
+            entry.request.pause()
+        entry.state = "paused"
+        entry.held = False
+        entry.rate = 0.0
+        self.changed(entry)
+        self.schedule()
+
+    def resume(self, row): # Back into the queue, so the concurrency limit still holds
+        entry = self.entries[row]
+        if entry.state not in ("paused", "failed", "cancelled"):
+            return
+        if entry.state != "paused": # Started over from the URL
+            entry.request = None
+            entry.error = ""
+            entry.finished = None
+        entry.state = "queued"
+        self.changed(entry)
+        self.schedule()
+
+    def cancel(self, row):
+        entry = self.entries[row]
+        if entry.state not in UNFINISHED:
+            return
+        if entry.request is not None:
+            entry.request.cancel() # on_state records it
+            return
+        if os.path.exists(entry.path): # Partial file from an earlier run
+            os.remove(entry.path)
+        entry.state = "cancelled"
+        entry.finished = time.time()
+        self.changed(entry)
+
+    def clear(self): # Drops finished rows from the panel and the journal
+        self.beginResetModel()
+        self.entries = [entry for entry in self.entries if entry.state in UNFINISHED]
+        self.endResetModel()
+        self.record()
+
+    # Qt model
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return tr.get(COLUMNS[section])
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{entry.url}\n{entry.path}" + (f"\n{entry.error}" if entry.error else "")
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        match index.column():
+            case 0: return os.path.basename(entry.path)
+            case 1: return f"{entry.received * 100 // entry.total}%" if entry.total else size(entry.received)
+            case 2: return size(entry.total) if entry.total else ""
+            case 3: return f"{size(entry.rate)}/s" if entry.state == "active" else ""
+            case 4: return eta(entry.eta())
+            case 5: return tr.get("dlheld" if entry.held else f"dl{entry.state}")
+        return None
+
+    def on_language(self, *_):
+        self.headerDataChanged.emit(Qt.Orientation.Horizontal, 0, len(COLUMNS) - 1)
+        if self.entries:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.entries) - 1, len(COLUMNS) - 1))
+
+class DownloadPanel(QDockWidget): # The download list with its controls and the total speed
+    def __init__(self, downloads, parent=None):
+        super().__init__(parent)
+        self.setObjectName("downloads")
+        self.downloads = downloads
+        self.view = QTableView()
+        self.view.setModel(downloads)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.view.verticalHeader().hide()
+        self.view.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.view.doubleClicked.connect(self.open_file)
+        self.pause_button = QPushButton()
+        self.pause_button.clicked.connect(lambda: self.each(downloads.pause))
+        self.resume_button = QPushButton()
+        self.resume_button.clicked.connect(lambda: self.each(downloads.resume))
+        self.cancel_button = QPushButton()
+        self.cancel_button.clicked.connect(lambda: self.each(downloads.cancel))
+        self.clear_button = QPushButton()
+        self.clear_button.clicked.connect(downloads.clear)
+        self.folder_button = QPushButton()
+        self.folder_button.clicked.connect(lambda: QDesktopServices.openUrl(QUrl.fromLocalFile(download_dir())))
+        self.status = QLabel()
+        downloads.timer.timeout.connect(self.update_status)
+        downloads.dataChanged.connect(self.update_status)
+        buttons = QHBoxLayout()
+        for button in (self.pause_button, self.resume_button, self.cancel_button, self.clear_button, self.folder_button):
+            buttons.addWidget(button)
+        buttons.addStretch()
+        buttons.addWidget(self.status)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.view)
+        layout.addLayout(buttons)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+
+    def each(self, action): # Selected rows, or the current one
+        rows = sorted({index.row() for index in self.view.selectionModel().selectedRows()}) or [self.view.currentIndex().row()]
+        for row in rows:
+            if row != -1:
+                action(row)
+
+    def open_file(self, index):
+        entry = self.downloads.entries[index.row()]
+        if entry.state == "done":
+            QDesktopServices.openUrl(QUrl.fromLocalFile(entry.path))
+
+    def update_status(self):
+        if self.isVisible():
+            self.status.setText(self.downloads.summary())
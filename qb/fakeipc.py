@@ -0,0 +1,83 @@
+import os, sys, json, struct, socket, tempfile, threading, time
+
+# Stand-in for the Discord client's IPC socket, enough of the protocol for pypresence:
+# 8 byte header (opcode, length, little endian) followed by a JSON payload.
+OP_HANDSHAKE, OP_FRAME, OP_CLOSE = 0, 1, 2
+
+class FakeDiscord:
+    def __init__(self, folder=None, fail_every=0):
+        self.folder = folder or tempfile.mkdtemp(prefix="qb-fakeipc-")
+        self.path = os.path.join(self.folder, "discord-ipc-0")
+        self.fail_every = fail_every # Drop the connection after this many updates, 0 never
+        self.activities = [] # (time, activity) in arrival order
+        self.connections = 0
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.path)
+        self.server.listen()
+        self.thread = threading.Thread(target=self.serve, name="fake-discord", daemon=True)
+
+    def start(self): # pypresence looks for discord-ipc-0 under XDG_RUNTIME_DIR first
+        os.environ["XDG_RUNTIME_DIR"] = self.folder
+        self.thread.start()
+        return self
+
+    def close(self):
+        self.server.close()
+        if os.path.exists(self.path): os.remove(self.path)
+
+    def serve(self):
+        while True:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+    def handle(self, conn):
+        with conn:
+            while True:
+                header = self.read(conn, 8)
+                if header is None:
+                    return
+                op, length = struct.unpack("<II", header)
+                payload = json.loads(self.read(conn, length) or b"{}")
+                if op == OP_HANDSHAKE:
+                    self.send(conn, OP_FRAME, {"cmd": "DISPATCH", "evt": "READY", "data": {"v": 1, "user": {"id": "0", "username": "fake"}}, "nonce": None})
+                elif op == OP_CLOSE:
+                    return
+                else:
+                    args = payload.get("args", {})
+                    self.activities.append((time.monotonic(), args.get("activity")))
+                    if self.fail_every and len(self.activities) % self.fail_every == 0:
+                        return # Simulates Discord going away mid-session
+                    self.send(conn, OP_FRAME, {"cmd": payload.get("cmd"), "evt": None, "data": args.get("activity"), "nonce": payload.get("nonce")})
+
+    def read(self, conn, size):
+        data = b""
+        while len(data) < size:
+            chunk = conn.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def send(self, conn, op, payload):
+        data = json.dumps(payload).encode("utf-8")
+        conn.sendall(struct.pack("<II", op, len(data)) + data)
+
+if __name__ == "__main__": # python -m qb.fakeipc: drive the presence worker against the fake endpoint
+    from qb import rpc, debug
+    debug.debug_bool = "--debug" in sys.argv
+    fake = FakeDiscord(fail_every=3).start()
+    rpc.StartRPC()
+    for i in range(1000): # A burst of tab switches, only the last state should matter
+        rpc.UpdateRPC(f"Browsing tab {i}")
+    time.sleep(2)
+    rpc.UpdateRPC("Browsing final tab")
+    time.sleep(3)
+    worker = rpc.worker
+    print(f"published 1001, sent {worker.updates}, dropped {worker.dropped}, connections {fake.connections}")
+    print(f"last activity: {fake.activities[-1][1]['details'] if fake.activities else None}")
+    rpc.StopRPC()
+    fake.close()
@@ -0,0 +1,240 @@
+import re, time, queue, hashlib, threading, atexit, sqlite3
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from qb.core import *
+from qb import debug
+from qb.config import settings
+from qb.history import connect, RECORD_SCHEMES
+
+MB = 1024 * 1024
+MAX_TEXT = 30000 # Characters kept per page, the rest of a long page adds size more than answers
+MIN_AGE = 600 # Seconds before the same URL is read again
+BATCH_SIZE = 64 # Pages per transaction
+BATCH_WAIT = 0.5 # Seconds to gather a batch after the first page
+EVICT_SHARE = 0.1 # Part of the pages dropped, oldest visit first, when over budget
+RESULTS = 50
+SNIPPET_CHARS = 120
+CANDIDATES = 1000 # Newest matches ranked per query, so common words cost the same as rare ones
+SUGGESTIONS = 5 # Full-text matches offered under the search bar
+SUGGEST_MIN = 3 # Characters typed before page text is searched
+
+words = re.compile(r"[^\W_]+").findall # Split where the unicode61 tokenizer does
+
+SCHEMA = """
+PRAGMA auto_vacuum = INCREMENTAL;
+CREATE TABLE IF NOT EXISTS pages (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    hash TEXT NOT NULL,
+    last_visit REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_lru ON pages (last_visit);
+CREATE VIRTUAL TABLE IF NOT EXISTS text USING fts5(title, body, tokenize = 'unicode61 remove_diacritics 2', prefix = '3');
+"""
+
+def match_query(text): # Every word must appear, the last one may still be half typed
+    terms = [term.replace('"', "") for term in words(text.lower())]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+
+def excerpt(body, terms, width=SNIPPET_CHARS): # Plain find instead of FTS5 snippet(), which scores every hit in the page
+    found = re.search(r"\b(?:" + "|".join(map(re.escape, terms)) + ")", body, re.IGNORECASE) if terms else None
+    start = max(found.start() - width // 3, 0) if found else 0
+    if start:
+        start = body.find(" ", start) + 1
+    end = len(body) if start + width >= len(body) else body.rfind(" ", start, start + width)
+    end = start + width if end <= start else end
+    text = " ".join(body[start:end].split())
+    return ("…" if start else "") + text + ("…" if end < len(body) else "")
+
+def clean(text): # toPlainText can hand back lone surrogates, which sqlite refuses to bind
+    return text.encode("utf-8", "replace").decode("utf-8")
+
+class FullTextStore: # FTS5 index of page text, written by one background thread, bounded by a disk budget
+    def __init__(self, path=fulltext_path):
+        self.path = path
+        self.local = threading.local()
+        self.recent = {} # url -> time of the last read
+        self.jobs = queue.Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def start(self): # Database and writer on first use, with fulltext=0 nothing touches the disk
+        with self.lock:
+            if self.writer is None:
+                db = connect(self.path)
+                db.executescript(SCHEMA)
+                db.close()
+                self.writer = threading.Thread(target=self.run, name="fulltext-writer", daemon=True)
+                self.writer.start()
+
+    def enabled(self):
+        return bool(settings.get_int("fulltext", 1))
+
+    def budget(self):
+        return settings.get_int("fulltext_budget_mb", 100) * MB
+
+    def reader(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            self.start()
+            db = self.local.db = connect(self.path)
+        return db
+
+    # UI thread
+
+    def capture(self, page, ok=True): # Connected to loadFinished, the text arrives later through a callback
+        url = page.url().toString()
+        if not (ok and self.enabled() and url.startswith(RECORD_SCHEMES)) or url.startswith("file:"):
+            return
+        if page.profile().isOffTheRecord() or time.time() - self.recent.get(url, 0) < MIN_AGE:
+            return
+        self.recent[url] = time.time()
+        title = page.title()
+        page.toPlainText(lambda text: self.add(url, title, text))
+
+    def add(self, url, title, text, ts=None):
+        if text.strip():
+            self.start()
+            self.jobs.put(("page", url, clean(title), clean(text[:MAX_TEXT]), ts or time.time()))
+
+    def after_writes(self, func): # func runs on the writer thread once everything queued so far is indexed
+        self.start()
+        self.jobs.put(("call", func, None, None, None))
+
+    def search(self, text, limit=RESULTS): # [(id, url, title)], best match first
+        query = match_query(text)
+        if query is None or not self.enabled():
+            return []
+        sql = ("SELECT top.id, pages.url, text.title FROM (SELECT id, score FROM (SELECT rowid AS id, bm25(text, 5.0, 1.0) AS score "
+               "FROM text WHERE text MATCH ? ORDER BY rowid DESC LIMIT ?) ORDER BY score LIMIT ?) AS top "
+               "JOIN pages ON pages.id = top.id JOIN text ON text.rowid = top.id ORDER BY top.score")
+        try: # Rowids grow as pages are indexed, so the newest matches stream first and the scan stops early
+            return self.reader().execute(sql, (query, CANDIDATES, limit)).fetchall()
+        except sqlite3.Error as e: # FTS5 rejects some odd input, nothing matches then
+            if(debug.debug_bool): print(f"Fulltext: query {query!r} failed | {e}")
+            return []
+
+    def snippet(self, text, page_id): # The words around the first match, asked for only by rows on screen
+        row = self.reader().execute("SELECT body FROM text WHERE rowid = ?", (page_id,)).fetchone()
+        return excerpt(row[0], words(text.lower())) if row else ""
+
+    def count(self):
+        return self.reader().execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def close(self):
+        if self.writer is not None and self.writer.is_alive():
+            self.jobs.put(None)
+            self.writer.join()
+
+    # Writer thread
+
+    def run(self):
+        db = connect(self.path)
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            batch = [job]
+            deadline = time.monotonic() + BATCH_WAIT
+            stop = False
+            while len(batch) < BATCH_SIZE:
+                try:
+                    job = self.jobs.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            try:
+                self.write(db, batch)
+                self.evict(db)
+            except Exception as e: # The indexer outlives a bad batch
+                if(debug.debug_bool): print(f"Fulltext: write failed | {e!r}")
+            for kind, func, *_ in batch:
+                if kind == "call":
+                    try:
+                        func()
+                    except Exception as e:
+                        if(debug.debug_bool): print(f"Fulltext: call failed | {e!r}")
+            if stop:
+                break
+        db.close()
+
+    def write(self, db, batch):
+        started = time.perf_counter()
+        indexed = 0
+        with db:
+            for kind, url, title, text, ts in batch:
+                if kind != "page":
+                    continue
+                digest = hashlib.sha1(f"{title}\0{text}".encode()).hexdigest()
+                row = db.execute("SELECT id, hash FROM pages WHERE url = ?", (url,)).fetchone()
+                if row and row[1] == digest: # Same text as last time, only the visit moves
+                    db.execute("UPDATE pages SET last_visit = ? WHERE id = ?", (ts, row[0]))
+                    continue
+                if row: # Changed text gets a new id, newest ids are what queries look at first
+                    db.execute("DELETE FROM text WHERE rowid = ?", (row[0],))
+                    db.execute("DELETE FROM pages WHERE id = ?", (row[0],))
+                page_id = db.execute("INSERT INTO pages (url, hash, last_visit) VALUES (?, ?, ?)", (url, digest, ts)).lastrowid
+                db.execute("INSERT INTO text (rowid, title, body) VALUES (?, ?, ?)", (page_id, title, text))
+                indexed += 1
+        if indexed and debug.debug_bool: print(f"Fulltext: indexed {indexed} pages in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def size(self, db): # Bytes in use, free pages left by deletes don't count
+        page_size = db.execute("PRAGMA page_size").fetchone()[0]
+        used = db.execute("PRAGMA page_count").fetchone()[0] - db.execute("PRAGMA freelist_count").fetchone()[0]
+        return used * page_size
+
+    def evict(self, db):
+        budget = self.budget()
+        if self.size(db) <= budget:
+            return
+        while self.size(db) > budget:
+            total = db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            if not total:
+                break
+            with db:
+                old = db.execute("SELECT id FROM pages ORDER BY last_visit LIMIT ?", (max(int(total * EVICT_SHARE), 1),)).fetchall()
+                db.executemany("DELETE FROM text WHERE rowid = ?", old)
+                db.executemany("DELETE FROM pages WHERE id = ?", old)
+                db.execute("INSERT INTO text (text) VALUES ('optimize')") # Merge segments so freed space really frees
+            if(debug.debug_bool): print(f"Fulltext: evicted {len(old)} pages")
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.execute("PRAGMA incremental_vacuum")
+
+class SearchModel(QAbstractListModel): # Full-text results for the history window
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.text = ""
+        self.rows = []
+        self.snippets = {} # row -> snippet, filled as rows are painted
+
+    def search(self, text):
+        self.beginResetModel()
+        self.text = text
+        self.rows = self.store.search(text)
+        self.snippets = {}
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        page_id, url, title = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            if index.row() not in self.snippets:
+                self.snippets[index.row()] = self.store.snippet(self.text, page_id)
+            return f"{title or url}\n{self.snippets[index.row()]}"
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return url
+        if role == Qt.ItemDataRole.UserRole:
+            return url
+        return None
+
+store = FullTextStore()
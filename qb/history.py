@@ -0,0 +1,223 @@
+import os, sqlite3, threading, queue, time, atexit
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex
+from qb.core import *
+from qb import debug
+from qb.config import settings
+
+BATCH_SIZE = 500 # Max events per transaction
+BATCH_WAIT = 0.25 # Seconds to gather a batch after the first event
+PAGE_SIZE = 200 # Rows fetched per fetchMore
+RECORD_SCHEMES = ("http://", "https://", "file://")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS visits (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL DEFAULT '',
+    visit_count INTEGER NOT NULL DEFAULT 0,
+    first_visit REAL NOT NULL,
+    last_visit REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS visits_recent ON visits (last_visit DESC, id DESC);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+UPSERT_VISIT = """
+INSERT INTO visits (url, title, visit_count, first_visit, last_visit) VALUES (?, ?, 1, ?, ?)
+ON CONFLICT(url) DO UPDATE SET
+    visit_count = visit_count + excluded.visit_count,
+    last_visit = MAX(last_visit, excluded.last_visit),
+    title = CASE WHEN excluded.title != '' THEN excluded.title ELSE title END
+"""
+
+def connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path, timeout=10)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
+
+class HistoryStore: # SQLite history, all writes go through one background thread
+    def __init__(self, path=history_db_path):
+        self.path = path
+        self.events = queue.Queue()
+        self.local = threading.local()
+        db = connect(path)
+        db.executescript(SCHEMA)
+        db.close()
+        self.writer = threading.Thread(target=self.run, name="history-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def reader(self): # One read connection per thread, WAL lets it run alongside the writer
+        db = getattr(self.local, "db", None)
+        if db is None:
+            db = self.local.db = connect(self.path)
+        return db
+
+    # Producers, safe to call from the UI thread
+
+    def add_visit(self, url, title="", ts=None):
+        if url.startswith(RECORD_SCHEMES):
+            self.events.put(("visit", url, title, ts or time.time()))
+
+    def set_title(self, url, title):
+        if title and url.startswith(RECORD_SCHEMES):
+            self.events.put(("title", url, title, None))
+
+    def import_legacy(self, path=history_path):
+        self.events.put(("import", path, None, None))
+
+    def after_writes(self, func): # func runs on the writer thread once everything queued so far is on disk
+        self.events.put(("call", func, None, None))
+
+    def prune(self, max_days=None, max_entries=None):
+        self.events.put(("prune", max_days, max_entries, None))
+
+    def close(self):
+        if self.writer.is_alive():
+            self.events.put(None)
+            self.writer.join()
+
+    # Readers
+
+    def page(self, after=None, limit=PAGE_SIZE): # Keyset paging, newest first
+        if after is None:
+            sql = "SELECT id, url, title, visit_count, last_visit FROM visits ORDER BY last_visit DESC, id DESC LIMIT ?"
+            return self.reader().execute(sql, (limit,)).fetchall()
+        sql = ("SELECT id, url, title, visit_count, last_visit FROM visits "
+               "WHERE (last_visit, id) < (?, ?) ORDER BY last_visit DESC, id DESC LIMIT ?")
+        return self.reader().execute(sql, (after[1], after[0], limit)).fetchall()
+
+    def rows(self): # Every entry, for building in-memory indexes
+        return self.reader().execute("SELECT url, title, visit_count, last_visit FROM visits")
+
+    def count(self):
+        return self.reader().execute("SELECT COUNT(*) FROM visits").fetchone()[0]
+
+    # Writer thread
+
+    def run(self):
+        db = connect(self.path)
+        while True:
+            event = self.events.get()
+            if event is None:
+                break
+            batch = [event]
+            deadline = time.monotonic() + BATCH_WAIT
+            stop = False
+            while len(batch) < BATCH_SIZE:
+                try:
+                    event = self.events.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if event is None:
+                    stop = True
+                    break
+                batch.append(event)
+            try:
+                self.write(db, batch)
+            except Exception as e:
+                if(debug.debug_bool): print(f"History: write failed | {e!r}")
+            if stop:
+                break
+        db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db.close()
+
+    def write(self, db, batch): # In queue order, a call sees exactly the visits queued before it
+        rows = []
+        for event in batch:
+            kind, a, b, c = event
+            if kind in ("visit", "title"):
+                rows.append(event)
+                continue
+            self.write_rows(db, rows)
+            rows = []
+            try:
+                match kind:
+                    case "import": self.write_import(db, a)
+                    case "prune": self.write_prune(db, a, b)
+                    case "call": a()
+            except Exception as e: # The writer outlives a bad step, or every later visit would queue forever
+                if(debug.debug_bool): print(f"History: {kind} failed | {e!r}")
+        self.write_rows(db, rows)
+
+    def write_rows(self, db, rows): # One transaction for a run of visits and titles
+        if not rows:
+            return
+        with db:
+            for kind, a, b, c in rows:
+                match kind:
+                    case "visit": db.execute(UPSERT_VISIT, (a, b, c, c))
+                    case "title": db.execute("UPDATE visits SET title = ? WHERE url = ?", (b, a))
+
+    def write_import(self, db, path): # history.qb is one URL per line, oldest first
+        if not os.path.exists(path):
+            return
+        stat = os.stat(path)
+        stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+        row = db.execute("SELECT value FROM meta WHERE key = 'legacy_import'").fetchone()
+        if row and row[0] == stamp:
+            return
+        started = time.perf_counter()
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            lines = [line.strip() for line in f]
+        lines = [line for line in lines if line]
+        base = stat.st_mtime - len(lines) * 0.001 # Keep the file order, newest line last
+        with db:
+            db.executemany(UPSERT_VISIT, ((url, "", base + i * 0.001, base + i * 0.001) for i, url in enumerate(lines)))
+            db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_import', ?)", (stamp,))
+        if(debug.debug_bool): print(f"History: imported {len(lines)} lines in {time.perf_counter() - started:.2f}s")
+
+    def write_prune(self, db, max_days, max_entries):
+        removed = 0
+        with db:
+            if max_days:
+                removed += db.execute("DELETE FROM visits WHERE last_visit < ?", (time.time() - max_days * 86400,)).rowcount
+            if max_entries:
+                removed += db.execute(
+                    "DELETE FROM visits WHERE id IN (SELECT id FROM visits ORDER BY last_visit DESC, id DESC LIMIT -1 OFFSET ?)",
+                    (max_entries,)).rowcount
+        if removed: # Compact: fold the WAL back and give freed pages to the OS
+            db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            db.execute("VACUUM")
+        if(debug.debug_bool): print(f"History: pruned {removed} entries")
+
+class HistoryModel(QAbstractListModel): # Loads rows page by page as the view scrolls
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.rows = []
+        self.exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        after = (self.rows[-1][0], self.rows[-1][4]) if self.rows else None
+        rows = self.store.page(after)
+        if len(rows) < PAGE_SIZE:
+            self.exhausted = True
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+            self.rows.extend(rows)
+            self.endInsertRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return row[1]
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return f"{row[2]}\n{row[3]}x, {time.strftime('%Y-%m-%d %H:%M', time.localtime(row[4]))}" if row[2] else row[1]
+        if role == Qt.ItemDataRole.UserRole:
+            return row[1]
+        return None
+
+store = HistoryStore()
+store.import_legacy()
+store.prune(settings.get_int("history_days", 0), settings.get_int("history_max", 1000000))
@@ -0,0 +1,62 @@
+import importlib
+from functools import partial
+from PyQt6.QtCore import QObject, pyqtSignal
+from qb import debug
+
+FALLBACK = {"en": ["ru"], "ru": ["en"]} # Where to look when a language lacks a key
+DEFAULT_FALLBACK = ["en", "ru"]
+MISSING = "не найден"
+
+class Translator(QObject): # Catalogs load on first use, bound widgets follow language switches
+    changed = pyqtSignal(str, str) # old language, new language
+
+    def __init__(self, language="ru"):
+        super().__init__()
+        self.language = language
+        self.catalogs = {} # language -> dict, only the ones actually asked for
+        self.resolved = {} # (language, key) -> text, fallbacks included
+        self.bindings = {} # id(object) -> (object, [(setter, key)])
+
+    def catalog(self, language):
+        if language not in self.catalogs:
+            try:
+                self.catalogs[language] = dict(importlib.import_module(f"locales.{language}").catalog)
+            except ImportError:
+                self.catalogs[language] = {}
+        return self.catalogs[language]
+
+    def get(self, key, language=None, default=MISSING):
+        language = language or self.language
+        text = self.resolved.get((language, key))
+        if text is None:
+            for name in [language] + FALLBACK.get(language, DEFAULT_FALLBACK):
+                text = self.catalog(name).get(key)
+                if text is not None:
+                    break
+            else:
+                if(debug.debug_bool): print(f"Locale: no '{key}' for {language}")
+                return default
+            self.resolved[(language, key)] = text
+        return text
+
+    def bind(self, obj, key, setter="setText"): # Sets the text now and again on every language switch
+        getattr(obj, setter)(self.get(key))
+        if id(obj) not in self.bindings:
+            self.bindings[id(obj)] = (obj, [])
+            obj.destroyed.connect(partial(self.forget, id(obj)))
+        self.bindings[id(obj)][1].append((setter, key))
+        return obj
+
+    def forget(self, key, *_): # Deleted widgets stop getting updates
+        self.bindings.pop(key, None)
+
+    def set_language(self, language):
+        if language == self.language:
+            return
+        old, self.language = self.language, language
+        for obj, keys in list(self.bindings.values()):
+            for setter, key in keys:
+                getattr(obj, setter)(self.get(key))
+        self.changed.emit(old, language)
+
+tr = Translator()
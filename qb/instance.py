@@ -0,0 +1,112 @@
+import os, json, socket, hashlib, tempfile
+from qb.core import *
+from qb import debug
+from qb.config import settings
+
+# The forwarding side imports no Qt, a second launch is over before Qt would have loaded.
+CONNECT_TIMEOUT = 2.0 # Seconds to wait on a running browser before starting a new one anyway
+SKIP = ("--new-instance", "--control", "--batch") # Launches that always get their own process, scripts want the one they started
+
+def server_name(): # One browser per working directory, since config and user data live there
+    name = settings.get("instance_socket", "")
+    if name:
+        return name
+    folder = hashlib.sha1(os.path.abspath(config_path).encode()).hexdigest()[:8]
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "")
+    if os.name == "nt": # QLocalServer turns a plain name into \\.\pipe\name
+        return f"qbrowser-{user}-{folder}"
+    return os.path.join(tempfile.gettempdir(), f"qbrowser-{user}-{folder}")
+
+def enabled(argv): # This launch may hand its URLs over
+    return bool(settings.get_int("single_instance", 1)) and not any(flag in argv for flag in SKIP)
+
+def takes_over(argv): # This browser answers later launches, unless another one already does
+    return bool(settings.get_int("single_instance", 1)) and "--new-instance" not in argv
+
+def urls(argv): # Everything that is not a flag is something to open
+    return [arg for arg in argv[1:] if not arg.startswith("-")]
+
+def pipe_path(name): # Windows named pipe QLocalServer listens on
+    return name if name.startswith("\\\\") else f"\\\\.\\pipe\\{name}"
+
+def forward(targets, cwd=None, name=None, timeout=CONNECT_TIMEOUT): # True when a running browser took them
+    message = (json.dumps({"urls": targets, "cwd": cwd or os.getcwd()}) + "\n").encode()
+    name = name or server_name()
+    try:
+        if os.name == "nt":
+            with open(pipe_path(name), "r+b", buffering=0) as pipe:
+                pipe.write(message)
+                return pipe.readline().strip() == b"ok"
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(name)
+            sock.sendall(message)
+            return sock.makefile("rb").readline().strip() == b"ok"
+    except (OSError, ValueError): # Nobody listening, or a socket left behind by a crash
+        return False
+
+def answering(name): # A browser is listening there, connecting and hanging up costs it nothing
+    try:
+        if os.name == "nt":
+            with open(pipe_path(name), "r+b", buffering=0):
+                return True
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(name)
+            return True
+    except (OSError, ValueError):
+        return False
+
+# Running browser side
+
+def listen(window): # QLocalServer for forwarded launches, None if it can't listen
+    from PyQt6.QtNetwork import QLocalServer
+    name = server_name()
+    if answering(name): # --control launches skip forward(), they must not take a running browser's socket
+        if(debug.debug_bool): print(f"Instance: {name} already has a browser")
+        return None
+    QLocalServer.removeServer(name) # Nobody answered, so it is left over from a crash
+    server = QLocalServer(window)
+    server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption)
+    if not server.listen(name):
+        if(debug.debug_bool): print(f"Instance: can't listen on {name} | {server.errorString()}")
+        return None
+    server.newConnection.connect(lambda: accept(server, window))
+    if(debug.debug_bool): print(f"Instance: listening on {name}")
+    return server
+
+def accept(server, window):
+    while server.hasPendingConnections():
+        connection = server.nextPendingConnection()
+        buffer = []
+        connection.readyRead.connect(lambda c=connection, b=buffer: receive(c, b, window))
+        connection.disconnected.connect(connection.deleteLater)
+
+def receive(connection, buffer, window):
+    buffer.append(bytes(connection.readAll()))
+    data = b"".join(buffer)
+    if b"\n" not in data:
+        return
+    try:
+        request = json.loads(data.split(b"\n", 1)[0])
+        targets, cwd = request.get("urls") or [], request.get("cwd") or os.getcwd()
+        if not (isinstance(targets, list) and all(isinstance(target, str) for target in targets) and isinstance(cwd, str)):
+            raise ValueError("urls must be a list of strings")
+    except (ValueError, AttributeError): # Anything else on the socket is dropped, never raised into Qt
+        connection.disconnectFromServer()
+        return
+    connection.write(b"ok\n") # Answered first, the launcher exits while the tabs are being made
+    connection.flush()
+    connection.disconnectFromServer()
+    from PyQt6.QtCore import QTimer
+    QTimer.singleShot(0, lambda: open_urls(window, targets, cwd))
+
+def open_urls(window, targets, cwd):
+    from PyQt6.QtCore import QUrl
+    for target in targets:
+        window.add_new_tab(QUrl.fromUserInput(target, cwd))
+    if window.isMinimized():
+        window.showNormal()
+    window.raise_()
+    window.activateWindow()
+    if(debug.debug_bool): print(f"Instance: opened {len(targets)} forwarded tabs")
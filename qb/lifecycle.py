@@ -0,0 +1,106 @@
+import time
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtWebEngineCore import QWebEnginePage
+from qb import debug
+from qb import memory
+from qb.config import settings
+
+State = QWebEnginePage.LifecycleState
+CHECK_INTERVAL = 5000 # ms between budget checks
+MEASURE_DELAY = 2000 # ms to let a renderer release memory before measuring again
+
+class TabLifecycle(QObject): # Freezes and discards background tabs, least recently used first
+    def __init__(self, tab_widget):
+        super().__init__(tab_widget)
+        self.tab_widget = tab_widget
+        self.last_active = {} # view -> monotonic time of last activation
+        self.pinned = set()
+        self.reclaimed = 0 # bytes
+        self.discarded = 0
+        self.restored = 0
+        tab_widget.currentChanged.connect(self.on_current_changed)
+        self.timer = QTimer(self)
+        self.timer.setInterval(CHECK_INTERVAL)
+        self.timer.timeout.connect(self.enforce)
+        self.timer.start()
+
+    def track(self, view):
+        self.last_active[view] = time.monotonic()
+
+    def forget(self, view):
+        self.last_active.pop(view, None)
+        self.pinned.discard(view)
+
+    def toggle_pin(self, view):
+        if view in self.pinned:
+            self.pinned.discard(view)
+        else:
+            self.pinned.add(view)
+        return view in self.pinned
+
+    def on_current_changed(self, index):
+        view = self.tab_widget.widget(index)
+        if view not in self.last_active:
+            return
+        self.last_active[view] = time.monotonic()
+        page = view.page()
+        if page.lifecycleState() != State.Active:
+            if page.lifecycleState() == State.Discarded:
+                self.restored += 1
+            page.setLifecycleState(State.Active) # Discarded pages reload themselves here
+            if(debug.debug_bool): print(f"Lifecycle: restored {view.url().toString()}")
+
+    def exempt(self, view):
+        return (view is self.tab_widget.currentWidget() or view in self.pinned
+                or view.page().recentlyAudible() or view.isVisible())
+
+    def live_views(self):
+        return [view for view in self.last_active if view.page().lifecycleState() != State.Discarded]
+
+    def enforce(self):
+        freeze_after = settings.get_int("tab_freeze", 300)
+        tab_budget = settings.get_int("tab_budget", 20)
+        memory_budget = settings.get_int("memory_budget", 0) * 1048576
+        now = time.monotonic()
+        live = self.live_views()
+        candidates = sorted((view for view in live if not self.exempt(view)), key=self.last_active.get)
+
+        for view in candidates: # Background tabs idle for a while stop running timers and scripts
+            page = view.page()
+            if page.lifecycleState() == State.Active and now - self.last_active[view] > freeze_after:
+                page.setLifecycleState(State.Frozen)
+
+        used = memory.total_rss(view.page().renderProcessPid() for view in live) if memory_budget else 0
+        for view in candidates:
+            over_tabs = tab_budget and len(live) > tab_budget
+            over_memory = memory_budget and used > memory_budget
+            if not (over_tabs or over_memory):
+                break
+            freed = self.discard(view)
+            live.remove(view)
+            used -= freed
+
+    def discard(self, view): # Returns the estimated bytes freed right away
+        page = view.page()
+        pid = page.renderProcessPid()
+        before = memory.rss(pid) or 0
+        shared = sum(1 for other in self.live_views() if other.page().renderProcessPid() == pid)
+        page.setLifecycleState(State.Discarded)
+        self.discarded += 1
+        if(debug.debug_bool): print(f"Lifecycle: discarded {view.url().toString()}")
+        QTimer.singleShot(MEASURE_DELAY, lambda: self.measure(pid, before))
+        return before // max(shared, 1)
+
+    def measure(self, pid, before):
+        after = memory.rss(pid) or 0 # A renderer with no tabs left exits, freeing all of it
+        self.reclaimed += max(before - after, 0)
+        if(debug.debug_bool): print(f"Lifecycle: reclaimed {memory.mb(before - after)}, total {memory.mb(self.reclaimed)}")
+
+    def stats(self):
+        return {
+            "tabs": len(self.last_active),
+            "live": len(self.live_views()),
+            "discarded": self.discarded,
+            "restored": self.restored,
+            "reclaimed": self.reclaimed,
+        }
@@ -0,0 +1,197 @@
+import os
+from functools import partial
+from PyQt6.QtCore import QUrl, pyqtSignal
+from PyQt6.QtWebEngineCore import QWebEnginePage, QWebEngineScript, QWebEngineSettings, QWebEngineUrlRequestInterceptor, QWebEngineUrlRequestInfo
+from qb.core import *
+from qb import debug
+from qb import memory
+from qb.config import settings, atomic_write
+
+Type = QWebEngineUrlRequestInfo.ResourceType
+Attribute = QWebEngineSettings.WebAttribute
+KB = 1024
+# Lite mode switches, each on by default except scripts: without them most sites stop working
+SWITCHES = {"images": ("lite_images", 1), "fonts": ("lite_fonts", 1), "autoplay": ("lite_autoplay", 1), "scripts": ("lite_js", 0)}
+KINDS = {Type.ResourceTypeImage: "images", Type.ResourceTypeFontResource: "fonts", Type.ResourceTypeScript: "scripts"}
+AVERAGE_START = {"images": 30 * KB, "fonts": 40 * KB, "scripts": 30 * KB} # Bytes per request until full loads teach better
+LEARN_RATE = 0.2 # Weight of the newest full load in the running averages
+
+# What the page actually transferred, split the way the interceptor blocks. Runs in the application world,
+# so it works on pages whose own scripts are switched off.
+BYTES_JS = """
+(() => {
+    const out = {total: 0, images: 0, fonts: 0, scripts: 0, images_n: 0, fonts_n: 0, scripts_n: 0};
+    const nav = performance.getEntriesByType('navigation')[0];
+    if (nav) out.total += nav.transferSize;
+    for (const r of performance.getEntriesByType('resource')) {
+        out.total += r.transferSize;
+        const kind = /\\.(woff2?|ttf|otf)(\\?|$)/i.test(r.name) ? 'fonts'
+            : (r.initiatorType === 'img' || /\\.(png|jpe?g|gif|webp|avif|svg)(\\?|$)/i.test(r.name)) ? 'images'
+            : r.initiatorType === 'script' ? 'scripts' : null;
+        if (kind) { out[kind] += r.transferSize; out[kind + '_n']++; }
+    }
+    return out;
+})()
+"""
+
+rules = {} # host -> True for lite, False for full, a host's rule covers its subdomains
+averages = dict(AVERAGE_START) # kind -> bytes per request, learned from full loads
+hosts = {} # host -> [bytes, cpu ms] of its full loads, running averages
+totals = {"loads": 0, "blocked": 0, "saved_bytes": 0, "saved_cpu_ms": 0}
+
+def load_rules(path=lite_rules_path): # "host on" or "host off" per line
+    rules.clear()
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split("#", 1)[0].split()
+            if len(parts) == 2 and parts[1] in ("on", "off"):
+                rules[parts[0].lower().lstrip(".")] = parts[1] == "on"
+
+def save_rules(path=lite_rules_path):
+    atomic_write(path, "".join(f"{host} {'on' if on else 'off'}\n" for host, on in sorted(rules.items())))
+
+def site_rule(host): # Most specific rule for host or one of its parents, None if there is none
+    while host:
+        rule = rules.get(host)
+        if rule is not None:
+            return rule
+        dot = host.find(".")
+        if dot == -1:
+            return None
+        host = host[dot + 1:]
+    return None
+
+def enabled_for(url):
+    rule = site_rule(QUrl(url).host().lower())
+    return bool(settings.get_int("lite", 0)) if rule is None else rule
+
+def set_site(url, on): # A rule that only repeats the global setting is dropped
+    host = QUrl(url).host().lower()
+    if not host:
+        return
+    rules.pop(host, None)
+    if enabled_for(url) != on:
+        rules[host] = on
+    save_rules()
+
+def switches(on): # name -> True when lite mode keeps it off
+    return {name: bool(on and settings.get_int(key, default)) for name, (key, default) in SWITCHES.items()}
+
+class Page(QWebEnginePage): # Applies the site's lite rule before each main-frame navigation starts
+    def acceptNavigationRequest(self, url, kind, is_main_frame):
+        if is_main_frame:
+            apply(self, url.toString())
+        return super().acceptNavigationRequest(url, kind, is_main_frame)
+
+def apply(page, url):
+    off = switches(enabled_for(url))
+    web_settings = page.settings()
+    web_settings.setAttribute(Attribute.JavascriptEnabled, not off["scripts"])
+    web_settings.setAttribute(Attribute.PlaybackRequiresUserGesture, off["autoplay"])
+    saver = getattr(page, "saver", None)
+    if saver is not None:
+        saver.off = off
+        saver.lite = any(off.values())
+
+class Saver(QWebEngineUrlRequestInterceptor): # Drops what lite mode leaves out and counts it, then asks the next interceptor
+    measured = pyqtSignal()
+
+    def __init__(self, page, inner=None):
+        super().__init__(page)
+        self.page = page
+        self.inner = inner # The page's content blocker, if any
+        self.off = switches(False)
+        self.lite = False
+        self.blocked = {}
+        self.loading = False
+        self.cpu_start = None
+        self.last = None # Numbers for the last finished load
+        self.saved_bytes = 0
+        self.saved_cpu_ms = 0
+
+    def interceptRequest(self, info):
+        kind = KINDS.get(info.resourceType()) # Images through the interceptor, not AutoLoadImages, so they are counted
+        if kind and self.off[kind]:
+            info.block(True)
+            self.blocked[kind] = self.blocked.get(kind, 0) + 1
+            return
+        if self.inner is not None:
+            self.inner.interceptRequest(info)
+
+    def on_started(self):
+        self.blocked = {}
+        self.loading = True
+        self.cpu_start = memory.cpu_time(self.page.renderProcessPid()) # The renderer may be shared, so this is approximate
+
+    def on_finished(self, ok):
+        if not ok or not self.loading:
+            return
+        self.loading = False
+        cpu = memory.cpu_time(self.page.renderProcessPid())
+        cpu_ms = round((cpu - self.cpu_start) * 1000) if cpu is not None and self.cpu_start is not None else None
+        self.page.runJavaScript(BYTES_JS, QWebEngineScript.ScriptWorldId.ApplicationWorld.value, partial(self.on_bytes, cpu_ms))
+
+    def on_bytes(self, cpu_ms, result):
+        if not result:
+            return
+        host = self.page.url().host().lower()
+        total = int(result["total"])
+        blocked = sum(self.blocked.values())
+        if not self.lite: # Full loads are the baseline lite loads are compared with
+            learn(host, total, cpu_ms, result)
+            self.last = {"lite": False, "bytes": total, "cpu_ms": cpu_ms}
+            self.measured.emit()
+            return
+        full = hosts.get(host)
+        if full: # Same site loaded in full before, compare against it
+            saved_bytes = max(round(full[0]) - total, 0)
+            saved_cpu = max(round(full[1]) - cpu_ms, 0) if cpu_ms is not None and full[1] is not None else None
+        else: # Never seen in full, estimate from what was blocked
+            saved_bytes = round(sum(count * averages[kind] for kind, count in self.blocked.items()))
+            saved_cpu = None
+        self.saved_bytes += saved_bytes
+        self.saved_cpu_ms += saved_cpu or 0
+        totals["loads"] += 1
+        totals["blocked"] += blocked
+        totals["saved_bytes"] += saved_bytes
+        totals["saved_cpu_ms"] += saved_cpu or 0
+        self.last = {"lite": True, "bytes": total, "cpu_ms": cpu_ms, "blocked": dict(self.blocked),
+                     "saved_bytes": saved_bytes, "saved_cpu_ms": saved_cpu, "estimated": not full}
+        if(debug.debug_bool): print(f"Lite: {self.page.url().toString()} {total // KB} KB, blocked {self.blocked}, "
+                                    f"saved ~{saved_bytes // KB} KB, CPU {cpu_ms} ms (saved {saved_cpu}) | "
+                                    f"total {totals['saved_bytes'] // KB} KB, {totals['saved_cpu_ms']} ms")
+        self.measured.emit()
+
+    def summary(self): # One line for the toolbar tooltip
+        if not self.last:
+            return ""
+        if not self.last["lite"]:
+            return f"{self.last['bytes'] // KB} KB, CPU {self.last['cpu_ms']} ms"
+        blocked = ", ".join(f"{count} {kind}" for kind, count in self.last["blocked"].items()) or "nothing"
+        cpu = f", CPU -{self.last['saved_cpu_ms']} ms" if self.last["saved_cpu_ms"] is not None else ""
+        approx = "~" if self.last["estimated"] else ""
+        return f"{blocked} blocked, {approx}{self.last['saved_bytes'] // KB} KB saved{cpu} | tab {self.saved_bytes // KB} KB"
+
+def learn(host, total, cpu_ms, result):
+    for kind in AVERAGE_START:
+        if result[f"{kind}_n"]:
+            averages[kind] += LEARN_RATE * (result[kind] / result[f"{kind}_n"] - averages[kind])
+    old = hosts.get(host)
+    if old is None:
+        hosts[host] = [total, cpu_ms]
+        return
+    old[0] += LEARN_RATE * (total - old[0])
+    if cpu_ms is not None:
+        old[1] = cpu_ms if old[1] is None else old[1] + LEARN_RATE * (cpu_ms - old[1])
+
+def attach(page, inner=None): # Installs the page's Saver, wrapping the content blocker so both run
+    saver = Saver(page, inner)
+    page.saver = saver
+    page.setUrlRequestInterceptor(saver)
+    page.loadStarted.connect(saver.on_started)
+    page.loadFinished.connect(saver.on_finished)
+    return saver
+
+load_rules()
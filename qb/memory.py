@@ -0,0 +1,46 @@
+import os
+
+try: # Optional, only needed outside Linux
+    import psutil
+except ImportError:
+    psutil = None
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def rss(pid): # Resident memory of a process in bytes, None if it can't be read
+    if not pid:
+        return None
+    if psutil:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/statm", "r") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+def total_rss(pids):
+    return sum(rss(pid) or 0 for pid in set(pids))
+
+def mb(size):
+    return f"{(size or 0) / 1048576:.1f} MB"
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def cpu_time(pid): # User plus system CPU seconds a process has used, None if it can't be read
+    if not pid:
+        return None
+    if psutil:
+        try:
+            times = psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,202 @@
+import re, math, time, threading
+from bisect import bisect_left, insort
+from heapq import merge
+
+HALF_LIFE = 14 * 86400 # A visit two weeks ago counts half as much as one now
+EPOCH = 1.7e9
+TOP = 24 # Best entries kept per token and per short prefix
+SHORT = 4 # Prefixes up to this length have their results kept ready
+CACHE_SIZE = 4096 # Longer prefixes already typed once
+
+split = re.compile(r"[^\w]+").split
+noise = re.compile(r"(?=.*\d)(?=.*[a-z])\w{9,}|\w{25,}").fullmatch # ids and hashes, one-off tokens that only cost memory
+
+def frecency(visits, last_visit): # log2 of the decayed visit sum, only grows, so rankings never need a rescan
+    return math.log2(max(visits, 1)) + (last_visit - EPOCH) / HALF_LIFE
+
+def add_score(old, new): # log2(2**old + 2**new) without overflow
+    high, low = max(old, new), min(old, new)
+    return high + math.log2(1 + 2 ** (low - high))
+
+def tokenize(url, title=""):
+    url = url.lower()
+    for scheme in ("https://", "http://", "file://"):
+        if url.startswith(scheme):
+            url = url[len(scheme):]
+            break
+    if url.startswith("www."):
+        url = url[4:]
+    return {token for token in split(url) + split(title.lower()) if token and not noise(token)}
+
+class Entry:
+    __slots__ = ("url", "title", "score")
+
+    def __init__(self, url, title, score):
+        self.url, self.title, self.score = url, title, score
+
+    def tokens(self):
+        return tokenize(self.url, self.title)
+
+    def matches(self, terms):
+        text = f"{self.url} {self.title}".lower()
+        return all(term in text for term in terms)
+
+class FrecencyIndex: # Prefix/token index over history, best results kept ready per prefix
+    def __init__(self):
+        self.entries = [] # id -> Entry
+        self.ids = {} # url -> id
+        self.top = {} # token or short prefix -> ids, best first
+        self.tokens = [] # sorted, for prefix ranges
+        self.cache = {} # longer prefix -> ids, kept current on updates
+        self.pending = None # visits seen while a replacement index builds
+
+    def key(self, entry_id):
+        return self.entries[entry_id].score
+
+    def push(self, bucket, entry_id): # Keep bucket's list as the TOP best ids
+        ids = self.top.get(bucket)
+        if ids is None:
+            self.top[bucket] = [entry_id]
+            return
+        score = self.entries[entry_id].score
+        if entry_id in ids:
+            ids.remove(entry_id)
+        elif len(ids) >= TOP and score <= self.entries[ids[-1]].score:
+            return
+        i = 0
+        while i < len(ids) and self.entries[ids[i]].score >= score:
+            i += 1
+        ids.insert(i, entry_id)
+        del ids[TOP:]
+
+    def buckets(self, tokens, short=SHORT):
+        found = set(tokens)
+        for token in tokens:
+            for n in range(short, 0, -1):
+                found.add(token[:n])
+        return found
+
+    def merge(self, keys): # Best TOP ids across several best-first lists
+        seen = set()
+        lists = [self.top[key] for key in keys]
+        for entry_id in merge(*lists, key=self.key, reverse=True):
+            seen.add(entry_id)
+            if len(seen) >= TOP:
+                break
+        return sorted(seen, key=self.key, reverse=True)
+
+    def add(self, url, title="", score=None, sort=True):
+        if score is None:
+            score = frecency(1, time.time())
+        entry_id = self.ids.get(url)
+        if entry_id is None:
+            entry = Entry(url, title, score)
+            entry_id = len(self.entries)
+            self.entries.append(entry)
+            self.ids[url] = entry_id
+        else:
+            entry = self.entries[entry_id]
+            entry.score = add_score(entry.score, score)
+            if title: entry.title = title
+        tokens = entry.tokens()
+        if sort:
+            for token in tokens:
+                if token not in self.top:
+                    insort(self.tokens, token)
+        for bucket in self.buckets(tokens):
+            self.push(bucket, entry_id)
+        for token in tokens: # Cached prefix results that this entry could now enter
+            for n in range(1, len(token) + 1):
+                ids = self.cache.get(token[:n])
+                if ids is not None and (entry_id in ids or len(ids) < TOP or entry.score > self.entries[ids[-1]].score):
+                    if entry_id not in ids: ids.append(entry_id)
+                    ids.sort(key=self.key, reverse=True)
+                    del ids[TOP:]
+        return entry_id
+
+    def add_visit(self, url, title="", ts=None):
+        ts = ts or time.time()
+        if self.pending is not None:
+            self.pending.append((url, title, ts))
+        self.add(url, title, frecency(1, ts))
+
+    def set_title(self, url, title): # New title words become searchable, the score stays
+        entry_id = self.ids.get(url)
+        if entry_id is None or not title:
+            return
+        if self.pending is not None:
+            self.pending.append((url, title, None))
+        self.add(url, title, float("-inf"))
+
+    def bulk(self, rows): # (url, title, visit_count, last_visit) into an empty index
+        for url, title, visits, last_visit in rows:
+            if url not in self.ids:
+                self.ids[url] = len(self.entries)
+                self.entries.append(Entry(url, title or "", frecency(visits, last_visit)))
+        top = self.top
+        for entry_id in sorted(range(len(self.entries)), key=self.key, reverse=True):
+            for bucket in self.buckets(self.entries[entry_id].tokens(), 0): # Best first, so appending keeps order
+                ids = top.get(bucket)
+                if ids is None:
+                    top[bucket] = [entry_id]
+                elif len(ids) < TOP:
+                    ids.append(entry_id)
+        for n in range(SHORT, 0, -1): # Prefix lists from the level below, shortest last
+            children = {}
+            for key in list(top):
+                if len(key) > n and (len(key) == n + 1 or n == SHORT):
+                    children.setdefault(key[:n], []).append(key)
+            for prefix, keys in children.items():
+                if prefix in top: keys.append(prefix)
+                top[prefix] = self.merge(keys)
+        self.tokens = sorted(top)
+
+    def prefix(self, prefix):
+        if len(prefix) <= SHORT:
+            return self.top.get(prefix, [])
+        ids = self.cache.get(prefix)
+        if ids is None:
+            lo = bisect_left(self.tokens, prefix)
+            hi = bisect_left(self.tokens, prefix + "\uffff", lo)
+            ids = self.merge(self.tokens[lo:hi])
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[prefix] = ids # Kept current by add()
+        return ids
+
+    def query(self, text, limit=8):
+        terms = [term for term in split(text.lower()) if term]
+        if not terms:
+            return []
+        first, rest = max(terms, key=len), terms # The longest term narrows the most
+        results = []
+        for entry_id in self.prefix(first):
+            entry = self.entries[entry_id]
+            if entry.matches(rest):
+                results.append((entry.url, entry.title))
+                if len(results) >= limit:
+                    break
+        return results
+
+def build(rows, done): # Builds a fresh index off the Qt thread and hands it to done()
+    def run():
+        index = FrecencyIndex()
+        index.bulk(rows() if callable(rows) else rows)
+        done(index)
+    thread = threading.Thread(target=run, name="omnibox-index", daemon=True)
+    thread.start()
+    return thread
+
+def adopt(current, built): # Replays what happened on current after the rows built was made from were read
+    for url, title, ts in current.pending or ():
+        if ts is None:
+            built.set_title(url, title)
+        else:
+            built.add(url, title, frecency(1, ts))
+    return built
+
+def match_tabs(tabs, text, limit=3): # Open tabs, a plain scan is fine at tab counts
+    terms = [term for term in split(text.lower()) if term]
+    if not terms:
+        return []
+    return [(url, title) for url, title in tabs if all(term in f"{url} {title}".lower() for term in terms)][:limit]
@@ -0,0 +1,83 @@
+import os
+from qb import debug
+from qb.config import settings
+
+# Chromium flags only take effect before QtWebEngine starts, so a change applies on the next launch.
+PROFILES = {
+    "low-memory": {
+        "title": "Low memory",
+        "flags": [
+            "--process-per-site", # Tabs of one site share a renderer
+            "--renderer-process-limit=4", # Past this, sites share renderers too
+            "--js-flags=--optimize-for-size", # One V8 flag, the variable is split on spaces
+            "--disable-features=BackForwardCache", # Keeps no hidden copies of pages left behind
+            "--enable-low-end-device-mode",
+        ],
+        "memory_cache_mb": 16,
+        "disk_cache_mb": 64,
+        "prerender": False, # A hidden home page is a whole extra renderer
+        "attributes": {"DnsPrefetchEnabled": False, "WebGLEnabled": False, "Accelerated2dCanvasEnabled": False,
+                       "ScrollAnimatorEnabled": False},
+    },
+    "balanced": { # Qt WebEngine's own defaults
+        "title": "Balanced",
+        "flags": [],
+        "memory_cache_mb": 64,
+        "disk_cache_mb": 256,
+        "prerender": True,
+        "attributes": {},
+    },
+    "throughput": {
+        "title": "Throughput",
+        "flags": [
+            "--enable-gpu-rasterization",
+            "--enable-zero-copy",
+            "--ignore-gpu-blocklist",
+            "--num-raster-threads=4",
+            "--enable-features=BackForwardCache",
+        ],
+        "memory_cache_mb": 256,
+        "disk_cache_mb": 1024,
+        "prerender": True,
+        "attributes": {"DnsPrefetchEnabled": True, "ScrollAnimatorEnabled": True},
+    },
+}
+DEFAULT = "balanced"
+active = None # Profile this process started with, a changed setting waits for the next start like the flags do
+
+def saved_name(): # What the next start will use
+    name = settings.get("perf_profile", DEFAULT)
+    return name if name in PROFILES else DEFAULT
+
+def current_name():
+    global active
+    if active is None:
+        active = saved_name()
+    return active
+
+def current():
+    return PROFILES[current_name()]
+
+def set_profile(name): # Persisted now, used from the next start
+    if name in PROFILES:
+        settings.set("perf_profile", name)
+
+def apply_flags(name=None): # Call before QApplication exists; flags already in the environment win
+    global active
+    if name in PROFILES:
+        active = name
+    flags = PROFILES[current_name()]["flags"]
+    existing = os.environ.get("QTWEBENGINE_CHROMIUM_FLAGS", "")
+    names = {flag.split("=", 1)[0] for flag in existing.split()}
+    added = [flag for flag in flags if flag.split("=", 1)[0] not in names]
+    if added:
+        os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(filter(None, [existing] + added))
+    if(debug.debug_bool): print(f"Performance profile: {current_name()} | {os.environ.get('QTWEBENGINE_CHROMIUM_FLAGS', '')}")
+
+def cache_mb(key): # Explicit config values beat the profile's
+    return settings.get_int(key, current()[key])
+
+def apply_settings(web_settings): # QWebEngineSettings of a profile
+    attributes = type(web_settings).WebAttribute
+    for name, value in current()["attributes"].items():
+        web_settings.setAttribute(getattr(attributes, name), value)
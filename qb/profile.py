@@ -0,0 +1,79 @@
+import os
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtWebEngineCore import QWebEngineProfile, QWebEnginePage
+from qb import debug
+from qb.config import settings
+from qb import perfprofile
+from qb import lite
+from qb.cookies import CookiesPath
+
+MB = 1024 * 1024
+MODES = {"ephemeral": "Private (memory cache)", "persistent": "Persistent (disk cache)"}
+CacheType = QWebEngineProfile.HttpCacheType
+
+profiles = {} # mode -> profile, kept while any tab may still use it
+stats = {"resources": 0, "hits": 0, "network_bytes": 0, "cached_bytes": 0}
+
+# Resource Timing: a transferSize of 0 with a body means the cache answered.
+# Cross-origin entries without Timing-Allow-Origin report zeros and are skipped.
+CACHE_STATS_JS = """
+(() => {
+    let total = 0, hits = 0, network = 0, cached = 0;
+    for (const r of performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))) {
+        if (!r.decodedBodySize) continue;
+        total++;
+        if (r.transferSize === 0) { hits++; cached += r.decodedBodySize; } else network += r.transferSize;
+    }
+    return [total, hits, network, cached];
+})()
+"""
+
+def current_mode():
+    mode = settings.get("profile", "ephemeral")
+    return mode if mode in MODES else "ephemeral"
+
+def set_mode(mode): # New tabs pick it up, open ones keep the profile they were made with
+    if mode in MODES:
+        settings.set("profile", mode)
+
+def get_profile(mode=None):
+    mode = mode or current_mode()
+    if mode not in profiles:
+        profiles[mode] = build(mode)
+    return profiles[mode]
+
+def build(mode):
+    app = QApplication.instance() # Parented to the app so it outlives every page
+    if mode == "persistent":
+        path = settings.get("profile_path", str(CookiesPath))
+        profile = QWebEngineProfile("qBrowser", app)
+        profile.setPersistentStoragePath(path)
+        profile.setCachePath(settings.get("cache_path", os.path.join(path, "cache")))
+        profile.setHttpCacheType(CacheType.DiskHttpCache)
+        profile.setHttpCacheMaximumSize(perfprofile.cache_mb("disk_cache_mb") * MB)
+    else: # Off the record: nothing touches the disk, cache lives and dies with the process
+        profile = QWebEngineProfile(app)
+        profile.setHttpCacheType(CacheType.MemoryHttpCache)
+        profile.setHttpCacheMaximumSize(perfprofile.cache_mb("memory_cache_mb") * MB)
+    perfprofile.apply_settings(profile.settings())
+    if(debug.debug_bool): print(f"Profile: {mode}, cache {profile.httpCacheMaximumSize() // MB} MB at {profile.cachePath() or 'memory'}")
+    return profile
+
+def new_page(parent): # Lite rules are applied as each navigation starts
+    return lite.Page(get_profile(), parent)
+
+def collect_cache_stats(page, ok=True):
+    if ok and debug.debug_bool:
+        page.runJavaScript(CACHE_STATS_JS, lambda result: add_cache_stats(page.url().toString(), result))
+
+def add_cache_stats(url, result):
+    if not result:
+        return
+    total, hits, network, cached = (int(value) for value in result)
+    stats["resources"] += total
+    stats["hits"] += hits
+    stats["network_bytes"] += network
+    stats["cached_bytes"] += cached
+    rate = stats["hits"] / stats["resources"] * 100 if stats["resources"] else 0
+    print(f"Cache: {url} {hits}/{total} from cache, {network // 1024} KB over network | "
+          f"total hit rate {rate:.0f}%, {stats['cached_bytes'] // MB} MB served from cache")
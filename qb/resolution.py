@@ -1,6 +1,8 @@
-import ctypes
+from PyQt6.QtGui import QGuiApplication
 
-user32 = ctypes.windll.user32
-user32.SetProcessDPIAware()
-
-width, height = user32.GetSystemMetrics(0), user32.GetSystemMetrics(1)
\ No newline at end of file
+def size(): # Available size of the primary screen, needs a QApplication
+    screen = QGuiApplication.primaryScreen()
+    if screen is None:
+        return 1920, 1080
+    geometry = screen.availableGeometry()
+    return geometry.width(), geometry.height()
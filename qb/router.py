@@ -0,0 +1,89 @@
+import os, re
+from functools import lru_cache
+from urllib.parse import quote_plus
+from PyQt6.QtCore import QUrl
+from qb import search
+
+# Bangs resolve here instead of going through a search engine's redirect. "!w kittens" or "kittens !w".
+BANGS = {
+    "g": "https://www.google.com/search?q={}",
+    "ddg": "https://duckduckgo.com/?q={}",
+    "ya": "https://yandex.ru/search/?text={}",
+    "b": "https://www.bing.com/search?q={}",
+    "br": "https://search.brave.com/search?q={}",
+    "w": "https://en.wikipedia.org/wiki/Special:Search?search={}",
+    "wr": "https://ru.wikipedia.org/wiki/Special:Search?search={}",
+    "yt": "https://www.youtube.com/results?search_query={}",
+    "gh": "https://github.com/search?q={}",
+    "so": "https://stackoverflow.com/search?q={}",
+    "r": "https://www.reddit.com/search/?q={}",
+    "m": "https://www.google.com/maps/search/{}",
+    "py": "https://docs.python.org/3/search.html?q={}",
+    "pypi": "https://pypi.org/search/?q={}",
+    "mdn": "https://developer.mozilla.org/en-US/search?q={}",
+    "tr": "https://translate.google.com/?sl=auto&tl=en&text={}",
+}
+# Common generic TLDs and country codes used like them
+TLDS = frozenset("""com org net edu gov mil int info biz name pro app dev io ai co me tv ly gg xyz site online
+top club shop store tech blog page wiki news live cloud art design space website link click email world
+рф рус бел укр қаз срб мкд москва онлайн сайт орг ком""".split())
+# Country codes taken on their own. Ones that are also file extensions (py, pl, in, md, sh, rs, cc...) need
+# www., a path or a port, so "main.py" is searched for, not opened as https://main.py
+CCTLDS = frozenset("""ru ua by kz uz am ge az kg lv lt ee cz sk hu ro bg hr si ba me al gr tr cy
+de at ch fr be nl lu uk ie it es pt dk se no fi is eu su us ca mx br ar cl pe ve uy
+jp cn kr tw hk sg my th vn id ph pk bd lk ir il ae sa eg za ng ke au nz""".split())
+SCHEMES = re.compile(r"^(?:https?|file|ftp|about|data|view-source|chrome|qrc|blob|mailto):", re.I)
+HOST = re.compile(r"""^(?P<host>
+    localhost
+    | \[[0-9a-f:.]+\]
+    | \d{1,3}(?:\.\d{1,3}){3}
+    | (?:[^\W_](?:[\w-]{0,61}[^\W_])?\.)+(?P<tld>[^\W\d_]{2,63}|xn--[\w-]+)
+)(?P<port>:\d{1,5})?(?P<path>[/?#]\S*)?$""", re.I | re.X)
+FILE = re.compile(r"^(?:/|~/|[a-z]:[\\/])", re.I)
+BANG = re.compile(r"(?:^|\s)!(\S+)(?:\s|$)")
+
+def is_host(text):
+    match = HOST.match(text)
+    if not match:
+        return False
+    tld = (match.group("tld") or "").lower()
+    if not tld or tld in TLDS or tld in CCTLDS or tld.startswith("xn--") or match.group("port"):
+        return True
+    return len(tld) == 2 and bool(match.group("path") or text.lower().startswith("www."))
+
+def bang(text): # (template, query) for "!key query" / "query !key", or None
+    match = BANG.search(text)
+    if not match or match.group(1).lower() not in BANGS:
+        return None
+    query = (text[:match.start()] + " " + text[match.end():]).strip()
+    return BANGS[match.group(1).lower()], query
+
+def classify(text, template): # (kind, target), a typed path is looked up on disk every time
+    text = text.strip()
+    if FILE.match(text):
+        path = os.path.expanduser(text)
+        if os.path.exists(path):
+            return "file", QUrl.fromLocalFile(os.path.abspath(path)).toString()
+    return classify_text(text, template)
+
+@lru_cache(maxsize=4096) # Every keystroke asks, typing back and forth hits the cache
+def classify_text(text, template):
+    if not text:
+        return "empty", ""
+    if SCHEMES.match(text):
+        return "url", text
+    if " " not in text and is_host(text):
+        host = HOST.match(text).group("host").lower()
+        local = host == "localhost" or host[0].isdigit() or host.startswith("[") # Local servers rarely speak TLS
+        return "host", ("http://" if local else "https://") + text
+    found = bang(text)
+    if found:
+        template, query = found
+        if not query: # Bare "!w" opens the site itself
+            url = QUrl(template.format(""))
+            return "bang", url.adjusted(QUrl.UrlFormattingOption.RemovePath | QUrl.UrlFormattingOption.RemoveQuery).toString()
+        return "bang", template.format(quote_plus(query))
+    return "search", template.format(quote_plus(text))
+
+def route(text): # Where typed or spoken input should go, "" for nothing
+    return classify(text, search.GetCurrentSearchEngine(3))[1]
@@ -1,27 +1,122 @@
-from pypresence import Presence
-import os, time
+import time, threading, asyncio
 from qb.core import *
 from qb import debug
+from qb.config import settings
 
 client_id = "1496895954186670102"
-RPC = Presence(client_id)
-RPC.connect()
-
 start_time = time.time()
 
+RATE_LIMIT = (5, 20.0) # Discord accepts 5 activity updates per 20 seconds
+BACKOFF_MIN, BACKOFF_MAX = 1.0, 60.0 # seconds between reconnect attempts
+IDLE_TEXT = "Life is sunshine and rainbows."
+
+def presence_client(): # Default factory, pypresence is only imported once RPC is on
+    from pypresence import Presence
+    return Presence(client_id)
+
+class PresenceWorker(threading.Thread): # Owns the Discord connection, publishes only the latest state
+    def __init__(self, factory=presence_client):
+        super().__init__(name="discord-rpc", daemon=True)
+        self.factory = factory
+        self.cond = threading.Condition()
+        self.latest = IDLE_TEXT # Single slot, a newer value replaces an unsent one
+        self.sent = None
+        self.stopping = False
+        self.client = None
+        self.backoff = BACKOFF_MIN
+        self.history = [] # send times inside the rate window
+        self.updates = 0
+        self.dropped = 0
+
+    def publish(self, text):
+        with self.cond:
+            if text == self.latest:
+                return
+            if self.latest != self.sent:
+                self.dropped += 1 # Replaced before it was sent
+            self.latest = text
+            self.cond.notify()
+
+    def stop(self):
+        with self.cond:
+            self.stopping = True
+            self.cond.notify()
+
+    def wait(self, seconds): # Sleeps, but wakes up for stop()
+        with self.cond:
+            if not self.stopping:
+                self.cond.wait(seconds)
+            return not self.stopping
+
+    def rate_delay(self):
+        count, window = RATE_LIMIT
+        now = time.monotonic()
+        self.history = [at for at in self.history if now - at < window]
+        return 0 if len(self.history) < count else window - (now - self.history[0])
+
+    def run(self):
+        asyncio.set_event_loop(asyncio.new_event_loop()) # pypresence needs a loop in this thread
+        while True:
+            with self.cond:
+                while self.latest == self.sent and not self.stopping:
+                    self.cond.wait()
+                if self.stopping:
+                    break
+            delay = self.rate_delay()
+            if delay > 0: # Newer values keep landing in the slot meanwhile
+                if not self.wait(delay): break
+                continue
+            if self.client is None and not self.connect():
+                if not self.wait(self.backoff): break
+                self.backoff = min(self.backoff * 2, BACKOFF_MAX)
+                continue
+            with self.cond:
+                text = self.latest
+            try:
+                self.client.update(
+                    large_image="icon",
+                    start=start_time,
+                    details=text,
+                    buttons=[{"label":"Source Code", "url":"https://github.com/qualzed/qBrowser"}]
+                )
+                self.sent = text
+                self.updates += 1
+                self.history.append(time.monotonic())
+            except Exception as e:
+                if(debug.debug_bool): print(f"RPC: update failed, reconnecting | {e}")
+                self.disconnect()
+        self.disconnect(clear=True)
+
+    def connect(self):
+        try:
+            self.client = self.factory()
+            self.client.connect()
+            self.backoff = BACKOFF_MIN
+            if(debug.debug_bool): print("RPC: connected")
+            return True
+        except Exception as e:
+            if(debug.debug_bool): print(f"RPC: connect failed, retry in {self.backoff:.0f}s | {e}")
+            self.client = None
+            return False
+
+    def disconnect(self, clear=False):
+        if self.client is None:
+            return
+        try:
+            if clear: self.client.clear()
+            self.client.close()
+        except Exception:
+            pass
+        self.client = None
+        self.sent = None
+
+worker = None
+
 def get_rpc():
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("rpc"):
-                    rpc = line.strip().split("=", 1)[1]
-                    return int(rpc)
+    return settings.get_int("rpc", 0)
 
 def set_rpc(rpc: bool):
-    os.makedirs(os.path.dirname(config_path), exist_ok=True)
-    lines = open(config_path, 'r', encoding='utf-8').readlines() if os.path.exists(config_path) else ['']
-    lines[4] = f"rpc={int(rpc)}\n"
-    with open(config_path, 'w', encoding='utf-8') as f: f.writelines(lines)
+    settings.set("rpc", int(rpc))
 
 def on_rpc_changed(rpc_text):
     if(rpc_text == "RPC (On)"):
@@ -30,23 +125,21 @@ def on_rpc_changed(rpc_text):
         if(debug.debug_bool): print(f"RPC: RPC ON | {rpc_text=} ")
     else:
         set_rpc(False)
+        StopRPC()
         if(debug.debug_bool): print(f"RPC: RPC OFF | {rpc_text=}")
 
-def StartRPC():
-    try:
-        RPC.update(
-            large_image="icon",
-            start=start_time,
-            details="Life is sunshine and rainbows.",
-            buttons=[{"label":"Source Code", "url":"https://github.com/qualzed/qBrowser"}]
-        )
-    except Exception as e:
-        RPC.connect()
-
-def UpdateRPC(text):
-    RPC.update(
-        large_image="icon",
-        start=start_time,
-        details=text,
-        buttons=[{"label":"Source Code", "url":"https://github.com/qualzed/qBrowser"}]
-    )
\ No newline at end of file
+def StartRPC(factory=presence_client):
+    global worker
+    if worker is None or not worker.is_alive():
+        worker = PresenceWorker(factory)
+        worker.start()
+
+def StopRPC():
+    global worker
+    if worker is not None:
+        worker.stop()
+        worker = None
+
+def UpdateRPC(text): # Never blocks, the worker sends it when it can
+    if worker is not None:
+        worker.publish(text)
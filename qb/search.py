@@ -1,14 +1,14 @@
-import os
 from qb.core import *
 from qb import debug
-
-SearchEngine = {
-    0: ("Google", "https://google.com"),
-    1: ("DuckDuckGo", "https://duckduckgo.com"),
-    2: ("Yandex", "https://yandex.ru"),
-    3: ("SearXNG", "https://searxng.org"),
-    4: ("Brave", "https://search.brave.com"),
-    5: ("Bing", "https://bing.com")
+from qb.config import settings
+
+SearchEngine = { # Name, home page, query template ({} is the encoded query)
+    0: ("Google", "https://google.com", "https://www.google.com/search?q={}"),
+    1: ("DuckDuckGo", "https://duckduckgo.com", "https://duckduckgo.com/?q={}"),
+    2: ("Yandex", "https://yandex.ru", "https://yandex.ru/search/?text={}"),
+    3: ("SearXNG", "https://searxng.org", "https://searxng.org/search?q={}"),
+    4: ("Brave", "https://search.brave.com", "https://search.brave.com/search?q={}"),
+    5: ("Bing", "https://bing.com", "https://www.bing.com/search?q={}")
 }
 
 def SearchEngineList():
@@ -25,34 +25,23 @@ def GetSearchEngineIndex(SearchEngineName: str):
         if(SearchEngine[i][0] == SearchEngineName):
             return i
 
-def GetCurrentSearchEngine(type: int): # 0 - ID, 1 - NAME, 2 - LINK
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("search"):
-                    CFG_SEARCHENGINE = line.strip().split("=", 1)[1]
-                    if(type == 1):
-                        SearchEngineName: str = GetSearchEngineName(CFG_SEARCHENGINE)
-                        return SearchEngineName
-                    if(type == 2):
-                        SearchEngineLink: str = SearchEngine[int(CFG_SEARCHENGINE)][1]
-                        return SearchEngineLink
-
+def GetCurrentSearchEngine(type: int): # 0 - ID, 1 - NAME, 2 - LINK, 3 - QUERY TEMPLATE
+    CFG_SEARCHENGINE = settings.get_int("search", 0)
+    if CFG_SEARCHENGINE not in SearchEngine:
+        CFG_SEARCHENGINE = 0
     if(type == 1):
-        return SearchEngine[0][0]
+        return SearchEngine[CFG_SEARCHENGINE][0]
     if(type == 2):
-        return SearchEngine[0][1]
-    else:
-        return "0"
+        return SearchEngine[CFG_SEARCHENGINE][1]
+    if(type == 3):
+        return SearchEngine[CFG_SEARCHENGINE][2]
+    return str(CFG_SEARCHENGINE)
 
 def SearchEngines():
     return [SearchEngine[i][0] for i in range(len(SearchEngine))]
 
 def set_search(engine):
-    os.makedirs(os.path.dirname(config_path), exist_ok=True)
-    lines = open(config_path, 'r', encoding='utf-8').readlines() if os.path.exists(config_path) else ['']
-    lines[3] = f"search={engine}\n"
-    with open(config_path, 'w', encoding='utf-8') as f: f.writelines(lines)
+    settings.set("search", engine)
 
 def on_search_changed(Engine):
     EngineIndex = GetSearchEngineIndex(Engine)
@@ -0,0 +1,44 @@
+import json, time
+from PyQt6.QtWidgets import QWidget
+from qb.core import *
+from qb import debug
+from qb.config import atomic_write, Debouncer
+
+class LazyTab(QWidget): # Stand-in for a restored tab, the real view is created on first activation
+    def __init__(self, url, title=""):
+        super().__init__()
+        self.url = url
+        self.title = title
+
+class SessionJournal: # Open tabs written to disk shortly after every change
+    def __init__(self, path=session_path):
+        self.path = path
+        self.data = None
+        self.write_later = Debouncer(self.flush, 0.3)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            tabs = [tab for tab in data.get("tabs", []) if tab.get("url")]
+            active = min(max(int(data.get("active", 0)), 0), max(len(tabs) - 1, 0))
+            return tabs, active
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            if(debug.debug_bool): print(f"Session: nothing restored | {e}")
+            return [], 0
+
+    def record(self, tabs, active): # tabs: [(url, title)] in tab order
+        self.data = json.dumps({
+            "tabs": [{"url": url, "title": title} for url, title in tabs],
+            "active": active,
+            "saved": time.time(),
+        }, ensure_ascii=False)
+        self.write_later()
+
+    def flush(self):
+        self.write_later.cancel()
+        data, self.data = self.data, None
+        if data is not None:
+            atomic_write(self.path, data)
+
+journal = SessionJournal()
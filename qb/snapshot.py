@@ -0,0 +1,194 @@
+import os, time, uuid, queue, hashlib, threading, atexit, sqlite3
+from PyQt6.QtCore import QObject, QUrl
+from PyQt6.QtWebEngineCore import QWebEngineDownloadRequest
+from qb.core import *
+from qb import debug
+from qb.config import settings
+from qb.history import connect, RECORD_SCHEMES
+
+MB = 1024 * 1024
+MIN_AGE = 600 # Seconds before the same URL is snapshotted again
+SaveFormat = QWebEngineDownloadRequest.SavePageFormat
+Done = QWebEngineDownloadRequest.DownloadState
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    url TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    saved REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS snapshots_lru ON snapshots (last_used);
+CREATE INDEX IF NOT EXISTS snapshots_hash ON snapshots (hash);
+"""
+
+class SnapshotStore(QObject): # MHTML copies of visited pages, one file per distinct content, LRU under a disk budget
+    def __init__(self, folder=snapshots_path, parent=None):
+        super().__init__(parent)
+        self.folder = folder
+        self.blobs = os.path.join(folder, "blobs")
+        self.incoming = os.path.join(folder, "incoming")
+        self.db_path = os.path.join(folder, "index.db")
+        self.local = threading.local()
+        self.pending = {} # save path -> url, while QtWebEngine writes it
+        self.served = {} # snapshot file -> original url, for tabs showing one
+        self.recent = {} # url -> time of the last capture request
+        self.hooked = set() # Profiles whose downloadRequested is connected
+        self.jobs = queue.Queue()
+        self.worker = None
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def start(self): # Folders, index and writer on first use, the feature is opt-in
+        with self.lock:
+            if self.worker is None:
+                os.makedirs(self.blobs, exist_ok=True)
+                os.makedirs(self.incoming, exist_ok=True)
+                db = connect(self.db_path)
+                db.executescript(SCHEMA)
+                db.close()
+                self.worker = threading.Thread(target=self.run, name="snapshot-writer", daemon=True)
+                self.worker.start()
+
+    def enabled(self):
+        return bool(settings.get_int("snapshots", 0))
+
+    def budget(self):
+        return settings.get_int("snapshot_budget_mb", 200) * MB
+
+    def reader(self):
+        db = getattr(self.local, "db", None)
+        if db is None:
+            self.start()
+            db = self.local.db = connect(self.db_path)
+        return db
+
+    # UI thread
+
+    def capture(self, page, ok=True): # Connected to loadFinished, saves at most every MIN_AGE per URL
+        url = page.url().toString()
+        if not (ok and self.enabled() and url.startswith(RECORD_SCHEMES)) or url.startswith("file:"):
+            return
+        if page.profile().isOffTheRecord() or time.time() - self.recent.get(url, 0) < MIN_AGE: # Private pages never reach the disk
+            return
+        self.recent[url] = time.time()
+        self.start()
+        profile = page.profile()
+        if id(profile) not in self.hooked:
+            profile.downloadRequested.connect(self.on_download)
+            self.hooked.add(id(profile))
+        path = os.path.abspath(os.path.join(self.incoming, f"{uuid.uuid4().hex}.mhtml"))
+        self.pending[path] = url
+        page.save(path, SaveFormat.MimeHtmlSaveFormat)
+
+    def is_own(self, download): # Save-page downloads this store started, the download manager skips them
+        path = os.path.abspath(os.path.join(download.downloadDirectory(), download.downloadFileName()))
+        return download.isSavePageDownload() and path in self.pending
+
+    def on_download(self, download):
+        if not self.is_own(download):
+            return
+        path = os.path.abspath(os.path.join(download.downloadDirectory(), download.downloadFileName()))
+        download.isFinishedChanged.connect(lambda: self.on_saved(download, path))
+
+    def on_saved(self, download, path):
+        url = self.pending.pop(path, None)
+        if url is None:
+            return
+        if download.state() == Done.DownloadCompleted:
+            self.jobs.put(("store", url, path))
+        else:
+            self.jobs.put(("discard", url, path))
+
+    def lookup(self, url): # Path of the snapshot for url, or None
+        if not self.enabled():
+            return None
+        row = self.reader().execute("SELECT hash FROM snapshots WHERE url = ?", (url,)).fetchone()
+        if not row:
+            return None
+        path = os.path.abspath(os.path.join(self.blobs, f"{row[0]}.mhtml"))
+        if not os.path.exists(path):
+            return None
+        self.served[QUrl.fromLocalFile(path).toString()] = url
+        self.jobs.put(("touch", url, None))
+        return path
+
+    def original(self, url): # The page a snapshot tab stands for, or url itself
+        return self.served.get(url, url)
+
+    def is_snapshot(self, url):
+        return url in self.served
+
+    def close(self):
+        if self.worker is not None and self.worker.is_alive():
+            self.jobs.put(None)
+            self.worker.join()
+
+    # Writer thread
+
+    def run(self):
+        db = connect(self.db_path)
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            kind, url, path = job
+            try:
+                match kind:
+                    case "store": self.store(db, url, path)
+                    case "discard": self.remove(path)
+                    case "touch":
+                        with db:
+                            db.execute("UPDATE snapshots SET last_used = ? WHERE url = ?", (time.time(), url))
+            except (OSError, sqlite3.Error) as e:
+                if(debug.debug_bool): print(f"Snapshot: {kind} failed for {url} | {e}")
+        db.close()
+
+    def store(self, db, url, path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        content = digest.hexdigest()
+        size = os.path.getsize(path)
+        blob = os.path.join(self.blobs, f"{content}.mhtml")
+        if os.path.exists(blob): # Same bytes as a snapshot we already have
+            self.remove(path)
+        else:
+            os.replace(path, blob)
+        now = time.time()
+        with db:
+            old = db.execute("SELECT hash FROM snapshots WHERE url = ?", (url,)).fetchone()
+            db.execute("INSERT OR REPLACE INTO snapshots (url, hash, size, saved, last_used) VALUES (?, ?, ?, ?, ?)",
+                       (url, content, size, now, now))
+        if old and old[0] != content:
+            self.release(db, old[0])
+        self.evict(db)
+        if(debug.debug_bool): print(f"Snapshot: {url} {size // 1024} KB ({content[:12]})")
+
+    def release(self, db, content): # Deletes the file once no URL points at it
+        if not db.execute("SELECT 1 FROM snapshots WHERE hash = ? LIMIT 1", (content,)).fetchone():
+            self.remove(os.path.join(self.blobs, f"{content}.mhtml"))
+
+    def evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT hash, size FROM snapshots)").fetchone()[0]
+        budget = self.budget()
+        if total <= budget:
+            return
+        for url, content, size in db.execute("SELECT url, hash, size FROM snapshots ORDER BY last_used").fetchall():
+            with db:
+                db.execute("DELETE FROM snapshots WHERE url = ?", (url,))
+            if not db.execute("SELECT 1 FROM snapshots WHERE hash = ? LIMIT 1", (content,)).fetchone():
+                self.remove(os.path.join(self.blobs, f"{content}.mhtml"))
+                total -= size
+            if total <= budget:
+                break
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+store = SnapshotStore()
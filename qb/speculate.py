@@ -0,0 +1,132 @@
+import time
+from PyQt6.QtCore import QObject, QEvent, QTimer, QUrl
+from qb import debug
+from qb.config import settings
+from qb import perfprofile
+
+DELAY = 150 # ms, typing is coalesced so only the settled text gets hints
+BUDGET = 8 # Origins warmed per WINDOW, beyond that hints are dropped
+WINDOW = 10.0 # Seconds, also about how long Chromium keeps an unused preconnected socket
+PRERENDER_DELAY = 2000 # ms after a prerendered view is taken before the next one starts
+
+stats = {"hints": 0, "skipped": 0, "over_budget": 0, "prerender_hits": 0, "prerender_misses": 0}
+
+def origin(url): # https://host[:port], or "" for schemes there is nothing to connect to
+    url = QUrl(url) if isinstance(url, str) else url
+    if url.scheme() not in ("http", "https") or not url.host():
+        return ""
+    return url.adjusted(QUrl.UrlFormattingOption.RemovePath | QUrl.UrlFormattingOption.RemoveQuery |
+                        QUrl.UrlFormattingOption.RemoveFragment | QUrl.UrlFormattingOption.RemoveUserInfo).toString()
+
+def hint_html(origins): # Both preconnects: fetches with and without credentials use separate sockets
+    links = "".join(f'<link rel="dns-prefetch" href="{o}"><link rel="preconnect" href="{o}">'
+                    f'<link rel="preconnect" href="{o}" crossorigin>' for o in origins)
+    return f"<html><head>{links}</head></html>"
+
+class Speculator(QObject): # DNS and connection warm-up through one hidden page sharing the tabs' profile
+    def __init__(self, page_factory, parent=None):
+        super().__init__(parent)
+        self.page_factory = page_factory
+        self.page = None
+        self.warmed = {} # origin -> time it was last hinted
+        self.pending = []
+        self.watched = {} # widget -> callable returning urls to warm on focus
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(DELAY)
+        self.timer.timeout.connect(self.flush)
+
+    def enabled(self):
+        return bool(settings.get_int("speculate", 1))
+
+    def hint(self, urls, now=False): # Queue origins to warm, the latest call wins
+        if not self.enabled():
+            return
+        self.pending = [o for o in dict.fromkeys(origin(url) for url in urls if url) if o]
+        if now:
+            self.flush()
+        else:
+            self.timer.start()
+
+    def flush(self):
+        self.timer.stop()
+        clock = time.monotonic()
+        for o, at in list(self.warmed.items()):
+            if clock - at > WINDOW:
+                del self.warmed[o]
+        origins = []
+        for o in self.pending:
+            if o in self.warmed:
+                stats["skipped"] += 1 # Still warm from an earlier hint
+            elif len(self.warmed) >= BUDGET:
+                stats["over_budget"] += 1
+            else:
+                self.warmed[o] = clock
+                origins.append(o)
+        self.pending = []
+        if not origins:
+            return
+        if self.page is None:
+            self.page = self.page_factory(self)
+        self.page.setHtml(hint_html(origins), QUrl("about:blank"))
+        stats["hints"] += len(origins)
+        if(debug.debug_bool): print(f"Speculate: preconnect {', '.join(origins)}")
+
+    def cancel(self): # Drops queued hints and stops anything the hidden page still has in flight
+        self.timer.stop()
+        self.pending = []
+        if self.page is not None:
+            self.page.triggerAction(self.page.WebAction.Stop)
+
+    def watch(self, widget, urls): # Focusing the widget warms whatever urls() returns
+        widget.installEventFilter(self)
+        self.watched[widget] = urls
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.FocusIn and obj in self.watched:
+            self.hint(self.watched[obj](), now=True)
+        return False
+
+class Prerenderer(QObject): # Keeps one hidden, fully loaded view of the home page for the next new tab
+    def __init__(self, view_factory, home, parent=None):
+        super().__init__(parent)
+        self.view_factory = view_factory
+        self.home = home # Called each time, so a changed search engine is picked up
+        self.view = None
+        self.url = ""
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(PRERENDER_DELAY)
+        self.timer.timeout.connect(self.prepare)
+
+    def enabled(self):
+        return bool(settings.get_int("prerender", int(perfprofile.current()["prerender"])))
+
+    def prepare(self):
+        if not self.enabled() or self.view is not None:
+            return
+        self.url = self.home()
+        self.view = self.view_factory(QUrl(self.url))
+        if(debug.debug_bool): print(f"Speculate: prerendering {self.url}")
+
+    def take(self, url): # The prerendered view if it is for url, else None; the next one is started later
+        view, self.view = self.view, None
+        if view is not None and self.url == url:
+            stats["prerender_hits"] += 1
+            self.schedule()
+            return view
+        stats["prerender_misses"] += 1
+        if view is not None:
+            view.deleteLater()
+        self.schedule()
+        return None
+
+    def schedule(self):
+        if self.enabled():
+            self.timer.start()
+
+    def cancel(self):
+        self.timer.stop()
+        if self.view is not None:
+            self.view.deleteLater()
+            self.view = None
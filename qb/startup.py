@@ -0,0 +1,40 @@
+import time, threading
+from qb import debug
+
+started = time.perf_counter()
+phases = [] # (name, seconds since start)
+lock = threading.Lock()
+
+def mark(name):
+    with lock:
+        phases.append((name, time.perf_counter() - started))
+
+def mark_once(name):
+    if not any(phase == name for phase, _ in phases):
+        mark(name)
+        return True
+    return False
+
+def background(name, func, *args): # Runs off the Qt thread, its finish time shows up in the report
+    def run():
+        begin = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            if(debug.debug_bool): print(f"Startup: {name} failed | {e}")
+        took = (time.perf_counter() - begin) * 1000
+        mark(f"{name} (background, {took:.0f} ms)")
+        if(debug.debug_bool): print(f"Startup: {name} done in {took:.0f} ms")
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+def report():
+    if not debug.debug_bool:
+        return
+    previous = 0.0
+    print("Startup timing:")
+    with lock:
+        for name, at in phases:
+            print(f"  {name:<40} {at * 1000:8.1f} ms  (+{(at - previous) * 1000:.1f})")
+            previous = at
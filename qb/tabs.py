@@ -0,0 +1,241 @@
+import os
+from PyQt6.QtCore import Qt, QEvent, QTimer, QUrl, QAbstractListModel, QModelIndex, QSortFilterProxyModel, pyqtSignal
+from PyQt6.QtGui import QIcon
+from PyQt6.QtWidgets import QTabWidget, QDockWidget, QListView, QLineEdit, QVBoxLayout, QWidget
+from qb.core import *
+from qb import debug
+from qb import session
+
+FRAME = 16 # ms, title and icon changes reach the strip at most once per frame
+WIDGET_ROLE = Qt.ItemDataRole.UserRole
+SEARCH_ROLE = Qt.ItemDataRole.UserRole + 1
+
+def host_of(url):
+    return QUrl(url).host().replace(":", "_") # IPv6 hosts end up in file names
+
+class FaviconCache: # One icon per host, kept as small PNGs so restored tabs show theirs before they load
+    def __init__(self, folder=favicons_path):
+        self.folder = folder
+        self.icons = {} # host -> QIcon, None when there is none on disk either
+        self.saved = set() # Hosts written this run
+
+    def get(self, url):
+        host = host_of(url)
+        if not host:
+            return None
+        if host not in self.icons:
+            path = os.path.join(self.folder, f"{host}.png")
+            self.icons[host] = QIcon(path) if os.path.exists(path) else None # QIcon reads the file on first paint
+        return self.icons[host]
+
+    def put(self, url, icon):
+        host = host_of(url)
+        if not host or icon.isNull():
+            return
+        self.icons[host] = icon
+        if host not in self.saved:
+            self.saved.add(host)
+            os.makedirs(self.folder, exist_ok=True)
+            icon.pixmap(32, 32).save(os.path.join(self.folder, f"{host}.png"), "PNG")
+
+class TabModel(QAbstractListModel): # Tabs in strip order with O(1) widget -> row, changes applied once per frame
+    flushed = pyqtSignal() # After a batch that changed at least one label or URL
+
+    def __init__(self, label, icons, parent=None):
+        super().__init__(parent)
+        self.label = label # (widget, title) -> text for its tab
+        self.icons = icons
+        self.tab_widget = None # Set by TabWidget
+        self.widgets = []
+        self.rows = {} # widget -> row
+        self.shown = {} # widget -> (text, icon key, url) last put on the strip
+        self.pending = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(FRAME)
+        self.timer.timeout.connect(self.flush)
+
+    # Tab data, the same for placeholders and views
+
+    def url(self, widget):
+        return widget.url if isinstance(widget, session.LazyTab) else widget.url().toString()
+
+    def title(self, widget):
+        return widget.title if isinstance(widget, session.LazyTab) else widget.title()
+
+    def icon(self, widget):
+        if not isinstance(widget, session.LazyTab) and not widget.icon().isNull():
+            return widget.icon()
+        return self.icons.get(self.url(widget))
+
+    # Structure, driven by TabWidget
+
+    def index_of(self, widget):
+        return self.rows.get(widget, -1)
+
+    def renumber(self, start): # Appending, the common case, touches one row
+        for row in range(start, len(self.widgets)):
+            self.rows[self.widgets[row]] = row
+
+    def inserted(self, row, widget):
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.widgets.insert(row, widget)
+        self.renumber(row)
+        self.shown[widget] = (self.tab_widget.tabText(row), None, self.url(widget)) # A restored title stays until the page has its own
+        self.endInsertRows()
+        if isinstance(widget, session.LazyTab): # Its cached favicon
+            self.changed(widget)
+
+    def removed(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        widget = self.widgets.pop(row)
+        self.rows.pop(widget, None)
+        self.shown.pop(widget, None)
+        self.pending.discard(widget)
+        self.renumber(row)
+        self.endRemoveRows()
+
+    def moved(self, source, target):
+        self.beginMoveRows(QModelIndex(), source, source, QModelIndex(), target + 1 if target > source else target)
+        self.widgets.insert(target, self.widgets.pop(source))
+        self.renumber(min(source, target))
+        self.endMoveRows()
+
+    # Updates
+
+    def changed(self, widget): # Title, icon or label changed, coalesced until the next frame
+        if widget in self.rows:
+            self.pending.add(widget)
+            if not self.timer.isActive():
+                self.timer.start()
+
+    def refresh(self): # Every label again, after a language switch
+        self.pending.update(self.widgets)
+        if self.widgets and not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        rows = sorted(self.rows[widget] for widget in self.pending if widget in self.rows)
+        self.pending.clear()
+        if not rows:
+            return
+        bar = self.tab_widget.tabBar()
+        bar.setUpdatesEnabled(False) # One repaint for the whole batch
+        dirty = False
+        for row in rows:
+            widget = self.widgets[row]
+            text = self.label(widget, self.title(widget))
+            icon = self.icon(widget) or QIcon()
+            url = self.url(widget)
+            old_text, old_icon, old_url = self.shown.get(widget, (None, None, None))
+            if text != old_text:
+                self.tab_widget.setTabText(row, text)
+            if icon.cacheKey() != old_icon:
+                self.tab_widget.setTabIcon(row, icon)
+            dirty |= text != old_text or url != old_url
+            self.shown[widget] = (text, icon.cacheKey(), url)
+        bar.setUpdatesEnabled(True)
+        self.dataChanged.emit(self.index(rows[0]), self.index(rows[-1]))
+        if(debug.debug_bool): print(f"Tabs: {len(rows)} updated in one frame")
+        if dirty:
+            self.flushed.emit()
+
+    # Qt model
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.widgets)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        widget = self.widgets[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.shown.get(widget, (None,))[0] or self.label(widget, self.title(widget))
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self.icon(widget)
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return self.url(widget)
+        if role == SEARCH_ROLE:
+            return f"{self.title(widget)} {self.url(widget)}"
+        if role == WIDGET_ROLE:
+            return widget
+        return None
+
+class TabWidget(QTabWidget): # Keeps the model in step with the strip, indexOf answers from the model
+    def __init__(self, model, parent=None):
+        super().__init__(parent)
+        self.model = model
+        model.tab_widget = self
+        self.tabBar().tabMoved.connect(model.moved)
+
+    def tabInserted(self, index):
+        self.model.inserted(index, self.widget(index))
+
+    def tabRemoved(self, index):
+        self.model.removed(index)
+
+    def indexOf(self, widget):
+        return self.model.index_of(widget)
+
+class TabList(QDockWidget): # Vertical tabs with search, the list view paints only the rows on screen
+    close_requested = pyqtSignal(int) # Tab index, from a middle click or Delete
+
+    def __init__(self, model, tab_widget, parent=None):
+        super().__init__(parent)
+        self.setObjectName("tabs")
+        self.tab_widget = tab_widget
+        self.proxy = QSortFilterProxyModel(self)
+        self.proxy.setSourceModel(model)
+        self.proxy.setFilterRole(SEARCH_ROLE)
+        self.proxy.setFilterCaseSensitivity(Qt.CaseSensitivity.CaseInsensitive)
+        self.filter = QLineEdit()
+        self.filter.setClearButtonEnabled(True)
+        self.filter.textChanged.connect(self.proxy.setFilterFixedString)
+        self.filter.returnPressed.connect(lambda: self.activate(self.proxy.index(0, 0)))
+        self.view = QListView()
+        self.view.setUniformItemSizes(True) # Row heights are not measured one by one
+        self.view.setModel(self.proxy)
+        self.view.clicked.connect(self.activate)
+        self.view.viewport().installEventFilter(self)
+        self.view.installEventFilter(self)
+        tab_widget.currentChanged.connect(self.follow)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.filter)
+        layout.addWidget(self.view)
+        container = QWidget()
+        container.setLayout(layout)
+        self.setWidget(container)
+
+    def source_row(self, index):
+        return self.proxy.mapToSource(index).row() if index.isValid() else -1
+
+    def activate(self, index):
+        row = self.source_row(index)
+        if row != -1:
+            self.tab_widget.setCurrentIndex(row)
+
+    def follow(self, row): # Keep the current tab selected and in view
+        index = self.proxy.mapFromSource(self.proxy.sourceModel().index(row))
+        if index.isValid():
+            self.view.setCurrentIndex(index)
+            self.view.scrollTo(index)
+
+    def focus_search(self):
+        self.show()
+        self.raise_()
+        self.filter.setFocus()
+        self.filter.selectAll()
+
+    def eventFilter(self, obj, event):
+        if obj is self.view.viewport() and event.type() == QEvent.Type.MouseButtonRelease and event.button() == Qt.MouseButton.MiddleButton:
+            row = self.source_row(self.view.indexAt(event.position().toPoint()))
+            if row != -1:
+                self.close_requested.emit(row)
+                return True
+        if obj is self.view and event.type() == QEvent.Type.KeyPress and event.key() == Qt.Key.Key_Delete:
+            row = self.source_row(self.view.currentIndex())
+            if row != -1:
+                self.close_requested.emit(row)
+                return True
+        return super().eventFilter(obj, event)
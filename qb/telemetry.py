@@ -0,0 +1,217 @@
+import os, json, time, threading, collections
+from functools import partial
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from PyQt6.QtWidgets import QDockWidget, QTreeWidget, QTreeWidgetItem
+from qb import debug
+from qb import memory
+from qb.config import settings
+
+SAMPLE_INTERVAL = 2000 # ms between renderer memory samples while debug is on
+HISTORY = 20 # Loads kept per tab
+BUFFER = 2000 # Records held for the JSONL file, the oldest are dropped beyond that
+FLUSH_INTERVAL = 1.0 # Seconds between JSONL writes
+COLUMNS = ["Tab", "PID", "RSS", "Load", "TTFB", "DCL", "onload", "Resources", "KB", "Slowest"]
+
+# Navigation Timing for the document and a Resource Timing summary, all in ms from navigation start.
+TIMING_JS = """
+(() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const resources = performance.getEntriesByType('resource');
+    let bytes = nav ? nav.transferSize : 0;
+    for (const r of resources) bytes += r.transferSize;
+    const slowest = resources.slice().sort((a, b) => b.duration - a.duration).slice(0, 5)
+        .map(r => [r.name, Math.round(r.duration), r.initiatorType, r.transferSize]);
+    return {
+        ttfb: nav ? Math.round(nav.responseStart) : null,
+        dcl: nav ? Math.round(nav.domContentLoadedEventEnd) : null,
+        onload: nav ? Math.round(nav.loadEventEnd) : null,
+        dns: nav ? Math.round(nav.domainLookupEnd - nav.domainLookupStart) : null,
+        connect: nav ? Math.round(nav.connectEnd - nav.connectStart) : null,
+        resources: resources.length,
+        bytes: bytes,
+        slowest: slowest,
+    };
+})()
+"""
+
+class JsonlSink: # Bounded buffer drained to a file by a background thread, never blocks the UI
+    def __init__(self, path, limit=BUFFER):
+        self.path = path
+        self.buffer = collections.deque(maxlen=limit)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopped = False
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name="telemetry-sink", daemon=True)
+        self.thread.start()
+
+    def put(self, record):
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(record)
+
+    def run(self):
+        while not self.stopped:
+            self.wake.wait(FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            records, dropped = list(self.buffer), self.dropped
+            self.buffer.clear()
+            self.dropped = 0
+        if dropped:
+            records.append({"type": "dropped", "count": dropped, "ts": time.time()})
+        if records:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+
+    def close(self):
+        self.stopped = True
+        self.wake.set()
+        self.thread.join()
+        self.flush()
+
+class Telemetry(QObject): # Load timings, page timing and renderer memory per tab, only while debug is on
+    updated = pyqtSignal(object) # view
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.views = {} # view -> {"current": load in progress, "loads": [finished loads], "pid", "rss"}
+        self.sink = None
+        self.timer = QTimer(self)
+        self.timer.setInterval(SAMPLE_INTERVAL)
+        self.timer.timeout.connect(self.sample)
+        debug.on_change(self.set_enabled)
+        self.set_enabled(debug.debug_bool)
+
+    def set_enabled(self, enabled):
+        path = settings.get("telemetry_file", "")
+        if enabled:
+            self.timer.start()
+            if path and self.sink is None:
+                self.sink = JsonlSink(path)
+        else:
+            self.timer.stop()
+            if self.sink is not None:
+                self.sink.close()
+                self.sink = None
+
+    def attach(self, view): # Signals are always connected so switching debug on covers open tabs
+        self.views[view] = {"current": None, "loads": collections.deque(maxlen=HISTORY), "pid": 0, "rss": 0,
+                            "version": 0} # Bumped whenever a load is added or gets its timings
+        view.loadStarted.connect(partial(self.on_started, view))
+        view.loadProgress.connect(partial(self.on_progress, view))
+        view.loadFinished.connect(partial(self.on_finished, view))
+
+    def forget(self, view):
+        self.views.pop(view, None)
+        self.updated.emit(view)
+
+    def on_started(self, view):
+        if debug.debug_bool and view in self.views:
+            self.views[view]["current"] = {"url": view.url().toString(), "started": time.perf_counter(),
+                                           "ts": time.time(), "progress": {}}
+
+    def on_progress(self, view, progress):
+        load = self.views.get(view, {}).get("current")
+        if load is not None:
+            for mark in (10, 50, 100): # Time to first bytes painted, half and all
+                if progress >= mark and mark not in load["progress"]:
+                    load["progress"][mark] = round((time.perf_counter() - load["started"]) * 1000)
+
+    def on_finished(self, view, ok):
+        state = self.views.get(view)
+        if not state or state["current"] is None:
+            return
+        load, state["current"] = state["current"], None
+        load["load_ms"] = round((time.perf_counter() - load["started"]) * 1000)
+        load["ok"] = ok
+        load["url"] = view.url().toString()
+        del load["started"]
+        state["loads"].append(load)
+        state["version"] += 1
+        self.read_memory(view)
+        view.page().runJavaScript(TIMING_JS, partial(self.on_timing, view, load))
+
+    def on_timing(self, view, load, timing):
+        if timing:
+            load.update(timing)
+            if view in self.views:
+                self.views[view]["version"] += 1
+        if self.sink is not None:
+            state = self.views.get(view, {})
+            self.sink.put({"type": "load", "pid": state.get("pid"), "rss": state.get("rss"), **load})
+        if(debug.debug_bool): print(f"Telemetry: {load['url']} {load['load_ms']} ms, TTFB {load.get('ttfb')} ms, "
+                                    f"{load.get('resources')} resources, {(load.get('bytes') or 0) // 1024} KB")
+        self.updated.emit(view)
+
+    def read_memory(self, view):
+        state = self.views[view]
+        state["pid"] = view.page().renderProcessPid()
+        state["rss"] = memory.rss(state["pid"]) or 0
+
+    def sample(self):
+        for view in list(self.views):
+            self.read_memory(view)
+            if self.sink is not None:
+                self.sink.put({"type": "memory", "url": view.url().toString(), "pid": self.views[view]["pid"],
+                               "rss": self.views[view]["rss"], "ts": time.time()})
+            self.updated.emit(view)
+
+    def close(self):
+        if self.sink is not None:
+            self.sink.close()
+            self.sink = None
+
+class TelemetryPanel(QDockWidget): # One row per tab, children are its recent loads
+    def __init__(self, telemetry, parent=None):
+        super().__init__("Telemetry", parent)
+        self.telemetry = telemetry
+        self.rows = {} # view -> QTreeWidgetItem
+        self.versions = {} # view -> loads version its child rows show
+        self.tree = QTreeWidget(self)
+        self.tree.setHeaderLabels(COLUMNS)
+        self.tree.setUniformRowHeights(True)
+        self.setWidget(self.tree)
+        telemetry.updated.connect(self.refresh)
+        debug.on_change(self.setVisible)
+        self.setVisible(debug.debug_bool)
+
+    def refresh(self, view):
+        state = self.telemetry.views.get(view)
+        item = self.rows.get(view)
+        if state is None: # Closed tab
+            if item is not None:
+                self.tree.takeTopLevelItem(self.tree.indexOfTopLevelItem(item))
+                del self.rows[view]
+            self.versions.pop(view, None)
+            return
+        if not self.isVisible():
+            return
+        if item is None:
+            item = self.rows[view] = QTreeWidgetItem(self.tree)
+        last = state["loads"][-1] if state["loads"] else {}
+        item.setText(0, view.title() or view.url().toString())
+        item.setText(1, str(state["pid"] or ""))
+        item.setText(2, memory.mb(state["rss"]))
+        self.fill(item, last)
+        if self.versions.get(view) != state["version"]: # A full history changes without changing length
+            self.versions[view] = state["version"]
+            item.takeChildren()
+            for load in reversed(state["loads"]):
+                child = QTreeWidgetItem(item)
+                child.setText(0, load["url"])
+                self.fill(child, load)
+
+    def fill(self, item, load):
+        for column, key in ((3, "load_ms"), (4, "ttfb"), (5, "dcl"), (6, "onload"), (7, "resources")):
+            value = load.get(key)
+            item.setText(column, "" if value is None else str(value))
+        item.setText(8, str((load.get("bytes") or 0) // 1024) if load else "")
+        slowest = load.get("slowest") or []
+        item.setText(9, f"{slowest[0][1]} ms {slowest[0][0].rsplit('/', 1)[-1][:40]}" if slowest else "")
+        if slowest:
+            item.setToolTip(9, "\n".join(f"{duration} ms  {kind}  {url}" for url, duration, kind, _ in slowest))
@@ -0,0 +1,90 @@
+from PyQt6.QtCore import QObject, QTimer
+from PyQt6.QtGui import QColor, QPalette
+
+PREVIEW_DELAY = 40 # ms, color picker drags are coalesced to one repaint per frame or two
+
+THEMES = { # name -> (bg, color, button)
+    "Light": ("#ffffff", "#000000", "#f5f5f5"),
+    "Dark": ("#202124", "#e8eaed", "#303134"),
+    "Sepia": ("#f4ecd8", "#433422", "#e6d8b8"),
+    "Solarized": ("#002b36", "#93a1a1", "#073642"),
+    "Contrast": ("#000000", "#ffffff", "#1a1a1a"),
+}
+
+Role = QPalette.ColorRole
+palettes = {} # (bg, color, button) -> QPalette, named themes are built once and reused
+
+def palette(bg, color, button, base=None):
+    key = (bg, color, button)
+    if key in palettes:
+        return palettes[key]
+    result = QPalette(base) if base is not None else QPalette()
+    bg, color = QColor(bg), QColor(color)
+    button = QColor(button) if QColor(button).isValid() else bg # "default" keeps the window color
+    for role in (Role.Window, Role.Base):
+        result.setColor(role, bg)
+    result.setColor(Role.AlternateBase, bg.darker(105) if bg.lightness() > 128 else bg.lighter(115))
+    for role in (Role.WindowText, Role.Text, Role.ButtonText, Role.ToolTipText):
+        result.setColor(role, color)
+    result.setColor(Role.Button, button)
+    result.setColor(Role.ToolTipBase, button)
+    placeholder = QColor(color)
+    placeholder.setAlpha(128)
+    result.setColor(Role.PlaceholderText, placeholder)
+    palettes[key] = result
+    return result
+
+def find(bg, color, button): # Name of the built-in theme with these colors, if any
+    for name, colors in THEMES.items():
+        if colors == (bg, color, button):
+            return name
+    return None
+
+class ThemeEngine(QObject): # Palette for the whole app, stylesheets only where a style ignores it
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.base = app.palette() # Style defaults, for roles a theme leaves alone
+        self.current = None
+        self.scoped = [] # Widgets whose buttons get the button color via a small stylesheet
+        self.pending = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(PREVIEW_DELAY)
+        self.timer.timeout.connect(self.flush_preview)
+        for colors in THEMES.values():
+            palette(*colors, self.base)
+
+    def apply(self, bg, color, button):
+        self.timer.stop()
+        self.pending = None
+        if (bg, color, button) == self.current:
+            return
+        self.current = (bg, color, button)
+        self.app.setPalette(palette(bg, color, button, self.base))
+        sheet = self.button_sheet()
+        for widget in self.scoped:
+            widget.setStyleSheet(sheet)
+
+    def preview(self, bg, color, button): # At most one apply per PREVIEW_DELAY while a drag goes on, the last color wins
+        self.pending = (bg, color, button)
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush_preview(self):
+        if self.pending:
+            self.apply(*self.pending)
+
+    def button_sheet(self):
+        if not self.current:
+            return ""
+        bg, color, button = self.current
+        if not QColor(button).isValid():
+            return ""
+        return f"QPushButton {{ background-color: {button}; color: {color}; }}"
+
+    def scope(self, widget): # Native styles draw buttons themselves, color just this subtree
+        self.scoped.append(widget)
+        widget.destroyed.connect(lambda *_: self.scoped.remove(widget) if widget in self.scoped else None)
+        widget.setStyleSheet(self.button_sheet())
+        return widget
@@ -1,10 +1,26 @@
-import requests, os
+import requests, os, time
 from header import msg
+from qb import debug
+from qb.config import settings
 
-def CHECK_UPDATE():
-    response = requests.get("https://raw.githubusercontent.com/qualzed/qBrowser/refs/heads/main/version.txt")
+VERSION_URL = "https://raw.githubusercontent.com/qualzed/qBrowser/refs/heads/main/version.txt"
+TIMEOUT = 3 # seconds
+TTL = 24 * 3600 # Ask GitHub at most once a day
+
+def latest_version():
+    checked = settings.get_int("update_checked", 0)
+    cached = settings.get("update_version")
+    if cached and time.time() - checked < TTL:
+        return cached
+    response = requests.get(VERSION_URL, timeout=TIMEOUT)
     response.raise_for_status()
     github_version = response.text.strip()
+    settings.update(update_checked=int(time.time()), update_version=github_version)
+    return github_version
+
+def CHECK_UPDATE():
+    github_version = latest_version()
+    if(debug.debug_bool): print(f"Update: {msg.CURRENT_VERSION=} {github_version=}")
     if(str(msg.CURRENT_VERSION) != str(github_version)):
-        os.system("cls")
-        print(msg.UPDATE_TEXT)
\ No newline at end of file
+        if os.name == "nt": os.system("cls")
+        print(msg.UPDATE_TEXT)
@@ -1,29 +1,187 @@
-import speech_recognition as sr
+import sys, json, math, time
+from array import array
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
 from qb import debug
+from qb.config import settings
 
-r = sr.Recognizer()
-mic = sr.Microphone()
-
-def voice():
-    try:
-        with mic as source:
-            r.adjust_for_ambient_noise(source)
-            audio = r.listen(source)
-        
-        config_path="config/qb.cfg"
-        with open(config_path, "r", encoding="utf-8") as f:
-            for line in f:
-                if line.startswith("language="):
-                    lang = line.strip().split("=", 1)[1]
-                
-        if lang == "ru": speech = r.recognize_google(audio, language="ru-RU")
-        elif lang == "en": speech = r.recognize_google(audio, language="en-EN")
-
-        debug.debug_bool
-        if(debug.debug_bool):
-            print(f'MIC. DEBUG: {speech}')
+LANGUAGES = {"ru": "ru-RU", "en": "en-US"}
+CALIBRATION_TTL = 300 # seconds an ambient noise measurement stays valid
+CALIBRATION_TIME = 0.5
+PAUSE = 0.8 # seconds of silence that end a phrase
+WAIT = 5.0 # seconds to wait for speech to start
+PHRASE_LIMIT = 15.0
 
+class GoogleBackend: # Online, whole utterance at once
+    def __init__(self):
+        import speech_recognition as sr
+        self.sr = sr
+        self.recognizer = sr.Recognizer()
+
+    def start(self, sample_rate, sample_width, language):
+        self.sample_rate, self.sample_width, self.language = sample_rate, sample_width, language
+        self.chunks = []
+
+    def feed(self, chunk): # No partial results from this engine
+        self.chunks.append(chunk)
+        return None
+
+    def finish(self):
+        audio = self.sr.AudioData(b"".join(self.chunks), self.sample_rate, self.sample_width)
+        return self.recognizer.recognize_google(audio, language=LANGUAGES.get(self.language, "en-US"))
+
+class VoskBackend: # Offline, streams partial results while the user speaks
+    models = {} # path -> loaded model, loading takes seconds so it is done once
+
+    def __init__(self):
+        import vosk
+        self.vosk = vosk
+        vosk.SetLogLevel(-1)
+
+    def start(self, sample_rate, sample_width, language):
+        path = settings.get(f"vosk_model_{language}", settings.get("vosk_model", f"user/vosk-{language}"))
+        if path not in self.models:
+            self.models[path] = self.vosk.Model(path)
+        self.recognizer = self.vosk.KaldiRecognizer(self.models[path], sample_rate)
+        self.done = []
+
+    def feed(self, chunk):
+        if self.recognizer.AcceptWaveform(chunk):
+            self.done.append(json.loads(self.recognizer.Result()).get("text", ""))
+            return " ".join(filter(None, self.done))
+        partial = json.loads(self.recognizer.PartialResult()).get("partial", "")
+        return " ".join(filter(None, self.done + [partial]))
+
+    def finish(self):
+        self.done.append(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return " ".join(filter(None, self.done))
+
+BACKENDS = {"google": GoogleBackend, "vosk": VoskBackend}
+
+def rms(chunk, width): # Loudness of a chunk of signed PCM samples
+    codes = {1: "b", 2: "h", 4: "i"}
+    if width not in codes or not chunk:
+        return 0
+    samples = array(codes[width], chunk[:len(chunk) - len(chunk) % width])
+    return math.sqrt(sum(s * s for s in samples) / max(len(samples), 1))
+
+class Listener: # Capture + endpointing, runs on whatever thread calls it
+    def __init__(self):
+        self.backends = {}
+        self.threshold = 300.0
+        self.calibrated = 0.0
+        self.mic = None
+        self.stopped = False # Set from the UI thread at exit, the capture loop checks it every chunk
+
+    def backend(self):
+        name = settings.get("voice_backend", "google")
+        if name not in self.backends:
+            self.backends[name] = BACKENDS.get(name, GoogleBackend)()
+        return self.backends[name]
+
+    def open_source(self, wav=None):
+        import speech_recognition as sr
+        if wav:
+            return sr.AudioFile(wav)
+        if self.mic is None:
+            self.mic = sr.Microphone()
+        return self.mic
+
+    def calibrate(self, source): # Measured once and reused until it goes stale
+        if time.monotonic() - self.calibrated < CALIBRATION_TTL:
+            return
+        seconds_per_chunk = source.CHUNK / source.SAMPLE_RATE
+        levels = [rms(source.stream.read(source.CHUNK), source.SAMPLE_WIDTH) for _ in range(max(int(CALIBRATION_TIME / seconds_per_chunk), 1))
+                  if not self.stopped] or [0]
+        self.threshold = max(sum(levels) / len(levels) * 1.5, 100.0)
+        self.calibrated = time.monotonic()
+        if(debug.debug_bool): print(f"MIC. DEBUG: calibrated {self.threshold=:.0f}")
+
+    def listen(self, wav=None, on_partial=None):
+        backend = self.backend()
+        with self.open_source(wav) as source:
+            if not wav:
+                self.calibrate(source)
+            backend.start(source.SAMPLE_RATE, source.SAMPLE_WIDTH, settings.get("language", "ru"))
+            seconds_per_chunk = source.CHUNK / source.SAMPLE_RATE
+            elapsed = silence = 0.0
+            heard = bool(wav) # Files are fed as-is
+            last = None
+            while (elapsed < PHRASE_LIMIT or wav) and not self.stopped:
+                chunk = source.stream.read(source.CHUNK)
+                if not chunk:
+                    break
+                elapsed += seconds_per_chunk
+                if rms(chunk, source.SAMPLE_WIDTH) > self.threshold:
+                    heard, silence = True, 0.0
+                else:
+                    silence += seconds_per_chunk
+                if not heard:
+                    if elapsed > WAIT: break
+                    continue
+                partial = backend.feed(chunk)
+                if partial and partial != last and on_partial:
+                    on_partial(partial)
+                    last = partial
+                if not wav and silence > PAUSE:
+                    break
+            speech = backend.finish() if heard and not self.stopped else ""
+        if(debug.debug_bool): print(f'MIC. DEBUG: {speech}')
         return speech
-    
-    except Exception as e:
-        print(e)
\ No newline at end of file
+
+class VoiceWorker(QObject): # Lives on its own QThread
+    partial = pyqtSignal(str)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.listener = Listener()
+
+    def run(self, wav):
+        try:
+            self.finished.emit(self.listener.listen(wav or None, self.partial.emit) or "")
+        except Exception as e:
+            if(debug.debug_bool): print(f"MIC. DEBUG: {e}")
+            self.failed.emit(str(e))
+
+class VoiceSearch(QObject): # UI-side handle: start() returns at once, results arrive as signals
+    requested = pyqtSignal(str)
+    partial = pyqtSignal(str)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.busy = False
+        self.thread = QThread(self)
+        self.worker = VoiceWorker()
+        self.worker.moveToThread(self.thread)
+        self.requested.connect(self.worker.run)
+        self.worker.partial.connect(self.partial)
+        self.worker.finished.connect(self.on_done)
+        self.worker.finished.connect(self.finished)
+        self.worker.failed.connect(self.on_done)
+        self.worker.failed.connect(self.failed)
+        self.thread.start()
+
+    def start(self, wav=""):
+        if self.busy:
+            return False
+        self.busy = True
+        self.requested.emit(wav)
+        return True
+
+    def on_done(self, _):
+        self.busy = False
+
+    def stop(self):
+        self.worker.listener.stopped = True # Ends a capture within one chunk, before the thread is asked to quit
+        self.thread.quit()
+        if not self.thread.wait(3000): # Only an online recognition already in flight takes this long
+            if(debug.debug_bool): print("MIC. DEBUG: recognition still running at exit")
+
+def voice(wav=None): # Blocking, for scripts: python -m qb.voice recording.wav
+    return Listener().listen(wav, lambda text: print(f"... {text}"))
+
+if __name__ == "__main__":
+    print(voice(sys.argv[1] if len(sys.argv) > 1 else None))